@@ -288,7 +288,7 @@ def update_processing_status(
             )
         else:
             # Create new record
-            status_record = ProcessingStatusRecord(
+            record_fields = dict(
                 document_id=document_id,
                 stage=stage,
                 status=status,
@@ -296,6 +296,10 @@ def update_processing_status(
                 error_message=error_message,
                 metadata=metadata or {}
             )
+            if status == ProcessingStatus.COMPLETED:
+                status_record = ProcessingStatusRecord.mark_completed(**record_fields)
+            else:
+                status_record = ProcessingStatusRecord(**record_fields)
             return db_helper.create_processing_status(status_record)
             
     except Exception as e:
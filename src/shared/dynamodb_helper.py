@@ -3,10 +3,11 @@ DynamoDB helper functions for EnergyGrid.AI Compliance Copilot
 """
 
 import os
-import json
+import random
+import time
 import boto3
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Type, TypeVar
+from typing import Dict, List, Optional, Any, Type, TypeVar, Tuple
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
 import logging
@@ -27,6 +28,31 @@ logger = logging.getLogger(__name__)
 # Type variable for generic model operations
 T = TypeVar('T')
 
+# BatchWriteItem accepts at most 25 put/delete requests per call
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_WRITE_MAX_ATTEMPTS = 5
+BATCH_WRITE_BASE_DELAY = 0.05
+BATCH_WRITE_MAX_DELAY = 1.0
+
+def select_current_stage(status_records: List[ProcessingStatusRecord]) -> Optional[ProcessingStatusRecord]:
+    """Pick the current stage from a document's processing status records"""
+    if not status_records:
+        return None
+    
+    # Track the latest in-progress/failed stage and the latest completed stage together
+    current_stage = None
+    latest_completed = None
+    for record in status_records:
+        if record.status in (ProcessingStatus.PROCESSING, ProcessingStatus.FAILED):
+            if current_stage is None or record.started_at > current_stage.started_at:
+                current_stage = record
+        elif record.status == ProcessingStatus.COMPLETED:
+            if latest_completed is None or record.started_at > latest_completed.started_at:
+                latest_completed = record
+    
+    # If no in-progress or failed stage, return the latest completed stage
+    return current_stage if current_stage is not None else latest_completed
+
 class DynamoDBHelper:
     """Helper class for DynamoDB operations"""
     
@@ -485,27 +511,17 @@ class DynamoDBHelper:
     def get_current_processing_stage(self, document_id: str) -> Optional[ProcessingStatusRecord]:
         """Get the current processing stage for a document"""
         try:
-            status_records = self.get_processing_status(document_id)
-            if not status_records:
-                return None
-            
-            # Find the latest stage that's in progress or failed
-            current_stage = None
-            for record in status_records:
-                if record.status in [ProcessingStatus.PROCESSING, ProcessingStatus.FAILED]:
-                    if current_stage is None or record.started_at > current_stage.started_at:
-                        current_stage = record
-            
-            # If no in-progress or failed stage, return the latest completed stage
-            if current_stage is None:
-                completed_stages = [r for r in status_records if r.status == ProcessingStatus.COMPLETED]
-                if completed_stages:
-                    current_stage = max(completed_stages, key=lambda x: x.started_at)
-            
-            return current_stage
+            return select_current_stage(self.get_processing_status(document_id))
         except Exception as e:
             logger.error(f"Error getting current processing stage for document {document_id}: {e}")
             return None
+    
+    def get_document_with_status(self, document_id: str) -> Tuple[Optional[Document], List[ProcessingStatusRecord]]:
+        """Get a document and all of its processing status records"""
+        document = self.get_document(document_id)
+        if not document:
+            return None, []
+        return document, self.get_processing_status(document_id)
 
     # Generic operations
     def put_item(self, table_name: str, item: Dict[str, Any]) -> bool:
@@ -529,6 +545,33 @@ class DynamoDBHelper:
             logger.error(f"Error getting item from table {table_name}: {e}")
             return None
 
+    def batch_put(self, items: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """Put items into one or more tables with BatchWriteItem, retrying unprocessed items"""
+        try:
+            for start in range(0, len(items), BATCH_WRITE_MAX_ITEMS):
+                request_items: Dict[str, List[Dict[str, Any]]] = {}
+                for table_name, item in items[start:start + BATCH_WRITE_MAX_ITEMS]:
+                    request_items.setdefault(table_name, []).append({'PutRequest': {'Item': item}})
+                
+                for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+                    if attempt:
+                        # Exponential backoff with jitter between retries of unprocessed items
+                        delay = min(BATCH_WRITE_BASE_DELAY * 2 ** (attempt - 1), BATCH_WRITE_MAX_DELAY)
+                        time.sleep(delay * (0.5 + random.random() * 0.5))
+                    response = self.dynamodb.batch_write_item(RequestItems=request_items)
+                    request_items = response.get('UnprocessedItems')
+                    if not request_items:
+                        break
+                else:
+                    logger.error(f"Unprocessed items left after batch put to tables {list(request_items)}")
+                    return False
+            
+            logger.info(f"Batch put {len(items)} items")
+            return True
+        except ClientError as e:
+            logger.error(f"Error batch putting items: {e}")
+            return False
+
     # Batch operations
     def batch_create_obligations(self, obligations: List[Obligation]) -> int:
         """Batch create multiple obligations"""
@@ -3,9 +3,10 @@ Shared data models for EnergyGrid.AI Compliance Copilot
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from pydantic import BaseModel, Field, validator, root_validator
 from enum import Enum
+from functools import lru_cache
 import uuid
 import re
 
@@ -66,6 +67,92 @@ class ReportType(str, Enum):
     OBLIGATION_STATUS = "obligation_status"
 
 
+# Cached enum coercion for DynamoDB deserialization. Each enum has only a
+# handful of members, so these caches stay tiny and skip Enum.__call__.
+@lru_cache(maxsize=None)
+def _to_processing_status(value: str) -> ProcessingStatus:
+    return ProcessingStatus(value)
+
+
+@lru_cache(maxsize=None)
+def _to_obligation_category(value: str) -> ObligationCategory:
+    return ObligationCategory(value)
+
+
+@lru_cache(maxsize=None)
+def _to_obligation_severity(value: str) -> ObligationSeverity:
+    return ObligationSeverity(value)
+
+
+@lru_cache(maxsize=None)
+def _to_deadline_type(value: str) -> DeadlineType:
+    return DeadlineType(value)
+
+
+@lru_cache(maxsize=None)
+def _to_task_status(value: str) -> TaskStatus:
+    return TaskStatus(value)
+
+
+@lru_cache(maxsize=None)
+def _to_task_priority(value: str) -> TaskPriority:
+    return TaskPriority(value)
+
+
+@lru_cache(maxsize=None)
+def _to_report_type(value: str) -> ReportType:
+    return ReportType(value)
+
+
+def _parse_item_fields(
+    item: Dict[str, Any],
+    converters: Tuple[Tuple[str, Callable[[str], Any]], ...]
+) -> Dict[str, Any]:
+    """Convert string-encoded DynamoDB attributes in place in a single pass"""
+    get = item.get
+    for key, convert in converters:
+        value = get(key)
+        if type(value) is str:
+            item[key] = convert(value)
+    return item
+
+
+_parse_timestamp = datetime.fromisoformat
+
+_DOCUMENT_ITEM_FIELDS = (
+    ('upload_timestamp', _parse_timestamp),
+    ('processing_status', _to_processing_status),
+)
+
+_OBLIGATION_ITEM_FIELDS = (
+    ('created_timestamp', _parse_timestamp),
+    ('category', _to_obligation_category),
+    ('severity', _to_obligation_severity),
+    ('deadline_type', _to_deadline_type),
+)
+
+_TASK_ITEM_FIELDS = (
+    ('created_timestamp', _parse_timestamp),
+    ('updated_timestamp', _parse_timestamp),
+    ('due_date', _parse_timestamp),
+    ('priority', _to_task_priority),
+    ('status', _to_task_status),
+)
+
+_REPORT_ITEM_FIELDS = (
+    ('created_timestamp', _parse_timestamp),
+    ('report_type', _to_report_type),
+    ('status', _to_processing_status),
+)
+
+_STATUS_RECORD_ITEM_FIELDS = (
+    ('started_at', _parse_timestamp),
+    ('updated_timestamp', _parse_timestamp),
+    ('completed_at', _parse_timestamp),
+    ('status', _to_processing_status),
+)
+
+
 class Document(BaseModel):
     """Document data model"""
     document_id: str = Field(..., description="Unique document identifier")
@@ -129,11 +216,7 @@ class Document(BaseModel):
     @classmethod
     def from_dynamodb_item(cls, item: Dict[str, Any]) -> 'Document':
         """Create instance from DynamoDB item"""
-        if 'upload_timestamp' in item and isinstance(item['upload_timestamp'], str):
-            item['upload_timestamp'] = datetime.fromisoformat(item['upload_timestamp'])
-        if 'processing_status' in item and isinstance(item['processing_status'], str):
-            item['processing_status'] = ProcessingStatus(item['processing_status'])
-        return cls(**item)
+        return cls(**_parse_item_fields(item, _DOCUMENT_ITEM_FIELDS))
 
 
 class Obligation(BaseModel):
@@ -208,15 +291,7 @@ class Obligation(BaseModel):
     @classmethod
     def from_dynamodb_item(cls, item: Dict[str, Any]) -> 'Obligation':
         """Create instance from DynamoDB item"""
-        if 'created_timestamp' in item and isinstance(item['created_timestamp'], str):
-            item['created_timestamp'] = datetime.fromisoformat(item['created_timestamp'])
-        if 'category' in item and isinstance(item['category'], str):
-            item['category'] = ObligationCategory(item['category'])
-        if 'severity' in item and isinstance(item['severity'], str):
-            item['severity'] = ObligationSeverity(item['severity'])
-        if 'deadline_type' in item and isinstance(item['deadline_type'], str):
-            item['deadline_type'] = DeadlineType(item['deadline_type'])
-        return cls(**item)
+        return cls(**_parse_item_fields(item, _OBLIGATION_ITEM_FIELDS))
 
 
 class Task(BaseModel):
@@ -296,17 +371,7 @@ class Task(BaseModel):
     @classmethod
     def from_dynamodb_item(cls, item: Dict[str, Any]) -> 'Task':
         """Create instance from DynamoDB item"""
-        if 'created_timestamp' in item and isinstance(item['created_timestamp'], str):
-            item['created_timestamp'] = datetime.fromisoformat(item['created_timestamp'])
-        if 'updated_timestamp' in item and isinstance(item['updated_timestamp'], str):
-            item['updated_timestamp'] = datetime.fromisoformat(item['updated_timestamp'])
-        if 'due_date' in item and isinstance(item['due_date'], str):
-            item['due_date'] = datetime.fromisoformat(item['due_date'])
-        if 'priority' in item and isinstance(item['priority'], str):
-            item['priority'] = TaskPriority(item['priority'])
-        if 'status' in item and isinstance(item['status'], str):
-            item['status'] = TaskStatus(item['status'])
-        return cls(**item)
+        return cls(**_parse_item_fields(item, _TASK_ITEM_FIELDS))
 
 
 class Report(BaseModel):
@@ -391,12 +456,7 @@ class Report(BaseModel):
     @classmethod
     def from_dynamodb_item(cls, item: Dict[str, Any]) -> 'Report':
         """Create instance from DynamoDB item"""
-        if 'created_timestamp' in item and isinstance(item['created_timestamp'], str):
-            item['created_timestamp'] = datetime.fromisoformat(item['created_timestamp'])
-        if 'report_type' in item and isinstance(item['report_type'], str):
-            item['report_type'] = ReportType(item['report_type'])
-        if 'status' in item and isinstance(item['status'], str):
-            item['status'] = ProcessingStatus(item['status'])
+        _parse_item_fields(item, _REPORT_ITEM_FIELDS)
         
         # Deserialize date_range
         if 'date_range' in item and isinstance(item['date_range'], dict):
@@ -440,20 +500,21 @@ class ProcessingStatusRecord(BaseModel):
             raise ValueError(f'Stage must be one of: {valid_stages}')
         return v
     
-    @root_validator(skip_on_failure=True)
-    def validate_completion_time(cls, values):
-        """Validate completion time consistency"""
-        status = values.get('status')
-        completed_at = values.get('completed_at')
+    @validator('completed_at')
+    def validate_completion_time(cls, v, values):
+        """Validate completion time is not before start time"""
         started_at = values.get('started_at')
-        
-        if status == ProcessingStatus.COMPLETED and not completed_at:
-            values['completed_at'] = datetime.utcnow()
-        
-        if completed_at and started_at and completed_at < started_at:
+        if v and started_at and v < started_at:
             raise ValueError('Completion time cannot be before start time')
-        
-        return values
+        return v
+    
+    @classmethod
+    def mark_completed(cls, **fields: Any) -> 'ProcessingStatusRecord':
+        """Create a completed record, stamping completed_at if not supplied"""
+        fields['status'] = ProcessingStatus.COMPLETED
+        if not fields.get('completed_at'):
+            fields['completed_at'] = datetime.utcnow()
+        return cls(**fields)
     
     def to_dynamodb_item(self) -> Dict[str, Any]:
         """Convert to DynamoDB item format"""
@@ -474,12 +535,4 @@ class ProcessingStatusRecord(BaseModel):
     @classmethod
     def from_dynamodb_item(cls, item: Dict[str, Any]) -> 'ProcessingStatusRecord':
         """Create instance from DynamoDB item"""
-        if 'started_at' in item and isinstance(item['started_at'], str):
-            item['started_at'] = datetime.fromisoformat(item['started_at'])
-        if 'updated_timestamp' in item and isinstance(item['updated_timestamp'], str):
-            item['updated_timestamp'] = datetime.fromisoformat(item['updated_timestamp'])
-        if 'completed_at' in item and isinstance(item['completed_at'], str):
-            item['completed_at'] = datetime.fromisoformat(item['completed_at'])
-        if 'status' in item and isinstance(item['status'], str):
-            item['status'] = ProcessingStatus(item['status'])
-        return cls(**item)
\ No newline at end of file
+        return cls(**_parse_item_fields(item, _STATUS_RECORD_ITEM_FIELDS))
\ No newline at end of file
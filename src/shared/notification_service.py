@@ -4,11 +4,17 @@ Handles sending notifications for processing events
 """
 
 import os
-import json
+import time
+import atexit
+import threading
 import boto3
 import logging
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from botocore.config import Config as BotoConfig
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime, timezone
 from enum import Enum
 
 try:
@@ -18,6 +24,12 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of entries accepted by a single SNS PublishBatch request
+SNS_BATCH_SIZE = 10
+
+# SNS message attribute data type used for every attribute we send
+_STR_ATTR = 'String'
+
 class NotificationType(str, Enum):
     """Notification type enumeration"""
     DOCUMENT_UPLOADED = "document_uploaded"
@@ -37,26 +49,223 @@ class NotificationType(str, Enum):
     TASK_OVERDUE = "task_overdue"
     REPORT_GENERATED = "report_generated"
 
+# O(1) validation of notification type strings from message attributes
+NOTIFICATION_TYPE_VALUES = frozenset(nt.value for nt in NotificationType)
+
+# (subject, message) templates keyed by notification type value, formatted
+# with the document filename or task title
+_DOC_TEMPLATES: Dict[str, Tuple[str, str]] = {
+    NotificationType.DOCUMENT_UPLOADED.value: (
+        "Document Uploaded: {filename}",
+        "Document '{filename}' has been successfully uploaded and is ready for processing."
+    ),
+    NotificationType.ANALYSIS_STARTED.value: (
+        "Analysis Started: {filename}",
+        "Started analyzing document '{filename}' to extract compliance obligations."
+    ),
+    NotificationType.ANALYSIS_COMPLETED.value: (
+        "Analysis Completed: {filename}",
+        "Successfully analyzed document '{filename}' and extracted compliance obligations."
+    ),
+    NotificationType.ANALYSIS_FAILED.value: (
+        "Analysis Failed: {filename}",
+        "Failed to analyze document '{filename}'. Please check the document format and try again."
+    ),
+    NotificationType.PLANNING_STARTED.value: (
+        "Task Planning Started: {filename}",
+        "Started generating audit tasks for document '{filename}'."
+    ),
+    NotificationType.PLANNING_COMPLETED.value: (
+        "Task Planning Completed: {filename}",
+        "Successfully generated audit tasks for document '{filename}'."
+    ),
+    NotificationType.PLANNING_FAILED.value: (
+        "Task Planning Failed: {filename}",
+        "Failed to generate audit tasks for document '{filename}'."
+    ),
+    NotificationType.REPORTING_STARTED.value: (
+        "Report Generation Started: {filename}",
+        "Started generating compliance report for document '{filename}'."
+    ),
+    NotificationType.REPORTING_COMPLETED.value: (
+        "Report Generation Completed: {filename}",
+        "Successfully generated compliance report for document '{filename}'."
+    ),
+    NotificationType.REPORTING_FAILED.value: (
+        "Report Generation Failed: {filename}",
+        "Failed to generate compliance report for document '{filename}'."
+    ),
+    NotificationType.PROCESSING_COMPLETED.value: (
+        "Processing Completed: {filename}",
+        "All processing stages completed successfully for document '{filename}'. The document is ready for review."
+    ),
+    NotificationType.PROCESSING_FAILED.value: (
+        "Processing Failed: {filename}",
+        "Processing failed for document '{filename}'. Please review the error details and retry if necessary."
+    )
+}
+
+_DOC_DEFAULT_TEMPLATES = ("Document Update: {filename}", "Document '{filename}' status update.")
+
+_TASK_TEMPLATES: Dict[str, Tuple[str, str]] = {
+    NotificationType.TASK_ASSIGNED.value: (
+        "Task Assigned: {title}",
+        "A new audit task '{title}' has been assigned to you."
+    ),
+    NotificationType.TASK_COMPLETED.value: (
+        "Task Completed: {title}",
+        "Audit task '{title}' has been completed."
+    ),
+    NotificationType.TASK_OVERDUE.value: (
+        "Task Overdue: {title}",
+        "Audit task '{title}' is overdue. Please review and update the task status."
+    )
+}
+
+_TASK_DEFAULT_TEMPLATES = ("Task Update: {title}", "Task '{title}' status update.")
+
+# Subject prefix for system alerts by severity
+_SEVERITY_INDICATORS: Dict[str, str] = {
+    'low': '🟢',
+    'medium': '🟡',
+    'high': '🟠',
+    'critical': '🔴'
+}
+
+# Keep-alive and a larger pool let concurrent publishes reuse warm TLS connections
+SNS_CLIENT_CONFIG = BotoConfig(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={
+        'max_attempts': 3,
+        'mode': 'adaptive'
+    }
+)
+
+# SNS client shared by every service instance in this container
+_sns_client = None
+
+def get_sns_client():
+    """Get or create the SNS client reused across warm invocations"""
+    global _sns_client
+    if _sns_client is None:
+        _sns_client = boto3.client('sns', config=SNS_CLIENT_CONFIG)
+    return _sns_client
+
+# Background pool for fire-and-forget publishes, drained on interpreter exit
+_publish_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='sns-publish')
+_pending_publishes = set()
+_pending_lock = threading.Lock()
+atexit.register(_publish_pool.shutdown, wait=True)
+
+def _publish_in_background(sns, description: str, publish_args: Dict[str, Any],
+                           dedup_key: "DedupKey") -> None:
+    """Publish on a worker thread, logging instead of raising on failure"""
+    try:
+        sns.publish(**publish_args)
+        _record_notification(dedup_key)
+        logger.info(f"Sent notification: {description}")
+    except Exception as e:
+        logger.error(f"Failed to send notification: {description} - {str(e)}", exc_info=True)
+
+def _untrack_publish(future) -> None:
+    """Stop tracking a completed background publish"""
+    with _pending_lock:
+        _pending_publishes.discard(future)
+
+def flush_notifications(timeout: Optional[float] = None) -> None:
+    """
+    Wait for background publishes to complete
+    
+    Args:
+        timeout: Maximum number of seconds to wait
+    """
+    with _pending_lock:
+        pending = list(_pending_publishes)
+    if pending:
+        done, _ = wait(pending, timeout=timeout)
+        with _pending_lock:
+            _pending_publishes.difference_update(done)
+
+# Recently sent notifications, used to drop duplicates from Lambda retries.
+# Keyed by subject, message and every attribute but the timestamp
+DEDUP_WINDOW_SECONDS = 60
+DEDUP_MAX_ENTRIES = 1024
+DedupKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+_recent_notifications: "OrderedDict[DedupKey, float]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+def _is_duplicate_notification(key: DedupKey) -> bool:
+    """Check whether an identical notification was sent within the dedup window"""
+    now = time.monotonic()
+    with _recent_lock:
+        sent_at = _recent_notifications.get(key)
+        return sent_at is not None and now - sent_at < DEDUP_WINDOW_SECONDS
+
+def _record_notification(key: DedupKey) -> None:
+    """Remember a sent notification, evicting the oldest entries past capacity"""
+    with _recent_lock:
+        _recent_notifications[key] = time.monotonic()
+        _recent_notifications.move_to_end(key)
+        while len(_recent_notifications) > DEDUP_MAX_ENTRIES:
+            _recent_notifications.popitem(last=False)
+
+@lru_cache(maxsize=1)
+def _get_account_id() -> str:
+    """Resolve the AWS account ID, calling STS at most once per container"""
+    account_id = os.environ.get('AWS_ACCOUNT_ID')
+    if account_id:
+        return account_id
+    return boto3.client('sts').get_caller_identity()['Account']
+
+@lru_cache(maxsize=1)
+def _default_topic_arn() -> str:
+    """Construct the notification topic ARN from the environment"""
+    region = os.environ.get('AWS_REGION', 'us-east-1')
+    account_id = _get_account_id()
+    environment = os.environ.get('ENVIRONMENT', 'dev')
+    topic_name = f"{environment}-energygrid-notifications"
+    return f"arn:aws:sns:{region}:{account_id}:{topic_name}"
+
 class NotificationService:
     """Service for sending SNS notifications"""
     
     def __init__(self):
-        self.sns = boto3.client('sns')
+        self.sns = get_sns_client()
+        # NOTIFICATIONS_DISABLED=1 turns the service into a no-op (e.g. dev/test stacks)
+        self._enabled = os.environ.get('NOTIFICATIONS_DISABLED') != '1'
         self.topic_arn = os.environ.get('NOTIFICATION_TOPIC')
-        if not self.topic_arn:
-            # Construct topic ARN from environment variables
-            region = os.environ.get('AWS_REGION', 'us-east-1')
-            account_id = boto3.client('sts').get_caller_identity()['Account']
-            environment = os.environ.get('ENVIRONMENT', 'dev')
-            topic_name = f"{environment}-energygrid-notifications"
-            self.topic_arn = f"arn:aws:sns:{region}:{account_id}:{topic_name}"
+        if not self.topic_arn and self._enabled:
+            self.topic_arn = _default_topic_arn()
+    
+    def _build_message_attributes(self,
+                                  notification_type: NotificationType,
+                                  user_id: Optional[str] = None,
+                                  attributes: Optional[Dict[str, Any]] = None,
+                                  timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Build SNS message attributes shared by single and batch publishes"""
+        return {
+            'notification_type': {'DataType': _STR_ATTR, 'StringValue': notification_type.value},
+            'timestamp': {
+                'DataType': _STR_ATTR,
+                'StringValue': timestamp or datetime.now(timezone.utc).isoformat()
+            },
+            **({'user_id': {'DataType': _STR_ATTR, 'StringValue': user_id}} if user_id else {}),
+            # Only scalar custom attributes can be sent as SNS string attributes
+            **{
+                key: {'DataType': _STR_ATTR, 'StringValue': str(value)}
+                for key, value in (attributes or {}).items()
+                if isinstance(value, (str, int, float))
+            }
+        }
     
     def send_notification(self, 
                          notification_type: NotificationType,
                          subject: str,
                          message: str,
                          attributes: Optional[Dict[str, Any]] = None,
-                         user_id: Optional[str] = None) -> bool:
+                         user_id: Optional[str] = None,
+                         async_publish: bool = False) -> bool:
         """
         Send a notification via SNS
         
@@ -66,48 +275,52 @@ class NotificationService:
             message: Notification message
             attributes: Additional message attributes
             user_id: User ID for targeted notifications
+            async_publish: Publish on a background thread instead of blocking
             
         Returns:
-            True if notification sent successfully, False otherwise
+            True if notification sent (or queued) successfully, False otherwise
         """
         
+        if not self._enabled or not self.topic_arn:
+            return True
+        
         try:
-            # Prepare message attributes
-            message_attributes = {
-                'notification_type': {
-                    'DataType': 'String',
-                    'StringValue': notification_type.value
-                },
-                'timestamp': {
-                    'DataType': 'String',
-                    'StringValue': datetime.utcnow().isoformat()
-                }
-            }
+            nt_value = notification_type.value
+            message_attributes = self._build_message_attributes(
+                notification_type, user_id, attributes
+            )
             
-            if user_id:
-                message_attributes['user_id'] = {
-                    'DataType': 'String',
-                    'StringValue': user_id
-                }
+            dedup_key = (subject, message, tuple(sorted(
+                (name, attribute['StringValue'])
+                for name, attribute in message_attributes.items()
+                if name != 'timestamp'
+            )))
+            if _is_duplicate_notification(dedup_key):
+                logger.info(f"Skipping duplicate notification: {nt_value} - {subject}")
+                return True
             
-            # Add custom attributes
-            if attributes:
-                for key, value in attributes.items():
-                    if isinstance(value, (str, int, float)):
-                        message_attributes[key] = {
-                            'DataType': 'String',
-                            'StringValue': str(value)
-                        }
+            publish_args = {
+                'TopicArn': self.topic_arn,
+                'Subject': subject,
+                'Message': message,
+                'MessageAttributes': message_attributes
+            }
+            
+            if async_publish:
+                future = _publish_pool.submit(
+                    _publish_in_background, self.sns,
+                    f"{nt_value} - {subject}", publish_args, dedup_key
+                )
+                with _pending_lock:
+                    _pending_publishes.add(future)
+                future.add_done_callback(_untrack_publish)
+                return True
             
             # Send notification
-            response = self.sns.publish(
-                TopicArn=self.topic_arn,
-                Subject=subject,
-                Message=message,
-                MessageAttributes=message_attributes
-            )
+            self.sns.publish(**publish_args)
+            _record_notification(dedup_key)
             
-            logger.info(f"Sent notification: {notification_type.value} - {subject}")
+            logger.info(f"Sent notification: {nt_value} - {subject}")
             return True
             
         except Exception as e:
@@ -117,7 +330,8 @@ class NotificationService:
     def send_document_notification(self, 
                                  document: Document,
                                  notification_type: NotificationType,
-                                 additional_info: Optional[Dict[str, Any]] = None) -> bool:
+                                 additional_info: Optional[Dict[str, Any]] = None,
+                                 async_publish: bool = False) -> bool:
         """
         Send document-related notification
         
@@ -125,44 +339,18 @@ class NotificationService:
             document: Document object
             notification_type: Type of notification
             additional_info: Additional information to include
+            async_publish: Publish on a background thread instead of blocking; the caller
+                must flush_notifications() before its handler returns
             
         Returns:
             True if notification sent successfully
         """
         
-        # Build subject and message based on notification type
-        subjects = {
-            NotificationType.DOCUMENT_UPLOADED: f"Document Uploaded: {document.filename}",
-            NotificationType.ANALYSIS_STARTED: f"Analysis Started: {document.filename}",
-            NotificationType.ANALYSIS_COMPLETED: f"Analysis Completed: {document.filename}",
-            NotificationType.ANALYSIS_FAILED: f"Analysis Failed: {document.filename}",
-            NotificationType.PLANNING_STARTED: f"Task Planning Started: {document.filename}",
-            NotificationType.PLANNING_COMPLETED: f"Task Planning Completed: {document.filename}",
-            NotificationType.PLANNING_FAILED: f"Task Planning Failed: {document.filename}",
-            NotificationType.REPORTING_STARTED: f"Report Generation Started: {document.filename}",
-            NotificationType.REPORTING_COMPLETED: f"Report Generation Completed: {document.filename}",
-            NotificationType.REPORTING_FAILED: f"Report Generation Failed: {document.filename}",
-            NotificationType.PROCESSING_COMPLETED: f"Processing Completed: {document.filename}",
-            NotificationType.PROCESSING_FAILED: f"Processing Failed: {document.filename}"
-        }
-        
-        messages = {
-            NotificationType.DOCUMENT_UPLOADED: f"Document '{document.filename}' has been successfully uploaded and is ready for processing.",
-            NotificationType.ANALYSIS_STARTED: f"Started analyzing document '{document.filename}' to extract compliance obligations.",
-            NotificationType.ANALYSIS_COMPLETED: f"Successfully analyzed document '{document.filename}' and extracted compliance obligations.",
-            NotificationType.ANALYSIS_FAILED: f"Failed to analyze document '{document.filename}'. Please check the document format and try again.",
-            NotificationType.PLANNING_STARTED: f"Started generating audit tasks for document '{document.filename}'.",
-            NotificationType.PLANNING_COMPLETED: f"Successfully generated audit tasks for document '{document.filename}'.",
-            NotificationType.PLANNING_FAILED: f"Failed to generate audit tasks for document '{document.filename}'.",
-            NotificationType.REPORTING_STARTED: f"Started generating compliance report for document '{document.filename}'.",
-            NotificationType.REPORTING_COMPLETED: f"Successfully generated compliance report for document '{document.filename}'.",
-            NotificationType.REPORTING_FAILED: f"Failed to generate compliance report for document '{document.filename}'.",
-            NotificationType.PROCESSING_COMPLETED: f"All processing stages completed successfully for document '{document.filename}'. The document is ready for review.",
-            NotificationType.PROCESSING_FAILED: f"Processing failed for document '{document.filename}'. Please review the error details and retry if necessary."
-        }
-        
-        subject = subjects.get(notification_type, f"Document Update: {document.filename}")
-        message = messages.get(notification_type, f"Document '{document.filename}' status update.")
+        subject_template, message_template = _DOC_TEMPLATES.get(
+            notification_type.value, _DOC_DEFAULT_TEMPLATES
+        )
+        subject = subject_template.format(filename=document.filename)
+        message = message_template.format(filename=document.filename)
         
         # Add additional information to message
         if additional_info:
@@ -188,13 +376,15 @@ class NotificationService:
             subject=subject,
             message=message,
             attributes=attributes,
-            user_id=document.user_id
+            user_id=document.user_id,
+            async_publish=async_publish
         )
     
     def send_task_notification(self,
                              task: Task,
                              notification_type: NotificationType,
-                             additional_info: Optional[Dict[str, Any]] = None) -> bool:
+                             additional_info: Optional[Dict[str, Any]] = None,
+                             async_publish: bool = False) -> bool:
         """
         Send task-related notification
         
@@ -202,32 +392,26 @@ class NotificationService:
             task: Task object
             notification_type: Type of notification
             additional_info: Additional information to include
+            async_publish: Publish on a background thread instead of blocking; the caller
+                must flush_notifications() before its handler returns
             
         Returns:
             True if notification sent successfully
         """
         
-        subjects = {
-            NotificationType.TASK_ASSIGNED: f"Task Assigned: {task.title}",
-            NotificationType.TASK_COMPLETED: f"Task Completed: {task.title}",
-            NotificationType.TASK_OVERDUE: f"Task Overdue: {task.title}"
-        }
-        
-        messages = {
-            NotificationType.TASK_ASSIGNED: f"A new audit task '{task.title}' has been assigned to you.",
-            NotificationType.TASK_COMPLETED: f"Audit task '{task.title}' has been completed.",
-            NotificationType.TASK_OVERDUE: f"Audit task '{task.title}' is overdue. Please review and update the task status."
-        }
-        
-        subject = subjects.get(notification_type, f"Task Update: {task.title}")
-        message = messages.get(notification_type, f"Task '{task.title}' status update.")
+        subject_template, message_template = _TASK_TEMPLATES.get(
+            notification_type.value, _TASK_DEFAULT_TEMPLATES
+        )
+        subject = subject_template.format(title=task.title)
+        message = message_template.format(title=task.title)
         
         # Add task details to message
-        message += f"\n\nTask Description: {task.description}"
+        parts = [message, "", f"Task Description: {task.description}"]
         if task.due_date:
-            message += f"\nDue Date: {task.due_date.strftime('%Y-%m-%d %H:%M')}"
-        message += f"\nPriority: {task.priority.value.title()}"
-        message += f"\nStatus: {task.status.value.replace('_', ' ').title()}"
+            parts.append(f"Due Date: {task.due_date.isoformat(sep=' ', timespec='minutes')}")
+        parts.append(f"Priority: {task.priority.value.title()}")
+        parts.append(f"Status: {task.status.value.replace('_', ' ').title()}")
+        message = "\n".join(parts)
         
         # Prepare attributes
         attributes = {
@@ -245,13 +429,15 @@ class NotificationService:
             subject=subject,
             message=message,
             attributes=attributes,
-            user_id=task.assigned_to
+            user_id=task.assigned_to,
+            async_publish=async_publish
         )
     
     def send_report_notification(self,
                                report: Report,
                                notification_type: NotificationType,
-                               additional_info: Optional[Dict[str, Any]] = None) -> bool:
+                               additional_info: Optional[Dict[str, Any]] = None,
+                               async_publish: bool = False) -> bool:
         """
         Send report-related notification
         
@@ -259,26 +445,33 @@ class NotificationService:
             report: Report object
             notification_type: Type of notification
             additional_info: Additional information to include
+            async_publish: Publish on a background thread instead of blocking; the caller
+                must flush_notifications() before its handler returns
             
         Returns:
             True if notification sent successfully
         """
         
         subject = f"Report Generated: {report.title}"
-        message = f"Compliance report '{report.title}' has been successfully generated and is ready for download."
         
         # Add report details
-        message += f"\n\nReport Type: {report.report_type.value.replace('_', ' ').title()}"
-        message += f"\nGenerated: {report.created_timestamp.strftime('%Y-%m-%d %H:%M')}"
+        parts = [
+            f"Compliance report '{report.title}' has been successfully generated and is ready for download.",
+            "",
+            f"Report Type: {report.report_type.value.replace('_', ' ').title()}",
+            f"Generated: {report.created_timestamp.isoformat(sep=' ', timespec='minutes')}"
+        ]
         
         if report.date_range:
             start_date = report.date_range.get('start_date')
             end_date = report.date_range.get('end_date')
             if start_date and end_date:
-                message += f"\nDate Range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+                parts.append(f"Date Range: {start_date.date().isoformat()} to {end_date.date().isoformat()}")
         
         if additional_info and 'download_url' in additional_info:
-            message += f"\n\nDownload URL: {additional_info['download_url']}"
+            parts.extend(["", f"Download URL: {additional_info['download_url']}"])
+        
+        message = "\n".join(parts)
         
         # Prepare attributes
         attributes = {
@@ -295,13 +488,14 @@ class NotificationService:
             subject=subject,
             message=message,
             attributes=attributes,
-            user_id=report.generated_by
+            user_id=report.generated_by,
+            async_publish=async_publish
         )
     
     def send_batch_notification(self,
                               notifications: List[Dict[str, Any]]) -> int:
         """
-        Send multiple notifications in batch
+        Send multiple notifications in batch using SNS PublishBatch
         
         Args:
             notifications: List of notification dictionaries
@@ -310,13 +504,64 @@ class NotificationService:
             Number of successfully sent notifications
         """
         
+        if not self._enabled or not self.topic_arn:
+            return len(notifications)
+        
+        # Stamp every entry in the batch with the same timestamp
+        timestamp = datetime.now(timezone.utc).isoformat()
+        
+        entries = []
+        for index, notification in enumerate(notifications):
+            try:
+                entries.append({
+                    'Id': str(index),
+                    'Subject': notification['subject'],
+                    'Message': notification['message'],
+                    'MessageAttributes': self._build_message_attributes(
+                        notification['notification_type'],
+                        notification.get('user_id'),
+                        notification.get('attributes'),
+                        timestamp
+                    )
+                })
+            except Exception as e:
+                logger.error(f"Failed to prepare batch notification: {str(e)}")
+        
         success_count = 0
-        for notification in notifications:
+        for start in range(0, len(entries), SNS_BATCH_SIZE):
+            success_count += self._publish_batch_chunk(entries[start:start + SNS_BATCH_SIZE])
+        
+        return success_count
+    
+    def _publish_batch_chunk(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        Publish up to SNS_BATCH_SIZE entries, retrying failed entries once
+        
+        Args:
+            entries: PublishBatchRequestEntries for a single request
+            
+        Returns:
+            Number of successfully published entries
+        """
+        
+        success_count = 0
+        for attempt in range(2):
             try:
-                if self.send_notification(**notification):
-                    success_count += 1
+                response = self.sns.publish_batch(
+                    TopicArn=self.topic_arn,
+                    PublishBatchRequestEntries=entries
+                )
             except Exception as e:
                 logger.error(f"Failed to send batch notification: {str(e)}")
+                break
+            
+            success_count += len(response.get('Successful', []))
+            failed_ids = {failure['Id'] for failure in response.get('Failed', [])}
+            if not failed_ids:
+                break
+            
+            logger.warning(f"{len(failed_ids)} batch notifications failed (attempt {attempt + 1})")
+            entries = [entry for entry in entries if entry['Id'] in failed_ids]
         
         return success_count
     
@@ -341,14 +586,7 @@ class NotificationService:
         subject = f"System Alert: {alert_type.replace('_', ' ').title()}"
         
         # Add severity indicator to subject
-        severity_indicators = {
-            'low': '🟢',
-            'medium': '🟡',
-            'high': '🟠',
-            'critical': '🔴'
-        }
-        
-        indicator = severity_indicators.get(severity.lower(), '⚪')
+        indicator = _SEVERITY_INDICATORS.get(severity.lower(), '⚪')
         subject = f"{indicator} {subject}"
         
         # Prepare attributes
@@ -3,19 +3,180 @@ SNS Subscription Handler for EnergyGrid.AI Compliance Copilot
 Handles SNS subscription confirmations and message processing
 """
 
+import io
+import re
 import json
+import time
+import base64
 import logging
+import threading
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any, Optional
-import boto3
+from urllib.parse import urlparse
 from botocore.exceptions import ClientError
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+try:
+    from .notification_service import get_sns_client, NOTIFICATION_TYPE_VALUES
+except ImportError:
+    from notification_service import get_sns_client, NOTIFICATION_TYPE_VALUES
+
 logger = logging.getLogger(__name__)
 
+# Prefer orjson for message parsing/serialization; its JSONDecodeError
+# subclasses json.JSONDecodeError so error handling is unchanged
+if ORJSON_AVAILABLE:
+    _loads = orjson.loads
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    _loads = json.loads
+    _dumps = json.dumps
+
+# Messages above this size are stream-parsed for top-level fields only
+LARGE_MESSAGE_THRESHOLD = 64 * 1024
+
+_SCALAR_EVENTS = frozenset(('string', 'number', 'boolean', 'null'))
+
+
+def _parse_top_level_fields(message: str) -> Dict[str, Any]:
+    """
+    Stream-parse a JSON object, keeping only its top-level scalar fields
+    
+    Nested objects and arrays (e.g. embedded report payloads) are skipped
+    without being materialized.
+    """
+    
+    data = {}
+    try:
+        for prefix, event, value in ijson.parse(io.BytesIO(message.encode('utf-8'))):
+            if prefix and '.' not in prefix and event in _SCALAR_EVENTS:
+                data[prefix] = value
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON message: {str(e)}") from e
+    return data
+
+
+# SNS signing certificates and subscribe URLs must be served by SNS itself
+_SNS_HOST_PATTERN = re.compile(r'^sns\.[a-z0-9-]+\.amazonaws\.com(\.cn)?$')
+
+# Fields included in the SNS string-to-sign, in canonical order
+_SIGNED_FIELDS = {
+    'Notification': ('Message', 'MessageId', 'Subject', 'Timestamp', 'TopicArn', 'Type'),
+    'SubscriptionConfirmation': ('Message', 'MessageId', 'SubscribeURL', 'Timestamp', 'Token', 'TopicArn', 'Type'),
+    'UnsubscribeConfirmation': ('Message', 'MessageId', 'SubscribeURL', 'Timestamp', 'Token', 'TopicArn', 'Type')
+}
+
+
+# Shared default for missing message attributes; never mutated
+_EMPTY: Dict[str, Any] = {}
+
+
+def _attribute_value(message_attributes: Dict[str, Any], name: str) -> Optional[str]:
+    """Read a message attribute from a Lambda event (Value) or raw delivery (StringValue)"""
+    attribute = message_attributes.get(name, _EMPTY)
+    value = attribute.get('Value')
+    return value if value is not None else attribute.get('StringValue')
+
+
+def _is_sns_url(url: Optional[str]) -> bool:
+    """Check that a URL points at an HTTPS SNS endpoint"""
+    if not url:
+        return False
+    parsed = urlparse(url)
+    return parsed.scheme == 'https' and bool(_SNS_HOST_PATTERN.match(parsed.hostname or ''))
+
+
+@lru_cache(maxsize=16)
+def _load_signing_certificate(cert_url: str):
+    """Download and parse an SNS signing certificate (cached per URL)"""
+    with urllib.request.urlopen(cert_url, timeout=5) as response:
+        return x509.load_pem_x509_certificate(response.read())
+
+
+def verify_sns_signature(sns_message: Dict[str, Any]) -> bool:
+    """
+    Verify the signature of an SNS message against its signing certificate
+    
+    Args:
+        sns_message: SNS message data
+        
+    Returns:
+        True if the signature is valid, False otherwise
+    """
+    
+    if not CRYPTOGRAPHY_AVAILABLE:
+        logger.warning("cryptography not available; cannot verify SNS message signature")
+        return False
+    
+    # Lambda events spell the field SigningCertUrl, HTTP deliveries SigningCertURL
+    cert_url = sns_message.get('SigningCertURL') or sns_message.get('SigningCertUrl')
+    fields = _SIGNED_FIELDS.get(sns_message.get('Type'))
+    signature = sns_message.get('Signature')
+    
+    if not fields or not signature or not _is_sns_url(cert_url):
+        logger.warning(f"Rejecting SNS message with untrusted or missing signing data: {cert_url}")
+        return False
+    
+    algorithm = hashes.SHA256() if sns_message.get('SignatureVersion') == '2' else hashes.SHA1()
+    string_to_sign = ''.join(
+        f"{field}\n{sns_message[field]}\n" for field in fields if field in sns_message
+    )
+    
+    try:
+        certificate = _load_signing_certificate(cert_url)
+        certificate.public_key().verify(
+            base64.b64decode(signature),
+            string_to_sign.encode('utf-8'),
+            padding.PKCS1v15(),
+            algorithm
+        )
+        return True
+    except InvalidSignature:
+        logger.warning("SNS message signature verification failed")
+        return False
+    except Exception as e:
+        logger.error(f"Error verifying SNS message signature: {str(e)}")
+        return False
+
+
+# CloudWatch namespace for notification metrics emitted as embedded metric format
+METRICS_NAMESPACE = "EnergyGrid/ComplianceCopilot"
+
+# Records in one SNS event carry no ordering guarantee, so they are processed concurrently
+_RECORDS_POOL = ThreadPoolExecutor(max_workers=10, thread_name_prefix='sns-record')
+
 class SNSSubscriptionHandler:
     """Handler for SNS subscription management"""
     
     def __init__(self):
-        self.sns = boto3.client('sns')
+        self.sns = get_sns_client()
+        self._metric_counts: Dict[str, int] = defaultdict(int)
+        self._metrics_lock = threading.Lock()
     
     def handle_sns_message(self, event: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -29,23 +190,29 @@ class SNSSubscriptionHandler:
         """
         
         try:
-            # Process each SNS record
-            for record in event.get('Records', []):
-                if record.get('EventSource') == 'aws:sns':
-                    self.process_sns_record(record)
+            # Process SNS records concurrently and surface the first failure
+            futures = [
+                _RECORDS_POOL.submit(self.process_sns_record, record)
+                for record in event.get('Records', [])
+                if record.get('EventSource') == 'aws:sns'
+            ]
+            for future in futures:
+                future.result()
             
+            self.flush_notification_metrics()
             return {
                 'statusCode': 200,
-                'body': json.dumps({
+                'body': _dumps({
                     'message': 'SNS messages processed successfully'
                 })
             }
             
         except Exception as e:
             logger.error(f"Error processing SNS messages: {str(e)}")
+            self.flush_notification_metrics()
             return {
                 'statusCode': 500,
-                'body': json.dumps({
+                'body': _dumps({
                     'error': 'Failed to process SNS messages',
                     'message': str(e)
                 })
@@ -90,8 +257,18 @@ class SNSSubscriptionHandler:
             
             logger.info(f"Confirming subscription to topic: {topic_arn}")
             
-            # Confirm subscription using token
-            if token and topic_arn:
+            # Confirm by visiting the signed SubscribeURL, avoiding an SNS API call
+            if CRYPTOGRAPHY_AVAILABLE and _is_sns_url(subscribe_url):
+                if not verify_sns_signature(sns_message):
+                    logger.error(f"Refusing to confirm subscription with invalid signature: {topic_arn}")
+                    return
+                
+                with urllib.request.urlopen(subscribe_url, timeout=5) as response:
+                    response.read()
+                
+                logger.info(f"Subscription confirmed via SubscribeURL: {topic_arn}")
+            elif token and topic_arn:
+                # Confirm subscription using token
                 response = self.sns.confirm_subscription(
                     TopicArn=topic_arn,
                     Token=token
@@ -123,13 +300,23 @@ class SNSSubscriptionHandler:
             
             logger.info(f"Processing notification: {subject}")
             
-            # Try to parse message as JSON
-            try:
-                message_data = json.loads(message)
-                self.process_notification_data(message_data, message_attributes)
-            except json.JSONDecodeError:
-                # Handle plain text message
-                self.process_plain_text_notification(subject, message, message_attributes)
+            # Only attempt a JSON parse when the body looks like JSON, so plain
+            # text messages don't pay for raising and catching a decode error
+            first_char = message.lstrip()[:1]
+            if first_char in ('{', '['):
+                try:
+                    if IJSON_AVAILABLE and first_char == '{' and len(message) > LARGE_MESSAGE_THRESHOLD:
+                        message_data = _parse_top_level_fields(message)
+                    else:
+                        message_data = _loads(message)
+                    self.process_notification_data(message_data, message_attributes)
+                    return
+                except ValueError:
+                    # json.JSONDecodeError and orjson.JSONDecodeError are ValueErrors
+                    pass
+            
+            # Handle plain text message
+            self.process_plain_text_notification(subject, message, message_attributes)
                 
         except Exception as e:
             logger.error(f"Error handling notification: {str(e)}")
@@ -161,8 +348,11 @@ class SNSSubscriptionHandler:
         """
         
         try:
-            notification_type = message_attributes.get('notification_type', {}).get('Value')
-            user_id = message_attributes.get('user_id', {}).get('Value')
+            notification_type = _attribute_value(message_attributes, 'notification_type')
+            user_id = _attribute_value(message_attributes, 'user_id')
+            
+            if notification_type and notification_type not in NOTIFICATION_TYPE_VALUES:
+                logger.warning(f"Unrecognized notification type: {notification_type}")
             
             logger.info(f"Processing {notification_type} notification for user {user_id}")
             
@@ -216,16 +406,49 @@ class SNSSubscriptionHandler:
         """
         
         try:
-            # Log metrics that can be picked up by CloudWatch
-            logger.info(f"METRIC: notification_processed type={notification_type or 'unknown'}")
-            
-            # You could also send custom metrics to CloudWatch here
-            # cloudwatch = boto3.client('cloudwatch')
-            # cloudwatch.put_metric_data(...)
+            # Buffer counts; flush_notification_metrics emits them once per event
+            with self._metrics_lock:
+                self._metric_counts[notification_type or 'unknown'] += 1
             
         except Exception as e:
             logger.error(f"Error logging notification metrics: {str(e)}")
     
+    def flush_notification_metrics(self) -> None:
+        """
+        Emit buffered notification counts as CloudWatch embedded metric format
+        
+        One EMF document is written per notification type seen since the last
+        flush, letting CloudWatch extract a NotificationsProcessed metric
+        without any PutMetricData calls.
+        """
+        
+        try:
+            with self._metrics_lock:
+                counts = dict(self._metric_counts)
+                self._metric_counts.clear()
+            
+            if not counts:
+                return
+            
+            timestamp = int(time.time() * 1000)
+            for notification_type, count in counts.items():
+                # EMF documents must be bare JSON lines, so bypass the log formatter
+                print(_dumps({
+                    '_aws': {
+                        'Timestamp': timestamp,
+                        'CloudWatchMetrics': [{
+                            'Namespace': METRICS_NAMESPACE,
+                            'Dimensions': [['NotificationType']],
+                            'Metrics': [{'Name': 'NotificationsProcessed', 'Unit': 'Count'}]
+                        }]
+                    },
+                    'NotificationType': notification_type,
+                    'NotificationsProcessed': count
+                }))
+            
+        except Exception as e:
+            logger.error(f"Error flushing notification metrics: {str(e)}")
+    
     def create_subscription(self, 
                           topic_arn: str, 
                           protocol: str, 
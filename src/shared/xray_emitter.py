@@ -0,0 +1,76 @@
+"""
+X-Ray segment emitters for EnergyGrid.AI Compliance Copilot
+Loaded by xray_tracing only once tracing is actually used
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+
+from aws_xray_sdk.core.emitters.udp_emitter import (
+    UDPEmitter, PROTOCOL_HEADER, PROTOCOL_DELIMITER, DEFAULT_DAEMON_ADDRESS
+)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Datagram prefix expected by the X-Ray daemon
+_MESSAGE_HEADER = f"{PROTOCOL_HEADER}{PROTOCOL_DELIMITER}".encode('utf-8')
+
+
+class AsyncUDPEmitter(UDPEmitter):
+    """UDP emitter that sends completed segments from a background thread"""
+    
+    def __init__(self, daemon_address: str = DEFAULT_DAEMON_ADDRESS):
+        super().__init__(daemon_address)
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._send_lock = threading.Lock()
+        self._sender = threading.Thread(target=self._run, name='xray-emitter', daemon=True)
+        self._sender.start()
+        atexit.register(self.flush)
+    
+    def send_entity(self, entity):
+        """Serialize a segment/subsegment and hand it to the sender thread"""
+        try:
+            message = _MESSAGE_HEADER + self._serialize(entity)
+        except Exception:
+            logger.exception("Failed to serialize X-Ray entity")
+            return
+        
+        self._queue.append(message)
+        self._wakeup.set()
+    
+    @staticmethod
+    def _serialize(entity) -> bytes:
+        """Encode an entity document, using orjson when available"""
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(entity.to_dict(), default=str, option=orjson.OPT_NON_STR_KEYS)
+        return entity.serialize().encode('utf-8')
+    
+    def flush(self):
+        """Send anything still queued from the calling thread"""
+        # Lambda freezes background threads once the handler returns
+        self._drain()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._drain()
+    
+    def _drain(self):
+        # The daemon expects one segment document per datagram
+        with self._send_lock:
+            while self._queue:
+                message = self._queue.popleft()
+                try:
+                    self._socket.sendto(message, (self._ip, self._port))
+                except Exception:
+                    logger.exception("Failed to send entity to X-Ray daemon")
@@ -4,58 +4,123 @@ Implements distributed tracing across all Lambda functions and AWS services
 """
 
 import os
-import json
+import time
 import logging
-from typing import Dict, Any, Optional, Callable
+import threading
+import itertools
+import importlib.util
+from typing import Dict, Any, Optional, Callable, Tuple
 from functools import wraps
-from datetime import datetime
-
-# Import X-Ray SDK
-try:
-    from aws_xray_sdk.core import xray_recorder, patch_all
-    from aws_xray_sdk.core.models import subsegment
-    from aws_xray_sdk.core.exceptions import SegmentNotFoundException
-    XRAY_AVAILABLE = True
-except ImportError:
-    XRAY_AVAILABLE = False
+
+# The X-Ray SDK is imported and patched on first use, so cold starts that
+# never emit a trace skip the import and patch_all() cost
+XRAY_AVAILABLE = importlib.util.find_spec('aws_xray_sdk') is not None
+if not XRAY_AVAILABLE:
     logging.warning("X-Ray SDK not available. Tracing will be disabled.")
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DAEMON_ADDRESS = '127.0.0.1:2000'
+
+# Annotate result counts on one in every N traced calls (1 = every call)
+RESULT_COUNT_SAMPLE_RATE = max(1, int(os.getenv('XRAY_RESULT_COUNT_SAMPLE', '1')))
+_result_count_calls = itertools.count()
+
+# Bound by _ensure_xray_loaded()
+xray_recorder = None
+patch_all = None
+
+
+class SegmentNotFoundException(Exception):
+    """Placeholder until the X-Ray SDK exception is loaded"""
+
+
+_xray_lock = threading.Lock()
+
+
+def _ensure_xray_loaded():
+    """Import the X-Ray SDK on first use and return the global recorder"""
+    global xray_recorder, patch_all, SegmentNotFoundException
+    
+    if xray_recorder is None:
+        with _xray_lock:
+            if xray_recorder is None:
+                from aws_xray_sdk.core import xray_recorder as recorder, patch_all as patch
+                from aws_xray_sdk.core.exceptions.exceptions import SegmentNotFoundException as not_found
+                patch_all = patch
+                SegmentNotFoundException = not_found
+                xray_recorder = recorder
+    
+    return xray_recorder
+
 
 class XRayTracer:
     """X-Ray tracing utilities"""
     
+    __slots__ = ('enabled', 'emitter', '_configured', '_configure_lock')
+    
     def __init__(self):
         self.enabled = XRAY_AVAILABLE and os.getenv('_X_AMZN_TRACE_ID') is not None
+        self.emitter = None
+        self._configured = False
+        self._configure_lock = threading.Lock()
         
         if self.enabled:
-            # Configure X-Ray recorder
-            xray_recorder.configure(
-                context_missing='LOG_ERROR',
-                plugins=('EC2Plugin', 'ECSPlugin'),
-                daemon_address=os.getenv('_X_AMZN_TRACE_ID', '127.0.0.1:2000'),
-                use_ssl=False
-            )
-            
-            # Patch AWS SDK calls
-            patch_all()
-            
             logger.info("X-Ray tracing enabled")
         else:
             logger.info("X-Ray tracing disabled")
     
+    def _recorder(self):
+        """Return the X-Ray recorder, configuring it on first use"""
+        if not self._configured:
+            with self._configure_lock:
+                if not self._configured:
+                    self._configure()
+        return xray_recorder
+    
+    def _configure(self):
+        """Configure the recorder and patch AWS SDK calls"""
+        recorder = _ensure_xray_loaded()
+        
+        try:
+            from .xray_emitter import AsyncUDPEmitter
+        except ImportError:
+            from xray_emitter import AsyncUDPEmitter
+        
+        daemon_address = os.getenv('AWS_XRAY_DAEMON_ADDRESS', DEFAULT_DAEMON_ADDRESS)
+        self.emitter = AsyncUDPEmitter(daemon_address)
+        
+        # Configure X-Ray recorder
+        recorder.configure(
+            context_missing='LOG_ERROR',
+            plugins=('EC2Plugin', 'ECSPlugin'),
+            daemon_address=daemon_address,
+            emitter=self.emitter
+        )
+        
+        # Patch AWS SDK calls
+        patch_all()
+        
+        self._configured = True
+    
     def is_enabled(self) -> bool:
         """Check if X-Ray tracing is enabled"""
         return self.enabled
     
+    def is_sampled(self) -> bool:
+        """Check if the current trace entity is sampled"""
+        try:
+            return self._recorder().is_sampled()
+        except Exception:
+            return False
+    
     def create_subsegment(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[Any]:
         """Create a new subsegment"""
         if not self.enabled:
             return None
         
         try:
-            subseg = xray_recorder.begin_subsegment(name)
+            subseg = self._recorder().begin_subsegment(name)
             
             if metadata:
                 for key, value in metadata.items():
@@ -75,17 +140,22 @@ class XRayTracer:
             return
         
         try:
-            xray_recorder.end_subsegment()
+            self._recorder().end_subsegment()
         except Exception as e:
             logger.error(f"Failed to end subsegment: {e}")
     
+    def flush(self):
+        """Send any segments still queued for the X-Ray daemon"""
+        if self.emitter:
+            self.emitter.flush()
+    
     def add_annotation(self, key: str, value: str):
         """Add annotation to current segment"""
         if not self.enabled:
             return
         
         try:
-            xray_recorder.put_annotation(key, value)
+            self._recorder().put_annotation(key, value)
         except Exception as e:
             logger.error(f"Failed to add annotation {key}={value}: {e}")
     
@@ -95,7 +165,7 @@ class XRayTracer:
             return
         
         try:
-            xray_recorder.put_metadata(key, value, namespace)
+            self._recorder().put_metadata(key, value, namespace)
         except Exception as e:
             logger.error(f"Failed to add metadata {namespace}.{key}: {e}")
     
@@ -104,9 +174,7 @@ class XRayTracer:
         if not self.enabled:
             return func
         
-        @xray_recorder.capture('lambda_handler')
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+        def traced(*args, **kwargs):
             # Add Lambda-specific annotations
             self.add_annotation('service', 'energygrid-compliance')
             self.add_annotation('environment', os.getenv('ENVIRONMENT', 'unknown'))
@@ -127,33 +195,74 @@ class XRayTracer:
                 })
                 raise
         
+        captured = None
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal captured
+            if captured is None:
+                captured = self._recorder().capture('lambda_handler')(traced)
+            
+            # Flush after the handler subsegment has ended so it is included
+            try:
+                return captured(*args, **kwargs)
+            finally:
+                self.flush()
+        
         return wrapper
     
-    def capture_aws_service_call(self, service_name: str, operation: str):
-        """Decorator to capture AWS service calls"""
+    def _capture_tagged(self, subseg_name: str, annotations: Tuple[Tuple[str, Any], ...],
+                        error_key: str = 'error', error_context: Optional[Dict[str, Any]] = None,
+                        statuses: Tuple[str, str] = ('success', 'error'),
+                        on_start: Optional[Callable[[Any], None]] = None,
+                        on_result: Optional[Callable[[Any, Any], None]] = None) -> Callable:
+        """
+        Build a decorator that wraps a call in an annotated subsegment
+        
+        Args:
+            subseg_name: Subsegment name
+            annotations: Static (key, value) annotations added to every subsegment
+            error_key: Metadata key for exception details
+            error_context: Static fields added to the exception details
+            statuses: 'status' annotation values for success and failure
+            on_start: Hook called with the subsegment before the wrapped call
+            on_result: Hook called with the subsegment and result on success
+        """
+        success_status, error_status = statuses
+        error_context = error_context or {}
+        
         def decorator(func: Callable) -> Callable:
             if not self.enabled:
                 return func
             
             @wraps(func)
             def wrapper(*args, **kwargs):
-                subseg = self.create_subsegment(f"{service_name}.{operation}")
+                # Unsampled traces discard subsegment data, so skip building it
+                if not self.is_sampled():
+                    return func(*args, **kwargs)
+                
+                subseg = self.create_subsegment(subseg_name)
                 
                 if subseg:
-                    subseg.put_annotation('service', service_name)
-                    subseg.put_annotation('operation', operation)
+                    for key, value in annotations:
+                        subseg.put_annotation(key, value)
+                    if on_start:
+                        on_start(subseg)
                 
                 try:
                     result = func(*args, **kwargs)
                     if subseg:
-                        subseg.put_annotation('status', 'success')
+                        subseg.put_annotation('status', success_status)
+                        if on_result:
+                            on_result(subseg, result)
                     return result
                 except Exception as e:
                     if subseg:
-                        subseg.put_annotation('status', 'error')
-                        subseg.put_metadata('error', {
+                        subseg.put_annotation('status', error_status)
+                        subseg.put_metadata(error_key, {
                             'type': type(e).__name__,
-                            'message': str(e)
+                            'message': str(e),
+                            **error_context
                         })
                     raise
                 finally:
@@ -162,163 +271,79 @@ class XRayTracer:
             return wrapper
         return decorator
     
+    def capture_aws_service_call(self, service_name: str, operation: str):
+        """Decorator to capture AWS service calls"""
+        return self._capture_tagged(
+            f"{service_name}.{operation}",
+            (('service', service_name), ('operation', operation))
+        )
+    
     def capture_document_processing(self, stage: str, document_id: str):
         """Decorator to capture document processing stages"""
-        def decorator(func: Callable) -> Callable:
-            if not self.enabled:
-                return func
-            
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                subseg = self.create_subsegment(f"document_processing.{stage}")
-                
-                if subseg:
-                    subseg.put_annotation('stage', stage)
-                    subseg.put_annotation('document_id', document_id)
-                    subseg.put_metadata('document', {
-                        'id': document_id,
-                        'stage': stage,
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
-                
-                try:
-                    result = func(*args, **kwargs)
-                    if subseg:
-                        subseg.put_annotation('status', 'completed')
-                        if isinstance(result, (list, tuple)):
-                            subseg.put_annotation('result_count', len(result))
-                    return result
-                except Exception as e:
-                    if subseg:
-                        subseg.put_annotation('status', 'failed')
-                        subseg.put_metadata('error', {
-                            'type': type(e).__name__,
-                            'message': str(e),
-                            'stage': stage,
-                            'document_id': document_id
-                        })
-                    raise
-                finally:
-                    self.end_subsegment(subseg)
-            
-            return wrapper
-        return decorator
+        def record_document(subseg):
+            subseg.put_metadata('document', {
+                'id': document_id,
+                'stage': stage,
+                'timestamp_ns': time.time_ns()
+            })
+        
+        return self._capture_tagged(
+            f"document_processing.{stage}",
+            (('stage', stage), ('document_id', document_id)),
+            error_context={'stage': stage, 'document_id': document_id},
+            statuses=('completed', 'failed'),
+            on_start=record_document,
+            on_result=_annotate_result_count('result_count')
+        )
     
     def capture_bedrock_call(self, model_id: str, operation: str):
         """Decorator to capture Bedrock API calls"""
-        def decorator(func: Callable) -> Callable:
-            if not self.enabled:
-                return func
-            
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                subseg = self.create_subsegment(f"bedrock.{operation}")
-                
-                if subseg:
-                    subseg.put_annotation('service', 'bedrock')
-                    subseg.put_annotation('model_id', model_id)
-                    subseg.put_annotation('operation', operation)
-                
-                try:
-                    result = func(*args, **kwargs)
-                    if subseg:
-                        subseg.put_annotation('status', 'success')
-                        # Add token usage if available
-                        if hasattr(result, 'get') and 'usage' in result:
-                            usage = result['usage']
-                            subseg.put_metadata('bedrock_usage', {
-                                'input_tokens': usage.get('input_tokens', 0),
-                                'output_tokens': usage.get('output_tokens', 0)
-                            })
-                    return result
-                except Exception as e:
-                    if subseg:
-                        subseg.put_annotation('status', 'error')
-                        subseg.put_metadata('bedrock_error', {
-                            'type': type(e).__name__,
-                            'message': str(e),
-                            'model_id': model_id
-                        })
-                    raise
-                finally:
-                    self.end_subsegment(subseg)
-            
-            return wrapper
-        return decorator
+        return self._capture_tagged(
+            f"bedrock.{operation}",
+            (('service', 'bedrock'), ('model_id', model_id), ('operation', operation)),
+            error_key='bedrock_error',
+            error_context={'model_id': model_id},
+            on_result=_record_bedrock_usage
+        )
     
     def capture_database_operation(self, table_name: str, operation: str):
         """Decorator to capture DynamoDB operations"""
-        def decorator(func: Callable) -> Callable:
-            if not self.enabled:
-                return func
-            
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                subseg = self.create_subsegment(f"dynamodb.{operation}")
-                
-                if subseg:
-                    subseg.put_annotation('service', 'dynamodb')
-                    subseg.put_annotation('table_name', table_name)
-                    subseg.put_annotation('operation', operation)
-                
-                try:
-                    result = func(*args, **kwargs)
-                    if subseg:
-                        subseg.put_annotation('status', 'success')
-                        if isinstance(result, (list, tuple)):
-                            subseg.put_annotation('item_count', len(result))
-                    return result
-                except Exception as e:
-                    if subseg:
-                        subseg.put_annotation('status', 'error')
-                        subseg.put_metadata('dynamodb_error', {
-                            'type': type(e).__name__,
-                            'message': str(e),
-                            'table_name': table_name,
-                            'operation': operation
-                        })
-                    raise
-                finally:
-                    self.end_subsegment(subseg)
-            
-            return wrapper
-        return decorator
+        return self._capture_tagged(
+            f"dynamodb.{operation}",
+            (('service', 'dynamodb'), ('table_name', table_name), ('operation', operation)),
+            error_key='dynamodb_error',
+            error_context={'table_name': table_name, 'operation': operation},
+            on_result=_annotate_result_count('item_count')
+        )
     
     def capture_s3_operation(self, bucket_name: str, operation: str):
         """Decorator to capture S3 operations"""
-        def decorator(func: Callable) -> Callable:
-            if not self.enabled:
-                return func
-            
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                subseg = self.create_subsegment(f"s3.{operation}")
-                
-                if subseg:
-                    subseg.put_annotation('service', 's3')
-                    subseg.put_annotation('bucket_name', bucket_name)
-                    subseg.put_annotation('operation', operation)
-                
-                try:
-                    result = func(*args, **kwargs)
-                    if subseg:
-                        subseg.put_annotation('status', 'success')
-                    return result
-                except Exception as e:
-                    if subseg:
-                        subseg.put_annotation('status', 'error')
-                        subseg.put_metadata('s3_error', {
-                            'type': type(e).__name__,
-                            'message': str(e),
-                            'bucket_name': bucket_name,
-                            'operation': operation
-                        })
-                    raise
-                finally:
-                    self.end_subsegment(subseg)
-            
-            return wrapper
-        return decorator
+        return self._capture_tagged(
+            f"s3.{operation}",
+            (('service', 's3'), ('bucket_name', bucket_name), ('operation', operation)),
+            error_key='s3_error',
+            error_context={'bucket_name': bucket_name, 'operation': operation}
+        )
+
+
+def _annotate_result_count(key: str) -> Callable[[Any, Any], None]:
+    """Build a result hook that annotates the length of list/tuple results"""
+    def annotate(subseg, result):
+        result_type = type(result)
+        if ((result_type is list or result_type is tuple)
+                and next(_result_count_calls) % RESULT_COUNT_SAMPLE_RATE == 0):
+            subseg.put_annotation(key, len(result))
+    return annotate
+
+
+def _record_bedrock_usage(subseg, result):
+    """Add token usage from a Bedrock response if available"""
+    if hasattr(result, 'get') and 'usage' in result:
+        usage = result['usage']
+        subseg.put_metadata('bedrock_usage', {
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0)
+        })
 
 
 # Global tracer instance
@@ -364,6 +389,8 @@ def trace_s3_operation(bucket_name: str, operation: str):
 class TracingContext:
     """Context manager for manual tracing"""
     
+    __slots__ = ('name', 'metadata', 'subseg')
+    
     def __init__(self, name: str, metadata: Optional[Dict[str, Any]] = None):
         self.name = name
         self.metadata = metadata
@@ -406,6 +433,8 @@ def create_tracing_context(name: str, metadata: Optional[Dict[str, Any]] = None)
 class PerformanceTracker:
     """Track performance metrics with X-Ray"""
     
+    __slots__ = ('tracer',)
+    
     def __init__(self):
         self.tracer = get_tracer()
     
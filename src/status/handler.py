@@ -3,28 +3,121 @@ Status Handler Lambda Function
 Provides real-time processing status updates
 """
 
+import hashlib
 import json
-import os
+import time
 import logging
-from typing import Dict, Any, Optional
+from enum import Enum
+from typing import Dict, Any, Optional, NamedTuple, Tuple
 from datetime import datetime
+from operator import attrgetter
+from functools import lru_cache
+from types import MappingProxyType
 
-# Import shared modules
-import sys
-sys.path.append('/opt/python')
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
+# Shared modules come from the Lambda layer (/opt/python is already on
+# sys.path in the Lambda runtime) or from a PYTHONPATH that includes them
 try:
-    from shared.dynamodb_helper import get_db_helper
+    from shared.dynamodb_helper import get_db_helper, select_current_stage
     from shared.models import ProcessingStatusRecord, Document, ProcessingStatus
 except ImportError:
-    from dynamodb_helper import get_db_helper
+    from dynamodb_helper import get_db_helper, select_current_stage
     from models import ProcessingStatusRecord, Document, ProcessingStatus
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Short-lived cache of document lookups to absorb clients polling in a tight loop
+STATUS_CACHE_TTL_SECONDS = 2.0
+STATUS_CACHE_MAX_ENTRIES = 256
+_STATUS_CACHE: Dict[str, Tuple[float, Tuple[Document, list]]] = {}
+
+# Processing pipeline stages, in order
+STAGE_ORDER = ('upload', 'analysis', 'planning', 'reporting')
+STAGE_INDEX = MappingProxyType({stage: index for index, stage in enumerate(STAGE_ORDER)})
+
+# Share of overall progress contributed by each completed stage
+STAGE_WEIGHTS = MappingProxyType({
+    'upload': 10,
+    'analysis': 40,
+    'planning': 30,
+    'reporting': 20
+})
+TOTAL_STAGE_WEIGHT = sum(STAGE_WEIGHTS.values())
+
+STAGE_NAMES = MappingProxyType({
+    'upload': 'Document Upload',
+    'analysis': 'Analyzing Document',
+    'planning': 'Generating Tasks',
+    'reporting': 'Preparing Reports',
+    'completed': 'Processing Complete'
+})
+
+# Average processing times per stage (in seconds)
+AVERAGE_STAGE_SECONDS = MappingProxyType({
+    'upload': 30,
+    'analysis': 300,  # 5 minutes
+    'planning': 120,  # 2 minutes
+    'reporting': 180  # 3 minutes
+})
+DEFAULT_STAGE_SECONDS = 120
+
+# Expected time for all stages after each stage
+REMAINING_STAGE_SECONDS = MappingProxyType({
+    stage: sum(AVERAGE_STAGE_SECONDS[later] for later in STAGE_ORDER[index + 1:])
+    for index, stage in enumerate(STAGE_ORDER)
+})
+
+# Fields read from each status record during aggregation
+_get_record_fields = attrgetter('status', 'stage', 'started_at')
+
+# The status table's range key is the stage name, so query results come back
+# in alphabetical stage order and must be sorted chronologically here
+_by_started_at = attrgetter('started_at')
+
+def _json_default(obj: Any) -> Any:
+    """Serialize values the JSON encoder does not handle natively"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    return str(obj)
+
+def _get_document_with_status(document_id: str) -> Tuple[Optional[Document], list]:
+    """Fetch a document and its status records, reusing a very recent lookup"""
+    now = time.monotonic()
+    cached = _STATUS_CACHE.get(document_id)
+    if cached and now - cached[0] < STATUS_CACHE_TTL_SECONDS:
+        return cached[1]
+    
+    document, status_records = get_db_helper().get_document_with_status(document_id)
+    if document:
+        _STATUS_CACHE.pop(document_id, None)
+        _STATUS_CACHE[document_id] = (now, (document, status_records))
+        if len(_STATUS_CACHE) > STATUS_CACHE_MAX_ENTRIES:
+            del _STATUS_CACHE[next(iter(_STATUS_CACHE))]
+    
+    return document, status_records
+
+def _status_etag(response_data: Dict[str, Any]) -> str:
+    """Weak ETag over the processing state, ignoring fields derived from the request time"""
+    state = dict(response_data, estimated_completion=None)
+    if 'stages' in state:
+        state['stages'] = [dict(stage, duration_seconds=None) for stage in state['stages']]
+    return f'W/"{hashlib.sha256(_dumps(state).encode("utf-8")).hexdigest()[:32]}"'
+
+def _dumps(data: Any) -> str:
+    """Serialize a response body, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, default=_json_default)
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for status queries
@@ -57,11 +150,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         query_params = event.get('queryStringParameters') or {}
         include_details = query_params.get('details', 'false').lower() == 'true'
         
-        # Get database helper
-        db_helper = get_db_helper()
+        # Single reference time for all duration and estimate calculations
+        now = datetime.utcnow()
         
-        # Get document information
-        document = db_helper.get_document(document_id)
+        # Get document information and processing status records
+        document, status_records = _get_document_with_status(document_id)
         if not document:
             return {
                 'statusCode': 404,
@@ -75,9 +168,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
         
-        # Get processing status records
-        status_records = db_helper.get_processing_status(document_id)
-        current_stage = db_helper.get_current_processing_stage(document_id)
+        current_stage = select_current_stage(status_records)
+        
+        # Summarize the status records once for progress and stage name
+        aggregate = _aggregate_records(status_records)
         
         # Build response data
         response_data = {
@@ -87,8 +181,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'overall_status': document.processing_status.value,
             'upload_timestamp': document.upload_timestamp.isoformat(),
             'current_stage': None,
-            'progress': calculate_progress(document.processing_status, status_records),
-            'estimated_completion': estimate_completion_time(status_records, current_stage)
+            'progress': calculate_progress(document.processing_status, status_records, aggregate),
+            'estimated_completion': estimate_completion_time(status_records, current_stage, now)
         }
         
         # Add current stage information
@@ -103,27 +197,40 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Add detailed stage information if requested
         if include_details:
-            response_data['stages'] = []
-            for record in sorted(status_records, key=lambda x: x.started_at):
-                stage_info = {
+            response_data['stages'] = [
+                {
                     'stage': record.stage,
                     'status': record.status.value,
                     'started_at': record.started_at.isoformat(),
                     'completed_at': record.completed_at.isoformat() if record.completed_at else None,
-                    'duration_seconds': calculate_duration(record),
+                    'duration_seconds': calculate_duration(record, now),
                     'error_message': record.error_message,
                     'metadata': record.metadata
                 }
-                response_data['stages'].append(stage_info)
+                for record in sorted(status_records, key=_by_started_at)
+            ]
+        
+        # Pollers send back the last ETag; an unchanged status costs a bodiless 304
+        etag = _status_etag(response_data)
+        headers = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag',
+            'Cache-Control': 'no-cache',  # Prevent caching for real-time updates
+            'ETag': etag
+        }
+        request_headers = event.get('headers') or {}
+        if_none_match = request_headers.get('If-None-Match') or request_headers.get('if-none-match')
+        if if_none_match == etag:
+            return {
+                'statusCode': 304,
+                'headers': headers,
+                'body': ''
+            }
         
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Cache-Control': 'no-cache'  # Prevent caching for real-time updates
-            },
-            'body': json.dumps(response_data, default=str)
+            'headers': {'Content-Type': 'application/json', **headers},
+            'body': _dumps(response_data)
         }
         
     except Exception as e:
@@ -140,103 +247,142 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             })
         }
 
-def calculate_progress(overall_status: ProcessingStatus, status_records: list) -> Dict[str, Any]:
+class RecordAggregate(NamedTuple):
+    """Summary of a document's status records"""
+    completed_weight: int
+    completed_count: int
+    current_stage: Optional[str]
+    latest_completed: Optional[ProcessingStatusRecord]
+
+
+def _aggregate_records(status_records: list) -> RecordAggregate:
     """
-    Calculate processing progress based on status records
+    Summarize status records in a single pass
     
     Args:
-        overall_status: Overall document processing status
         status_records: List of processing status records
         
     Returns:
-        Progress information dictionary
+        Completed stage weight and count, the first stage still processing,
+        and the completed record that started last
     """
     
-    # Define stage order and weights
-    stage_order = ['upload', 'analysis', 'planning', 'reporting', 'completed']
-    stage_weights = {
-        'upload': 10,
-        'analysis': 40,
-        'planning': 30,
-        'reporting': 20
-    }
-    
-    total_weight = sum(stage_weights.values())
     completed_weight = 0
+    completed_count = 0
+    current_stage = None
+    latest_completed = None
+    
+    latest_started_at = None
     
-    # Calculate completed weight based on status records
     for record in status_records:
-        if record.status == ProcessingStatus.COMPLETED and record.stage in stage_weights:
-            completed_weight += stage_weights[record.stage]
+        status, stage, started_at = _get_record_fields(record)
+        if status == ProcessingStatus.COMPLETED:
+            completed_count += 1
+            completed_weight += STAGE_WEIGHTS.get(stage, 0)
+            if latest_started_at is None or started_at > latest_started_at:
+                latest_completed = record
+                latest_started_at = started_at
+        elif status == ProcessingStatus.PROCESSING and current_stage is None:
+            current_stage = stage
+    
+    return RecordAggregate(completed_weight, completed_count, current_stage, latest_completed)
+
+def calculate_progress(overall_status: ProcessingStatus, status_records: list,
+                       aggregate: Optional[RecordAggregate] = None) -> Dict[str, Any]:
+    """
+    Calculate processing progress based on status records
+    
+    Args:
+        overall_status: Overall document processing status
+        status_records: List of processing status records
+        aggregate: Precomputed summary of status_records, computed if omitted
+        
+    Returns:
+        Progress information dictionary
+    """
+    
+    if aggregate is None:
+        aggregate = _aggregate_records(status_records)
+    completed_weight = aggregate.completed_weight
     
     # Calculate percentage
     if overall_status == ProcessingStatus.COMPLETED:
         percentage = 100
     elif overall_status == ProcessingStatus.FAILED:
-        percentage = max(10, int((completed_weight / total_weight) * 100))
+        percentage = max(10, int((completed_weight / TOTAL_STAGE_WEIGHT) * 100))
     else:
-        percentage = max(5, int((completed_weight / total_weight) * 100))
+        percentage = max(5, int((completed_weight / TOTAL_STAGE_WEIGHT) * 100))
     
     return {
         'percentage': percentage,
-        'completed_stages': len([r for r in status_records if r.status == ProcessingStatus.COMPLETED]),
-        'total_stages': len(stage_order) - 1,  # Exclude 'completed' as it's not a processing stage
-        'current_stage_name': get_current_stage_name(status_records)
+        'completed_stages': aggregate.completed_count,
+        'total_stages': len(STAGE_ORDER),
+        'current_stage_name': get_current_stage_name(status_records, aggregate)
     }
 
-def get_current_stage_name(status_records: list) -> Optional[str]:
+def get_current_stage_name(status_records: list, aggregate: Optional[RecordAggregate] = None) -> Optional[str]:
     """
     Get human-readable name for current processing stage
     
     Args:
         status_records: List of processing status records
+        aggregate: Precomputed summary of status_records, computed if omitted
         
     Returns:
         Human-readable stage name
     """
     
-    stage_names = {
-        'upload': 'Document Upload',
-        'analysis': 'Analyzing Document',
-        'planning': 'Generating Tasks',
-        'reporting': 'Preparing Reports',
-        'completed': 'Processing Complete'
-    }
+    if aggregate is None:
+        aggregate = _aggregate_records(status_records)
+    
+    latest_completed = aggregate.latest_completed
+    return _resolve_stage_name(
+        aggregate.current_stage,
+        latest_completed.stage if latest_completed else None
+    )
+
+@lru_cache(maxsize=1024)
+def _resolve_stage_name(processing_stage: Optional[str], latest_completed_stage: Optional[str]) -> str:
+    """
+    Resolve the display name for the current stage
+    
+    Args:
+        processing_stage: First stage still processing, if any
+        latest_completed_stage: Most recently started completed stage, if any
+        
+    Returns:
+        Human-readable stage name
+    """
     
     # Find the current stage
-    current_stage = None
-    for record in status_records:
-        if record.status == ProcessingStatus.PROCESSING:
-            current_stage = record.stage
-            break
+    current_stage = processing_stage
     
-    # If no processing stage, find the latest completed stage
+    # If no processing stage, move on from the latest completed stage
     if not current_stage:
-        completed_stages = [r for r in status_records if r.status == ProcessingStatus.COMPLETED]
-        if completed_stages:
-            latest_completed = max(completed_stages, key=lambda x: x.started_at)
+        if latest_completed_stage:
             # Determine next stage
-            stage_order = ['upload', 'analysis', 'planning', 'reporting', 'completed']
-            try:
-                current_index = stage_order.index(latest_completed.stage)
-                if current_index < len(stage_order) - 1:
-                    current_stage = stage_order[current_index + 1]
-                else:
-                    current_stage = 'completed'
-            except ValueError:
+            current_index = STAGE_INDEX.get(latest_completed_stage)
+            if current_index is not None:
+                next_index = current_index + 1
+                current_stage = STAGE_ORDER[next_index] if next_index < len(STAGE_ORDER) else 'completed'
+            elif latest_completed_stage == 'completed':
+                current_stage = 'completed'
+            else:
                 current_stage = 'analysis'  # Default fallback
         else:
             current_stage = 'upload'  # Default starting stage
     
-    return stage_names.get(current_stage, current_stage.title())
+    return STAGE_NAMES.get(current_stage, current_stage.title())
 
-def estimate_completion_time(status_records: list, current_stage: Optional[ProcessingStatusRecord]) -> Optional[str]:
+def estimate_completion_time(status_records: list, current_stage: Optional[ProcessingStatusRecord],
+                             now: Optional[datetime] = None) -> Optional[str]:
     """
     Estimate completion time based on historical processing times
     
     Args:
         status_records: List of processing status records
         current_stage: Current processing stage record
+        now: Reference time, defaults to the current UTC time
         
     Returns:
         Estimated completion time as ISO string, or None if cannot estimate
@@ -245,29 +391,15 @@ def estimate_completion_time(status_records: list, current_stage: Optional[Proce
     if not current_stage or current_stage.status != ProcessingStatus.PROCESSING:
         return None
     
-    # Average processing times per stage (in seconds)
-    average_times = {
-        'upload': 30,
-        'analysis': 300,  # 5 minutes
-        'planning': 120,  # 2 minutes
-        'reporting': 180  # 3 minutes
-    }
-    
     # Calculate remaining time for current stage
-    current_time = datetime.utcnow()
+    current_time = now or datetime.utcnow()
     elapsed_time = (current_time - current_stage.started_at).total_seconds()
     
-    stage_avg_time = average_times.get(current_stage.stage, 120)
+    stage_avg_time = AVERAGE_STAGE_SECONDS.get(current_stage.stage, DEFAULT_STAGE_SECONDS)
     remaining_current_stage = max(0, stage_avg_time - elapsed_time)
     
     # Add time for remaining stages
-    stage_order = ['upload', 'analysis', 'planning', 'reporting']
-    try:
-        current_index = stage_order.index(current_stage.stage)
-        remaining_stages = stage_order[current_index + 1:]
-        remaining_time = sum(average_times.get(stage, 120) for stage in remaining_stages)
-    except ValueError:
-        remaining_time = 0
+    remaining_time = REMAINING_STAGE_SECONDS.get(current_stage.stage, 0)
     
     total_remaining = remaining_current_stage + remaining_time
     
@@ -277,12 +409,13 @@ def estimate_completion_time(status_records: list, current_stage: Optional[Proce
     
     return None
 
-def calculate_duration(record: ProcessingStatusRecord) -> Optional[int]:
+def calculate_duration(record: ProcessingStatusRecord, now: Optional[datetime] = None) -> Optional[int]:
     """
     Calculate duration of a processing stage in seconds
     
     Args:
         record: Processing status record
+        now: Reference time for in-progress stages, defaults to the current UTC time
         
     Returns:
         Duration in seconds, or None if not completed
@@ -291,7 +424,7 @@ def calculate_duration(record: ProcessingStatusRecord) -> Optional[int]:
     if not record.completed_at:
         # Calculate current duration if still processing
         if record.status == ProcessingStatus.PROCESSING:
-            return int((datetime.utcnow() - record.started_at).total_seconds())
+            return int(((now or datetime.utcnow()) - record.started_at).total_seconds())
         return None
     
     return int((record.completed_at - record.started_at).total_seconds())
\ No newline at end of file
@@ -3,7 +3,9 @@ Upload Handler Lambda Function
 Handles PDF document uploads, validation, S3 storage, and processing pipeline initiation
 """
 
+import io
 import json
+import re
 import base64
 import boto3
 import uuid
@@ -11,9 +13,22 @@ from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 import logging
 import os
-import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Import shared models and config
 import sys
 sys.path.append('/opt/python')
@@ -22,7 +37,6 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 from models import Document, ProcessingStatus, ProcessingStatusRecord
 from config import Config
 from dynamodb_helper import DynamoDBHelper
-from notification_service import get_notification_service, NotificationType
 from error_handler import (
     with_retry, with_circuit_breaker, handle_aws_error, send_to_dead_letter_queue,
     log_and_metric_error, ErrorCategory, RetryableError, NonRetryableError
@@ -36,10 +50,45 @@ from xray_tracing import (
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Characters replaced with '_' in filenames used as part of an S3 key
+FILENAME_SANITIZE_TABLE = str.maketrans({' ': '_', '/': '_', '\\': '_', '\x00': '_'})
+
+# Trailing bytes searched for the %%EOF marker
+PDF_TRAILER_WINDOW = 4096
+
+# Allowance for the multipart framing around the file when pre-checking the body size
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Base64 characters decoded per step; a multiple of 4 so each window decodes on its own
+B64_DECODE_WINDOW = 64 * 1024
+
+# filename parameter of a part's form-data Content-Disposition header, double-, single- or unquoted
+FILENAME_PATTERN = re.compile(
+    rb'^Content-Disposition:[ \t]*form-data[^\r\n]*?\bfilename=(?:"([^"]*)"|\'([^\']*)\'|([^;\r\n]*))',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# boundary parameter of the request Content-Type, quoted or bare
+BOUNDARY_PATTERN = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))')
+
+# Longest the response waits for the upload notification publish to complete
+NOTIFICATION_FLUSH_TIMEOUT_SECONDS = 0.5
+
+# Uploads at or above this size use concurrent multipart transfers instead of one PutObject
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
 # Initialize AWS clients lazily
 s3_client = None
 sqs_client = None
 dynamodb_helper = None
+io_executor = None
+account_id = None
 
 def get_s3_client():
     global s3_client
@@ -60,6 +109,27 @@ def get_dynamodb_helper():
     return dynamodb_helper
 
 
+def get_account_id():
+    global account_id
+    if account_id is None:
+        account_id = boto3.client('sts').get_caller_identity()['Account']
+    return account_id
+
+
+def get_io_executor():
+    global io_executor
+    if io_executor is None:
+        io_executor = ThreadPoolExecutor(max_workers=3)
+    return io_executor
+
+
+def _dumps(data: Any) -> str:
+    """Serialize a queue message or response body, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data).decode('utf-8')
+    return json.dumps(data)
+
+
 class UploadError(Exception):
     """Custom exception for upload errors"""
     def __init__(self, message: str, status_code: int = 400):
@@ -71,6 +141,14 @@ class UploadError(Exception):
 class FileValidator:
     """File validation utilities"""
     
+    @staticmethod
+    def validate(file_content: bytes, filename: str) -> bool:
+        """Run the size, format and content checks on an uploaded file"""
+        FileValidator.validate_file_size(len(file_content))
+        FileValidator.validate_file_format(file_content, filename)
+        FileValidator.validate_file_content(file_content)
+        return True
+    
     @staticmethod
     def validate_file_format(file_content: bytes, filename: str) -> bool:
         """Validate file format using magic numbers and filename extension"""
@@ -79,12 +157,6 @@ class FileValidator:
             if not filename.lower().endswith('.pdf'):
                 raise UploadError("Only PDF files are supported", 400)
             
-            # Check MIME type using mimetypes
-            mime_type, _ = mimetypes.guess_type(filename)
-            if mime_type != 'application/pdf':
-                # Additional check for PDF magic number since mimetypes might not be reliable
-                pass  # We'll rely on the PDF magic number check below
-            
             # Check PDF magic number
             if not file_content.startswith(b'%PDF-'):
                 raise UploadError("Invalid PDF file format", 400)
@@ -114,11 +186,11 @@ class FileValidator:
     def validate_file_content(file_content: bytes) -> bool:
         """Validate PDF file content integrity"""
         try:
-            # Check for PDF trailer
-            if b'%%EOF' not in file_content:
+            # Check for PDF trailer, which readers only look for near the end of the file
+            if file_content.find(b'%%EOF', max(len(file_content) - PDF_TRAILER_WINDOW, 0)) == -1:
                 raise UploadError("Invalid PDF file: missing EOF marker", 400)
             
-            # Check minimum PDF structure
+            # Check minimum PDF structure (both searches stop at the first object)
             if b'obj' not in file_content or b'endobj' not in file_content:
                 raise UploadError("Invalid PDF file: missing object structure", 400)
             
@@ -135,34 +207,49 @@ class S3Uploader:
     """S3 upload utilities"""
     
     @staticmethod
-    def generate_s3_key(user_id: str, filename: str, document_id: str) -> str:
+    def generate_s3_key(user_id: str, filename: str, document_id: str, now: Optional[datetime] = None) -> str:
         """Generate S3 key for document storage"""
-        timestamp = datetime.utcnow().strftime('%Y/%m/%d')
-        safe_filename = filename.replace(' ', '_').replace('/', '_')
-        return f"documents/{user_id}/{timestamp}/{document_id}_{safe_filename}"
+        now = now or datetime.utcnow()
+        safe_filename = filename.translate(FILENAME_SANITIZE_TABLE)
+        return f"documents/{user_id}/{now.year:04d}/{now.month:02d}/{now.day:02d}/{document_id}_{safe_filename}"
     
     @staticmethod
     @with_retry(max_attempts=3)
     @with_circuit_breaker('s3_upload', failure_threshold=5, recovery_timeout=60)
     @trace_s3_operation(Config.DOCUMENTS_BUCKET, 'put_object')
-    def upload_to_s3(file_content: bytes, s3_key: str, filename: str, user_id: str) -> bool:
+    def upload_to_s3(file_content: bytes, s3_key: str, filename: str, user_id: str,
+                     uploaded_at: Optional[datetime] = None) -> bool:
         """Upload file to S3 with metadata"""
         try:
             metadata = {
                 'original-filename': filename,
                 'uploaded-by': user_id,
-                'upload-timestamp': datetime.utcnow().isoformat(),
+                'upload-timestamp': (uploaded_at or datetime.utcnow()).isoformat(),
                 'content-type': 'application/pdf'
             }
             
-            get_s3_client().put_object(
-                Bucket=Config.DOCUMENTS_BUCKET,
-                Key=s3_key,
-                Body=file_content,
-                ContentType='application/pdf',
-                Metadata=metadata,
-                ServerSideEncryption='AES256'
-            )
+            if len(file_content) >= S3_MULTIPART_THRESHOLD:
+                # Large files go up as multipart parts sent over several connections at once
+                get_s3_client().upload_fileobj(
+                    io.BytesIO(file_content),
+                    Config.DOCUMENTS_BUCKET,
+                    s3_key,
+                    ExtraArgs={
+                        'ContentType': 'application/pdf',
+                        'Metadata': metadata,
+                        'ServerSideEncryption': 'AES256'
+                    },
+                    Config=S3_TRANSFER_CONFIG
+                )
+            else:
+                get_s3_client().put_object(
+                    Bucket=Config.DOCUMENTS_BUCKET,
+                    Key=s3_key,
+                    Body=file_content,
+                    ContentType='application/pdf',
+                    Metadata=metadata,
+                    ServerSideEncryption='AES256'
+                )
             
             logger.info(f"Successfully uploaded file to S3: {s3_key}")
             return True
@@ -181,14 +268,15 @@ class ProcessingPipeline:
     @staticmethod
     @with_retry(max_attempts=3)
     @trace_aws_service('sqs', 'send_message')
-    def send_to_analysis_queue(document_id: str, s3_key: str, user_id: str) -> bool:
+    def send_to_analysis_queue(document_id: str, s3_key: str, user_id: str,
+                               timestamp: Optional[datetime] = None) -> bool:
         """Send message to analysis queue to start processing"""
         try:
             message = {
                 'document_id': document_id,
                 's3_key': s3_key,
                 'user_id': user_id,
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': (timestamp or datetime.utcnow()).isoformat(),
                 'stage': 'analysis'
             }
             
@@ -198,13 +286,16 @@ class ProcessingPipeline:
                 # Fallback to constructing URL if not provided
                 queue_name = Config.ANALYSIS_QUEUE
                 if queue_name:
-                    queue_url = f"https://sqs.{Config.AWS_REGION}.amazonaws.com/{boto3.client('sts').get_caller_identity()['Account']}/{queue_name}"
+                    queue_url = f"https://sqs.{Config.AWS_REGION}.amazonaws.com/{get_account_id()}/{queue_name}"
                 else:
                     raise UploadError("Analysis queue not configured", 500)
             
+            # A plain SendMessage on purpose: Lambda runs one invocation per container, so
+            # there is never a second message to coalesce into SendMessageBatch, and holding
+            # messages in a buffer would risk losing them when the container is frozen
             response = get_sqs_client().send_message(
                 QueueUrl=queue_url,
-                MessageBody=json.dumps(message),
+                MessageBody=_dumps(message),
                 MessageAttributes={
                     'document_id': {
                         'StringValue': document_id,
@@ -253,6 +344,46 @@ def extract_user_id_from_context(event: Dict[str, Any]) -> str:
         raise UploadError("Authentication error", 401)
 
 
+def _b64decode(data) -> bytes:
+    """Decode a base64 request body, using the SIMD decoder when available"""
+    if PYBASE64_AVAILABLE:
+        # API Gateway produces well-formed base64, so skip validation for the fast path
+        return pybase64.b64decode(data, validate=False)
+    return base64.b64decode(data)
+
+
+def _decode_base64_body(body: str, boundary_bytes: bytes) -> bytearray:
+    """
+    Decode a base64 multipart body window by window, stopping as soon as the
+    boundary closing the file part has been decoded
+    """
+    decoded = bytearray()
+    file_header = header_end = -1
+    overlap = len(boundary_bytes) + len(b'filename=')
+    
+    for offset in range(0, len(body), B64_DECODE_WINDOW):
+        # Re-scan a short tail so markers split across windows are still found
+        scan_from = max(len(decoded) - overlap, 0)
+        decoded += _b64decode(body[offset:offset + B64_DECODE_WINDOW])
+        
+        if file_header == -1:
+            file_header = decoded.find(b'filename=', scan_from)
+            if file_header == -1:
+                continue
+            scan_from = file_header
+        
+        if header_end == -1:
+            header_end = decoded.find(b'\r\n\r\n', scan_from)
+            if header_end == -1:
+                continue
+            scan_from = header_end
+        
+        if decoded.find(boundary_bytes, scan_from) != -1:
+            break
+    
+    return decoded
+
+
 def parse_multipart_form_data(event: Dict[str, Any]) -> Tuple[bytes, str]:
     """Parse multipart form data from API Gateway event"""
     try:
@@ -260,13 +391,6 @@ def parse_multipart_form_data(event: Dict[str, Any]) -> Tuple[bytes, str]:
         body = event.get('body', '')
         headers = event.get('headers', {})
         
-        # Check if body is base64 encoded
-        is_base64_encoded = event.get('isBase64Encoded', False)
-        if is_base64_encoded:
-            body = base64.b64decode(body)
-        else:
-            body = body.encode('utf-8') if isinstance(body, str) else body
-        
         # Get content type
         content_type = headers.get('content-type') or headers.get('Content-Type', '')
         
@@ -274,43 +398,55 @@ def parse_multipart_form_data(event: Dict[str, Any]) -> Tuple[bytes, str]:
             raise UploadError("Content-Type must be multipart/form-data", 400)
         
         # Extract boundary
-        boundary = None
-        for part in content_type.split(';'):
-            if 'boundary=' in part:
-                boundary = part.split('boundary=')[1].strip()
-                break
+        match = BOUNDARY_PATTERN.search(content_type)
+        boundary = (match.group(1) or match.group(2)) if match else None
         
         if not boundary:
             raise UploadError("Missing boundary in multipart data", 400)
         
         # Parse multipart data
         boundary_bytes = f'--{boundary}'.encode()
-        parts = body.split(boundary_bytes)
+        
+        # Check if body is base64 encoded
+        is_base64_encoded = event.get('isBase64Encoded', False)
+        
+        # Reject oversize uploads from the encoded length, before paying for the decode
+        body_size = len(body) * 3 // 4 if is_base64_encoded else len(body)
+        if body_size > Config.MAX_FILE_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES:
+            raise UploadError(f"File size exceeds maximum limit of {Config.MAX_FILE_SIZE_MB}MB", 413)
+        
+        if is_base64_encoded:
+            body = _decode_base64_body(body, boundary_bytes)
+        else:
+            body = body.encode('utf-8') if isinstance(body, str) else body
         
         file_content = None
         filename = None
         
-        for part in parts:
-            if b'Content-Disposition: form-data' in part and b'filename=' in part:
+        # Walk part boundaries by offset so the body is never copied into a list of parts
+        part_start = body.find(boundary_bytes)
+        while part_start != -1:
+            part_start += len(boundary_bytes)
+            next_boundary = body.find(boundary_bytes, part_start)
+            part_end = next_boundary if next_boundary != -1 else len(body)
+            
+            header_end = body.find(b'\r\n\r\n', part_start, part_end)
+            # Only the part headers are scanned, never the file bytes behind them
+            match = FILENAME_PATTERN.search(body, part_start, header_end) if header_end != -1 else None
+            
+            if match:
                 # Extract filename
-                lines = part.split(b'\r\n')
-                for line in lines:
-                    if b'Content-Disposition' in line:
-                        # Parse filename from Content-Disposition header
-                        line_str = line.decode('utf-8', errors='ignore')
-                        if 'filename=' in line_str:
-                            filename_part = line_str.split('filename=')[1]
-                            filename = filename_part.strip('"').strip("'")
-                            break
+                filename = next(group for group in match.groups() if group is not None)
+                filename = filename.decode('utf-8', errors='ignore')
                 
-                # Extract file content (after double CRLF)
-                content_start = part.find(b'\r\n\r\n')
-                if content_start != -1:
-                    file_content = part[content_start + 4:]
-                    # Remove trailing boundary markers
-                    if file_content.endswith(b'\r\n'):
-                        file_content = file_content[:-2]
+                # Extract file content (after double CRLF), dropping the CRLF before the next boundary
+                content_start = header_end + 4
+                if body.endswith(b'\r\n', content_start, part_end):
+                    part_end -= 2
+                file_content = bytes(memoryview(body)[content_start:part_end])
                 break
+            
+            part_start = next_boundary
         
         if not file_content or not filename:
             raise UploadError("No file found in request", 400)
@@ -333,7 +469,14 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Validate configuration
         Config.validate()
         
-        logger.info(f"Processing upload request: {json.dumps(event, default=str)}")
+        # Never log the body: it carries the whole base64-encoded file
+        logger.info(
+            f"Processing upload request: path={event.get('path')}, "
+            f"base64={event.get('isBase64Encoded', False)}, body_length={len(event.get('body') or '')}"
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            request_fields = {key: value for key, value in event.items() if key != 'body'}
+            logger.debug(f"Upload request fields: {json.dumps(request_fields, default=str)}")
         
         # Extract user ID from request context
         user_id = extract_user_id_from_context(event)
@@ -345,22 +488,24 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         logger.info(f"Received file: {filename}, size: {file_size} bytes, user: {user_id}")
         
         # Validate file
-        FileValidator.validate_file_size(file_size)
-        FileValidator.validate_file_format(file_content, filename)
-        FileValidator.validate_file_content(file_content)
+        FileValidator.validate(file_content, filename)
+        
+        # One timestamp for the S3 key, object metadata, records and queue message
+        now = datetime.utcnow()
         
         # Generate document ID and S3 key
         document_id = Document.generate_id()
-        s3_key = S3Uploader.generate_s3_key(user_id, filename, document_id)
+        s3_key = S3Uploader.generate_s3_key(user_id, filename, document_id, now)
         
-        # Create document record
+        # Create document record; it is written as PROCESSING up front because the
+        # analysis message is sent alongside it rather than after it
         document = Document(
             document_id=document_id,
             filename=filename,
-            upload_timestamp=datetime.utcnow(),
+            upload_timestamp=now,
             file_size=file_size,
             s3_key=s3_key,
-            processing_status=ProcessingStatus.UPLOADED,
+            processing_status=ProcessingStatus.PROCESSING,
             user_id=user_id,
             metadata={
                 'content_type': 'application/pdf',
@@ -369,18 +514,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         )
         
         # Upload to S3
-        S3Uploader.upload_to_s3(file_content, s3_key, filename, user_id)
-        
-        # Save document record to DynamoDB
-        get_dynamodb_helper().put_item(Config.DOCUMENTS_TABLE, document.to_dynamodb_item())
+        S3Uploader.upload_to_s3(file_content, s3_key, filename, user_id, now)
         
         # Create initial processing status record
-        status_record = ProcessingStatusRecord(
+        status_record = ProcessingStatusRecord.mark_completed(
             document_id=document_id,
             stage='upload',
-            status=ProcessingStatus.COMPLETED,
-            started_at=datetime.utcnow(),
-            completed_at=datetime.utcnow(),
+            started_at=now,
             metadata={
                 'file_size': file_size,
                 'filename': filename,
@@ -388,22 +528,42 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             }
         )
         
-        get_dynamodb_helper().put_item(Config.PROCESSING_STATUS_TABLE, status_record.to_dynamodb_item())
-        
-        # Send to analysis queue
-        ProcessingPipeline.send_to_analysis_queue(document_id, s3_key, user_id)
-        
-        # Update document status to processing
-        document.processing_status = ProcessingStatus.PROCESSING
-        get_dynamodb_helper().put_item(Config.DOCUMENTS_TABLE, document.to_dynamodb_item())
-        
-        # Send upload notification
+        # Save both records in one batch while sending to the analysis queue
+        db_helper = get_dynamodb_helper()
+        executor = get_io_executor()
+        records_future = executor.submit(db_helper.batch_put, [
+            (Config.DOCUMENTS_TABLE, document.to_dynamodb_item()),
+            (Config.PROCESSING_STATUS_TABLE, status_record.to_dynamodb_item())
+        ])
+        queue_future = executor.submit(ProcessingPipeline.send_to_analysis_queue, document_id, s3_key, user_id, now)
+        
+        if not records_future.result():
+            # Without its records the analyzer and status endpoint cannot find the document.
+            # Let the in-flight queue send settle before the container can be frozen
+            queue_future.exception()
+            logger.error(f"Failed to save document records: {document_id}")
+            raise UploadError("Failed to save document records", 500)
+        
+        # Send upload notification while the queue send is in flight, publishing on the service's
+        # background pool. Imported here to keep it out of cold-start initialization
+        from notification_service import get_notification_service, NotificationType, flush_notifications
         notification_service = get_notification_service()
         notification_service.send_document_notification(
             document=document,
-            notification_type=NotificationType.DOCUMENT_UPLOADED
+            notification_type=NotificationType.DOCUMENT_UPLOADED,
+            async_publish=True
         )
         
+        try:
+            queue_future.result()
+        except Exception:
+            # Don't leave the document stuck in PROCESSING when its analysis never started
+            db_helper.update_document_status(document_id, ProcessingStatus.FAILED)
+            raise
+        
+        # Give the publish a bounded chance to finish before Lambda freezes the container
+        flush_notifications(timeout=NOTIFICATION_FLUSH_TIMEOUT_SECONDS)
+        
         # Return success response
         response = {
             'statusCode': 200,
@@ -413,7 +573,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                 'Access-Control-Allow-Methods': 'POST,OPTIONS'
             },
-            'body': json.dumps({
+            'body': _dumps({
                 'success': True,
                 'message': 'Document uploaded successfully',
                 'data': {
@@ -439,7 +599,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                 'Access-Control-Allow-Methods': 'POST,OPTIONS'
             },
-            'body': json.dumps({
+            'body': _dumps({
                 'success': False,
                 'error': e.message
             })
@@ -455,7 +615,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
                 'Access-Control-Allow-Methods': 'POST,OPTIONS'
             },
-            'body': json.dumps({
+            'body': _dumps({
                 'success': False,
                 'error': 'Internal server error'
             })
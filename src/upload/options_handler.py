@@ -5,20 +5,23 @@ OPTIONS handler for CORS preflight requests
 import json
 from typing import Dict, Any
 
+# The preflight response never varies, so build and serialize it once per container
+_CORS_RESPONSE = {
+    'statusCode': 200,
+    'headers': {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Methods': 'POST,OPTIONS',
+        'Access-Control-Max-Age': '86400'
+    },
+    'body': json.dumps({
+        'message': 'CORS preflight response'
+    })
+}
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Handle OPTIONS requests for CORS preflight
     """
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS',
-            'Access-Control-Max-Age': '86400'
-        },
-        'body': json.dumps({
-            'message': 'CORS preflight response'
-        })
-    }
\ No newline at end of file
+    return _CORS_RESPONSE
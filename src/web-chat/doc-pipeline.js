@@ -0,0 +1,901 @@
+/*
+ * Document upload, processing and results for the EnergyGrid.AI Compliance Copilot chat page.
+ * The page imports this module the first time a visitor picks or drops a file and mixes
+ * these methods into ComplianceCopilot, so they run with the copilot as `this`.
+ */
+
+// Completed analyses are remembered in this browser by file content, so dropping the same PDF again reuses them
+const ANALYSIS_CACHE_PREFIX = 'copilot:analysis:';
+// Byte sizes of the remembered analyses; a file of any other size cannot match, so it is never read just to hash it
+const ANALYSIS_SIZES_KEY = 'copilot:analysis-sizes';
+
+// Hashing runs in a short-lived worker, so reading the whole file neither blocks the page nor stays in its heap
+const HASH_WORKER_SOURCE = `
+self.onmessage = async (event) => {
+    try {
+        const digest = await crypto.subtle.digest('SHA-256', await event.data.arrayBuffer());
+        self.postMessage({ hash: Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('') });
+    } catch (error) {
+        self.postMessage({ error: error.message });
+    }
+};
+`;
+
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+
+// For user-supplied text (file names) that has to sit inside an HTML message
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, (ch) => HTML_ESCAPES[ch]);
+}
+
+function createTemplate(html) {
+    const template = document.createElement('template');
+    template.innerHTML = html;
+    return template;
+}
+
+// Scaffold for one severity/priority group in the obligations and tasks messages
+const BUCKET_TEMPLATE = createTemplate('<div style="padding: 15px; border-radius: 8px; margin: 10px 0;"><strong></strong><br></div>');
+
+const OBLIGATION_BUCKETS = [
+    { key: 'critical', label: '🔴 CRITICAL', background: '#ffebee', border: '4px solid #f44336' },
+    { key: 'high', label: '🟡 HIGH', background: '#fff3e0', border: '4px solid #ff9800' },
+    { key: 'medium', label: '🟣 MEDIUM', background: '#f3e5f5', border: '4px solid #9c27b0' },
+    { key: 'low', label: '🟢 LOW', background: '#e8f5e8', border: '4px solid #4caf50' }
+];
+
+const TASK_BUCKETS = [
+    { key: 'urgent', label: '🔥 URGENT', background: '#ffebee', dueDates: true },
+    { key: 'high', label: '📅 HIGH PRIORITY', background: '#fff3e0', dueDates: true },
+    { key: 'normal', label: '📋 NORMAL', background: '#f3e5f5' }
+];
+
+// Builds a grouped list as detached nodes; item text comes from the analysis and is only ever set as text
+function buildGroupedMessage(icon, title, buckets, grouped, linesFor, footer) {
+    const fragment = document.createDocumentFragment();
+    const heading = document.createElement('strong');
+    heading.textContent = title;
+    fragment.append(`${icon} `, heading, document.createElement('br'), document.createElement('br'));
+
+    for (const bucketConfig of buckets) {
+        const items = grouped[bucketConfig.key];
+        if (items.length === 0) continue;
+
+        const bucket = BUCKET_TEMPLATE.content.firstElementChild.cloneNode(true);
+        bucket.style.background = bucketConfig.background;
+        if (bucketConfig.border) {
+            bucket.style.borderLeft = bucketConfig.border;
+        }
+        bucket.firstElementChild.textContent = `${bucketConfig.label} (${items.length} items):`;
+
+        for (const item of items) {
+            for (const line of linesFor(item, bucketConfig)) {
+                const row = document.createElement('div');
+                row.textContent = line;
+                bucket.appendChild(row);
+            }
+        }
+        fragment.appendChild(bucket);
+    }
+
+    const closing = document.createElement('p');
+    closing.appendChild(document.createElement('strong')).textContent = footer;
+    fragment.appendChild(closing);
+    return fragment;
+}
+
+function hashInWorker(file) {
+    return new Promise((resolve, reject) => {
+        const url = URL.createObjectURL(new Blob([HASH_WORKER_SOURCE], { type: 'text/javascript' }));
+        const worker = new Worker(url);
+        const finish = () => {
+            worker.terminate();
+            URL.revokeObjectURL(url);
+        };
+
+        worker.onmessage = ({ data }) => {
+            finish();
+            if (data.error) {
+                reject(new Error(data.error));
+            } else {
+                resolve(data.hash);
+            }
+        };
+        worker.onerror = (event) => {
+            finish();
+            reject(new Error(event.message || 'Hash worker failed'));
+        };
+
+        // A File is structured-cloned by reference; the worker reads the bytes itself
+        worker.postMessage(file);
+    });
+}
+
+export const documentPipeline = {
+    async analyzeDocument(file) {
+        // Skip the upload and every agent pass if this exact document was analyzed before
+        const contentHash = this.knownAnalysisSizes().includes(file.size) ? await this.hashFile(file) : null;
+        const previousDocumentId = contentHash && this.recallAnalysis(contentHash);
+        if (previousDocumentId && await this.showPreviousAnalysis(file, contentHash, previousDocumentId)) {
+            return;
+        }
+
+        // Show progress
+        this.showProgress();
+
+        // Process with real API
+        await this.processDocumentWithRealAPI(file, contentHash);
+    },
+
+    async hashFile(file) {
+        // SubtleCrypto only exists on secure origins. It has no incremental digest, so this is the one place
+        // the whole file is read into memory; the upload itself streams the File from disk
+        if (!(window.crypto && crypto.subtle)) return null;
+
+        if (window.Worker) {
+            try {
+                return await hashInWorker(file);
+            } catch (error) {
+                // Workers can be unavailable (e.g. blocked blob: URLs); hash on the page instead
+            }
+        }
+
+        const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+    },
+
+    recallAnalysis(contentHash) {
+        try {
+            return localStorage.getItem(ANALYSIS_CACHE_PREFIX + contentHash);
+        } catch (error) {
+            return null;
+        }
+    },
+
+    knownAnalysisSizes() {
+        try {
+            return JSON.parse(localStorage.getItem(ANALYSIS_SIZES_KEY)) || [];
+        } catch (error) {
+            return [];
+        }
+    },
+
+    rememberAnalysis(contentHash, documentId, size) {
+        try {
+            localStorage.setItem(ANALYSIS_CACHE_PREFIX + contentHash, documentId);
+            const sizes = this.knownAnalysisSizes();
+            if (!sizes.includes(size)) {
+                sizes.push(size);
+                localStorage.setItem(ANALYSIS_SIZES_KEY, JSON.stringify(sizes));
+            }
+        } catch (error) {
+            // Storage may be full or disabled; the next drop of this file is simply analyzed again
+        }
+    },
+
+    forgetAnalysis(contentHash) {
+        try {
+            localStorage.removeItem(ANALYSIS_CACHE_PREFIX + contentHash);
+        } catch (error) {
+            // Nothing to forget if storage is unavailable
+        }
+    },
+
+    async showPreviousAnalysis(file, contentHash, documentId) {
+        const results = await this.getFinalResults(documentId);
+        if (results.error || (results.obligations_count === 0 && results.tasks_count === 0)) {
+            // The earlier results are no longer available, so analyze the document afresh
+            this.forgetAnalysis(contentHash);
+            return false;
+        }
+
+        this.addMessage(`♻️ <strong>This document was already analyzed</strong><br>Showing the results for document ${documentId} instead of processing it again.`);
+        this.showRealResults(file.name, documentId, results);
+        return true;
+    },
+
+    async processDocumentWithRealAPI(file, contentHash) {
+        // Step 1: Upload to real backend
+        this.addMessage(`🚀 <strong>Starting analysis of "${escapeHtml(file.name)}"</strong><br><br>Uploading to AWS and processing through real AI agents...`);
+
+        try {
+            await this.updateProgress(10, 'Uploading document to AWS S3...');
+
+            // Real API call to upload document
+            const uploadResult = await this.uploadDocumentToAPI(file);
+
+            if (!uploadResult.success) {
+                throw new Error(uploadResult.error || 'Upload failed');
+            }
+
+            const documentId = uploadResult.document_id;
+            this.addMessage(`✅ <strong>Document uploaded successfully!</strong><br>Document ID: ${documentId}<br><br>Starting AI agent processing...`);
+
+            // Step 2: Monitor real processing
+            await this.updateProgress(20, 'Initializing AI agents...');
+            this.showAgentStatus();
+
+            // Poll for real processing status
+            const finalResults = await this.pollProcessingStatus(documentId);
+
+            // Show real results
+            this.showRealResults(file.name, documentId, finalResults);
+            if (!finalResults.error) {
+                // Hash now if it was skipped up front, when the upload no longer competes for the file
+                const resultHash = contentHash || await this.hashFile(file);
+                if (resultHash) {
+                    this.rememberAnalysis(resultHash, documentId, file.size);
+                }
+            }
+
+        } catch (error) {
+            this.handleProcessingError(error);
+        }
+    },
+
+    async simulateAnalysisResults() {
+        const obligations = Math.floor(Math.random() * 15) + 8; // 8-22 obligations
+
+        this.updateAgentStatus(0, 'completed');
+
+        this.addMessage(`✅ <strong>Analysis Complete!</strong><br><br>
+            🔍 <strong>Analyzer Agent found:</strong><br>
+            • ${obligations} compliance obligations<br>
+            • 3 critical priority items<br>
+            • 5 high priority items<br>
+            • ${obligations - 8} medium/low priority items<br><br>
+
+            <strong>Sample obligations extracted:</strong><br>
+            • "Submit quarterly emissions reports by March 31st"<br>
+            • "Conduct annual safety equipment inspections"<br>
+            • "Maintain incident response documentation"<br><br>
+
+            Moving to task planning...`);
+
+        return obligations;
+    },
+
+    async simulatePlanningResults(obligations) {
+        const tasks = Math.floor(obligations * 1.8); // ~1.8 tasks per obligation
+
+        this.updateAgentStatus(1, 'completed');
+
+        this.addMessage(`✅ <strong>Planning Complete!</strong><br><br>
+            📋 <strong>Planner Agent generated:</strong><br>
+            • ${tasks} specific action items<br>
+            • Assigned priorities and deadlines<br>
+            • Identified responsible parties<br>
+            • Created timeline dependencies<br><br>
+
+            <strong>Sample tasks created:</strong><br>
+            • "Collect Q1 emissions data by March 15th → Environmental Team"<br>
+            • "Schedule safety inspection by February 28th → Operations Manager"<br>
+            • "Update incident response procedures by April 1st → Safety Officer"<br><br>
+
+            Generating final reports...`);
+
+        return tasks;
+    },
+
+    showFinalResults(filename, obligations, tasks) {
+        const reports = 3;
+
+        this.addMessage(`🎉 <strong>All Done! Your compliance analysis is complete.</strong><br><br>
+
+            <div class="results-summary">
+                <h3 style="margin-bottom: 15px; color: #333;">📊 Analysis Summary for "${escapeHtml(filename)}"</h3>
+
+                <div class="results-grid">
+                    <div class="result-item">
+                        <div class="result-number">${obligations}</div>
+                        <div class="result-label">Obligations Found</div>
+                    </div>
+                    <div class="result-item">
+                        <div class="result-number">${tasks}</div>
+                        <div class="result-label">Tasks Generated</div>
+                    </div>
+                    <div class="result-item">
+                        <div class="result-number">${reports}</div>
+                        <div class="result-label">Reports Created</div>
+                    </div>
+                    <div class="result-item">
+                        <div class="result-number">94%</div>
+                        <div class="result-label">Confidence Score</div>
+                    </div>
+                </div>
+
+                <div class="quick-actions">
+                    <button class="action-button" data-action="view-obligations">📋 View Obligations</button>
+                    <button class="action-button" data-action="view-tasks">✅ View Tasks</button>
+                    <button class="action-button" data-action="download-report">📄 Download Report</button>
+                    <button class="action-button" data-action="start-new">🔄 Analyze Another Document</button>
+                </div>
+            </div>
+
+            <p><strong>What's next?</strong> You can view detailed results, download reports, or upload another document for analysis!</p>`);
+    },
+
+    showAgentStatus() {
+        const statusHtml = `
+            <div class="agent-status">
+                <div class="agent-item">
+                    <div class="agent-icon processing" id="agent0">🔍</div>
+                    <div class="agent-name">Analyzer</div>
+                    <div class="agent-status-text" id="status0">Processing...</div>
+                </div>
+                <div class="agent-item">
+                    <div class="agent-icon pending" id="agent1">📋</div>
+                    <div class="agent-name">Planner</div>
+                    <div class="agent-status-text" id="status1">Waiting...</div>
+                </div>
+                <div class="agent-item">
+                    <div class="agent-icon pending" id="agent2">📊</div>
+                    <div class="agent-name">Reporter</div>
+                    <div class="agent-status-text" id="status2">Waiting...</div>
+                </div>
+            </div>`;
+
+        this.trackAgentStatus(this.addMessage(`<strong>🤖 AI Agents Status:</strong><br>${statusHtml}`));
+    },
+
+    trackAgentStatus(messageDiv) {
+        // Hold on to the status elements so stage updates touch them directly, even before the message is attached
+        this.agentStatus = {
+            node: messageDiv,
+            entry: messageDiv.messageEntry,
+            icons: Array.from(messageDiv.querySelectorAll('.agent-icon')),
+            texts: Array.from(messageDiv.querySelectorAll('.agent-status-text'))
+        };
+    },
+
+    updateAgentStatus(agentIndex, status) {
+        // Applied with the frame's other DOM writes, ahead of the frame's layout reads
+        this.scheduleWrite(() => this.applyAgentStatus(agentIndex, status));
+    },
+
+    applyAgentStatus(agentIndex, status) {
+        if (!this.agentStatus) return;
+
+        const { node, entry } = this.agentStatus;
+        if (node.messageEntry !== entry) {
+            // The message window recycled the node; pick the message up again if it is attached
+            const index = this.messages.indexOf(entry);
+            if (index < this.visibleRange.start || index >= this.visibleRange.end) return;
+            this.trackAgentStatus(this.messageNodes(index, index + 1)[0]);
+        }
+
+        const agentIcon = this.agentStatus.icons[agentIndex];
+        const statusText = this.agentStatus.texts[agentIndex];
+
+        if (agentIcon && statusText) {
+            agentIcon.className = `agent-icon ${status}`;
+
+            switch(status) {
+                case 'processing':
+                    statusText.textContent = 'Processing...';
+                    break;
+                case 'completed':
+                    statusText.textContent = 'Completed ✓';
+                    break;
+                default:
+                    statusText.textContent = 'Waiting...';
+            }
+        }
+    },
+
+    showProgress() {
+        this.progressContainer.style.display = 'block';
+        this.fileUploadArea.style.display = 'none';
+    },
+
+    hideProgress() {
+        this.progressContainer.style.display = 'none';
+        this.fileUploadArea.style.display = 'block';
+    },
+
+    updateProgress(percent, text) {
+        // Only the latest progress in a frame is drawn, together with the frame's other DOM writes
+        this.pendingProgress = { percent, text };
+        if (this.progressScheduled) return;
+
+        this.progressScheduled = true;
+        this.scheduleWrite(() => {
+            this.progressScheduled = false;
+            const { percent, text } = this.pendingProgress;
+            const width = percent + '%';
+            if (this.progressFill.style.width !== width) {
+                this.progressFill.style.width = width;
+            }
+            if (this.progressText.textContent !== text) {
+                this.progressText.textContent = text;
+            }
+        });
+    },
+
+    // Action handlers for real data
+
+    showRealObligations(documentId) {
+        if (!this.lastResults || !this.lastResults.obligations) {
+            this.addMessage(`📋 <strong>Loading obligations for document ${documentId}...</strong><br><br>
+                Fetching real compliance obligations extracted by AWS Nova AI...`);
+
+            // Fetch real obligations
+            this.fetchAndShowObligations(documentId);
+            return;
+        }
+
+        const obligations = this.lastResults.obligations;
+
+        if (obligations.length === 0) {
+            this.addMessage(`📋 <strong>No obligations found</strong><br><br>
+                The AI analysis did not identify any specific compliance obligations in this document. 
+                This could mean:<br>
+                • The document is informational rather than regulatory<br>
+                • The obligations are implicit and need manual review<br>
+                • The document format made extraction difficult<br><br>
+                Try uploading a regulatory document with clear compliance requirements.`);
+            return;
+        }
+
+        // Group by severity
+        const grouped = this.getObligationBuckets();
+
+        this.addMessage(buildGroupedMessage(
+            '📋',
+            `Real Compliance Obligations (${obligations.length} found):`,
+            OBLIGATION_BUCKETS,
+            grouped,
+            (obligation) => [`• ${obligation.description}`],
+            '✨ These are real obligations extracted by AWS Nova AI from your document!'
+        ));
+    },
+
+    showRealTasks(documentId) {
+        if (!this.lastResults || !this.lastResults.tasks) {
+            this.addMessage(`✅ <strong>Loading tasks for document ${documentId}...</strong><br><br>
+                Fetching real action items generated by the Planner Agent...`);
+
+            this.fetchAndShowTasks(documentId);
+            return;
+        }
+
+        const tasks = this.lastResults.tasks;
+
+        if (tasks.length === 0) {
+            this.addMessage(`✅ <strong>No tasks generated</strong><br><br>
+                The Planner Agent did not generate specific tasks. This could mean:<br>
+                • No actionable obligations were found<br>
+                • The obligations are too general to create specific tasks<br>
+                • The document needs manual task planning<br><br>
+                Try uploading a document with specific compliance requirements.`);
+            return;
+        }
+
+        // Group by priority/urgency
+        const grouped = this.getTaskBuckets();
+
+        this.addMessage(buildGroupedMessage(
+            '✅',
+            `Real Action Items (${tasks.length} generated):`,
+            TASK_BUCKETS,
+            grouped,
+            (task, bucket) => {
+                const lines = [`• ${task.title || task.description}`];
+                if (bucket.dueDates && task.due_date) {
+                    lines.push(`📅 Due: ${task.due_date}`);
+                }
+                return lines;
+            },
+            '✨ These are real tasks generated by the AI Planner Agent!'
+        ));
+    },
+
+    async fetchAndShowObligations(documentId) {
+        try {
+            const response = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/obligations?document_id=${documentId}`);
+            if (response.ok) {
+                const data = await response.json();
+                this.lastResults = this.lastResults || {};
+                this.lastResults.obligations = data.obligations || [];
+                this.showRealObligations(documentId);
+            } else {
+                this.addMessage(`❌ Could not fetch obligations: ${response.statusText}`);
+            }
+        } catch (error) {
+            this.addMessage(`❌ Error fetching obligations: ${error.message}`);
+        }
+    },
+
+    async fetchAndShowTasks(documentId) {
+        try {
+            const response = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/tasks?document_id=${documentId}`);
+            if (response.ok) {
+                const data = await response.json();
+                this.lastResults = this.lastResults || {};
+                this.lastResults.tasks = data.tasks || [];
+                this.showRealTasks(documentId);
+            } else {
+                this.addMessage(`❌ Could not fetch tasks: ${response.statusText}`);
+            }
+        } catch (error) {
+            this.addMessage(`❌ Error fetching tasks: ${error.message}`);
+        }
+    },
+
+    // Re-opening a list reuses its buckets; a fetch or new analysis replaces the array and so the cache
+    getObligationBuckets() {
+        const obligations = this.lastResults.obligations;
+        if (this.obligationBucketsSource !== obligations) {
+            this.obligationBuckets = this.groupObligationsBySeverity(obligations);
+            this.obligationBucketsSource = obligations;
+        }
+        return this.obligationBuckets;
+    },
+
+    getTaskBuckets() {
+        const tasks = this.lastResults.tasks;
+        if (this.taskBucketsSource !== tasks) {
+            this.taskBuckets = this.groupTasksByPriority(tasks);
+            this.taskBucketsSource = tasks;
+        }
+        return this.taskBuckets;
+    },
+
+    groupObligationsBySeverity(obligations) {
+        // One pass over the list; obligations with any other severity are left out
+        const grouped = { critical: [], high: [], medium: [], low: [] };
+        for (const obligation of obligations) {
+            switch (obligation.severity) {
+                case 'critical':
+                case 'high':
+                case 'medium':
+                case 'low':
+                    grouped[obligation.severity].push(obligation);
+                    break;
+            }
+        }
+        return grouped;
+    },
+
+    groupTasksByPriority(tasks) {
+        // One pass over the list; tasks with any other priority are left out
+        const grouped = { urgent: [], high: [], normal: [] };
+        for (const task of tasks) {
+            switch (task.priority) {
+                case 'urgent':
+                case 'critical':
+                    grouped.urgent.push(task);
+                    break;
+                case 'high':
+                    grouped.high.push(task);
+                    break;
+                case 'medium':
+                case 'normal':
+                case 'low':
+                    grouped.normal.push(task);
+                    break;
+            }
+        }
+        return grouped;
+    },
+
+    downloadRealReport(documentId) {
+        if (!this.lastResults || !this.lastResults.reports) {
+            this.addMessage(`📄 <strong>Generating report for document ${documentId}...</strong><br><br>
+                The Reporter Agent is creating a comprehensive compliance report...`);
+
+            this.fetchAndGenerateReport(documentId);
+            return;
+        }
+
+        const reports = this.lastResults.reports;
+        const obligationsCount = this.lastResults.obligations ? this.lastResults.obligations.length : 0;
+        const tasksCount = this.lastResults.tasks ? this.lastResults.tasks.length : 0;
+
+        this.addMessage(`📄 <strong>Real Compliance Report Generated!</strong><br><br>
+
+            <div style="background: #f0f8ff; padding: 15px; border-radius: 8px; margin: 10px 0;">
+                <strong>📊 AI-Generated Executive Summary</strong><br>
+                • Document ID: ${documentId}<br>
+                • Obligations Found: ${obligationsCount}<br>
+                • Tasks Generated: ${tasksCount}<br>
+                • Reports Available: ${reports.length}<br>
+                • Generated by: AWS Nova AI + Reporter Agent<br><br>
+
+                <strong>Report Contents:</strong><br>
+                • Executive summary with key findings<br>
+                • Detailed obligation analysis<br>
+                • Risk assessment and prioritization<br>
+                • Actionable task recommendations<br>
+                • Compliance timeline and deadlines<br><br>
+
+                ${reports.length > 0 ? 
+                    `<strong>Available Reports:</strong><br>${reports.map(r => `• ${r.title || r.report_type} (${r.status})`).join('<br>')}` :
+                    '<em>Report generation in progress...</em>'
+                }
+            </div>
+
+            <p><strong>✨ This report is generated by real AI agents analyzing your document!</strong></p>
+            <p>In a production system, you would be able to download the PDF report directly.</p>`);
+    },
+
+    async fetchAndGenerateReport(documentId) {
+        try {
+            // Try to get existing reports
+            const response = await fetch(`https://6to1dnyqsd.execute-api.us-east-1.amazonaws.com/Stage/reports?document_id=${documentId}`);
+            if (response.ok) {
+                const data = await response.json();
+                this.lastResults = this.lastResults || {};
+                this.lastResults.reports = data.reports || [];
+                this.downloadRealReport(documentId);
+            } else {
+                // If no reports exist, show generation message
+                this.addMessage(`📄 <strong>Report Generation</strong><br><br>
+                    No reports found for document ${documentId}. In a production system, 
+                    the Reporter Agent would automatically generate comprehensive compliance 
+                    reports after document analysis is complete.<br><br>
+
+                    <strong>Report would include:</strong><br>
+                    • Executive summary of findings<br>
+                    • Detailed compliance obligations<br>
+                    • Risk assessment matrix<br>
+                    • Recommended action plans<br>
+                    • Implementation timeline<br><br>
+
+                    The system is designed to create professional PDF reports suitable for 
+                    management review and regulatory submissions.`);
+            }
+        } catch (error) {
+            this.addMessage(`❌ Error accessing reports: ${error.message}`);
+        }
+    },
+
+    async uploadDocumentToAPI(file) {
+        try {
+            // The file part already carries its filename, which is all the upload handler reads
+            const formData = new FormData();
+            formData.append('file', file);
+
+            const response = await fetch('https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/documents/upload', {
+                method: 'POST',
+                body: formData
+            });
+
+            if (response.ok) {
+                const result = await response.json();
+                return {
+                    success: true,
+                    document_id: result.document_id || `doc-${Date.now()}`,
+                    message: result.message || 'Upload successful'
+                };
+            } else {
+                const errorData = await response.json().catch(() => ({}));
+                return {
+                    success: false,
+                    error: errorData.error || `HTTP ${response.status}: ${response.statusText}`
+                };
+            }
+        } catch (error) {
+            return {
+                success: false,
+                error: `Network error: ${error.message}`
+            };
+        }
+    },
+
+    async pollProcessingStatus(documentId) {
+        // The REST API has no push channel, so poll adaptively instead of on a fixed
+        // timer: quickly right after a stage change, backing off while a stage runs
+        const deadline = Date.now() + 5 * 60 * 1000; // 5 minutes max
+        const minPollInterval = 1000;
+        const maxPollInterval = 15000;
+        let pollInterval = minPollInterval;
+        let lastStage = null;
+        let lastEtag = null;
+        let failures = 0;
+
+        while (Date.now() < deadline) {
+            let status = null;
+            let unchanged = false;
+            try {
+                // Echo the last ETag so an unchanged status comes back as a bodiless 304
+                const response = await fetch(
+                    `https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/documents/${documentId}/status`,
+                    lastEtag ? { headers: { 'If-None-Match': lastEtag } } : undefined
+                );
+
+                if (response.status === 304) {
+                    unchanged = true;
+                } else if (response.ok) {
+                    status = await response.json();
+                    lastEtag = response.headers.get('ETag');
+                }
+                failures = 0;
+            } catch (error) {
+                console.error('Polling error:', error);
+                // Continue polling through transient network errors
+                if (++failures > 5) {
+                    throw error;
+                }
+            }
+
+            if (status) {
+                if (status.overall_status === 'completed') {
+                    await this.updateProcessingProgress(status);
+                    // Get final results
+                    return await this.getFinalResults(documentId);
+                } else if (status.overall_status === 'failed') {
+                    const stageError = status.current_stage && status.current_stage.error_message;
+                    throw new Error(stageError || 'Processing failed');
+                }
+
+                const stage = status.current_stage ? status.current_stage.stage : 'upload';
+                if (stage !== lastStage) {
+                    // Only redraw progress when something changed
+                    lastStage = stage;
+                    pollInterval = minPollInterval;
+                    await this.updateProcessingProgress(status);
+                } else {
+                    pollInterval = Math.min(pollInterval * 1.5, maxPollInterval);
+                }
+            } else if (unchanged) {
+                pollInterval = Math.min(pollInterval * 1.5, maxPollInterval);
+            }
+
+            // Wait before next poll, with ±20% jitter so clients that uploaded together drift apart
+            await this.delay(pollInterval * (0.8 + Math.random() * 0.4));
+        }
+
+        throw new Error('Processing timeout - please check status manually');
+    },
+
+    async updateProcessingProgress(status) {
+        const stageMap = {
+            'upload': { progress: 20, agent: -1, message: 'Document uploaded to AWS S3' },
+            'analysis': { progress: 40, agent: 0, message: 'Analyzer Agent: Extracting compliance obligations with AWS Nova' },
+            'planning': { progress: 70, agent: 1, message: 'Planner Agent: Generating actionable tasks' },
+            'reporting': { progress: 90, agent: 2, message: 'Reporter Agent: Creating compliance reports' },
+            'completed': { progress: 100, agent: 2, message: 'All agents completed successfully!' }
+        };
+
+        const currentStage = status.overall_status === 'completed' ? 'completed' :
+            (status.current_stage && status.current_stage.stage) || 'upload';
+        const stageInfo = stageMap[currentStage] || stageMap['upload'];
+
+        await this.updateProgress(stageInfo.progress, stageInfo.message);
+
+        if (stageInfo.agent >= 0) {
+            this.updateAgentStatus(stageInfo.agent, 'processing');
+
+            // Mark previous agents as completed
+            for (let i = 0; i < stageInfo.agent; i++) {
+                this.updateAgentStatus(i, 'completed');
+            }
+        }
+
+        // Show stage-specific updates
+        if (status.stage_details) {
+            const details = status.stage_details;
+            if (details.obligations_found) {
+                this.addMessage(`🔍 <strong>Analysis Update:</strong> Found ${details.obligations_found} compliance obligations`);
+            }
+            if (details.tasks_generated) {
+                this.addMessage(`📋 <strong>Planning Update:</strong> Generated ${details.tasks_generated} actionable tasks`);
+            }
+        }
+    },
+
+    async getFinalResults(documentId) {
+        const fetchJson = async (url) => {
+            const response = await fetch(url);
+            return response.ok ? await response.json() : {};
+        };
+
+        // The three result sets are independent, so request them together; one failing leaves the others intact
+        const [obligations, tasks, reports] = await Promise.allSettled([
+            fetchJson(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/obligations?document_id=${documentId}`),
+            fetchJson(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/tasks?document_id=${documentId}`),
+            fetchJson(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/reports?document_id=${documentId}`)
+        ]);
+        const body = (result) => (result.status === 'fulfilled' ? result.value : {});
+
+        const results = {
+            obligations: body(obligations).obligations || [],
+            obligations_count: body(obligations).total_count || 0,
+            tasks: body(tasks).tasks || [],
+            tasks_count: body(tasks).total_count || 0,
+            reports: body(reports).reports || [],
+            reports_count: body(reports).total_count || 0
+        };
+
+        const failure = [obligations, tasks, reports].find((result) => result.status === 'rejected');
+        if (failure) {
+            console.error('Error fetching results:', failure.reason);
+            results.error = failure.reason.message;
+        }
+        return results;
+    },
+
+    showRealResults(filename, documentId, results) {
+        this.updateAgentStatus(2, 'completed');
+        this.hideProgress();
+
+        if (results.error) {
+            this.addMessage(`⚠️ <strong>Processing completed with issues:</strong><br><br>
+                ${results.error}<br><br>
+                Some results may be incomplete. Document ID: ${documentId}`);
+            return;
+        }
+
+        const obligationsCount = results.obligations_count || 0;
+        const tasksCount = results.tasks_count || 0;
+        const reportsCount = results.reports_count || 0;
+
+        // Calculate confidence score based on results
+        const confidenceScore = obligationsCount > 0 ? 
+            Math.min(95, 75 + (obligationsCount * 2)) : 60;
+
+        this.addMessage(`🎉 <strong>Analysis Complete! Real results from AWS Nova AI:</strong><br><br>
+
+            <div class="results-summary">
+                <h3 style="margin-bottom: 15px; color: #333;">📊 Real Analysis Results for "${escapeHtml(filename)}"</h3>
+
+                <div class="results-grid">
+                    <div class="result-item">
+                        <div class="result-number">${obligationsCount}</div>
+                        <div class="result-label">Obligations Found</div>
+                    </div>
+                    <div class="result-item">
+                        <div class="result-number">${tasksCount}</div>
+                        <div class="result-label">Tasks Generated</div>
+                    </div>
+                    <div class="result-item">
+                        <div class="result-number">${reportsCount}</div>
+                        <div class="result-label">Reports Created</div>
+                    </div>
+                    <div class="result-item">
+                        <div class="result-number">${confidenceScore}%</div>
+                        <div class="result-label">AI Confidence</div>
+                    </div>
+                </div>
+
+                <div class="quick-actions">
+                    <button class="action-button" data-action="view-obligations" data-document-id="${documentId}">📋 View Real Obligations</button>
+                    <button class="action-button" data-action="view-tasks" data-document-id="${documentId}">✅ View Real Tasks</button>
+                    <button class="action-button" data-action="download-report" data-document-id="${documentId}">📄 Download Report</button>
+                    <button class="action-button" data-action="start-new">🔄 Analyze Another Document</button>
+                </div>
+            </div>
+
+            <p><strong>🎯 Document ID:</strong> ${documentId}</p>
+            <p><strong>✨ Powered by:</strong> AWS Nova AI + Bedrock AgentCore</p>
+            <p>All results are generated by real AI agents processing your document!</p>`);
+
+        // Store results for later access
+        this.lastResults = {
+            documentId: documentId,
+            obligations: results.obligations,
+            tasks: results.tasks,
+            reports: results.reports
+        };
+    },
+
+    handleProcessingError(error) {
+        this.hideProgress();
+        this.addMessage(`❌ <strong>Processing Error:</strong><br><br>
+            ${error.message}<br><br>
+
+            <strong>This could be due to:</strong><br>
+            • Backend services temporarily unavailable<br>
+            • Document format not supported<br>
+            • Network connectivity issues<br>
+            • AWS service limits<br><br>
+
+            <strong>You can:</strong><br>
+            • Try uploading a different document<br>
+            • Wait a moment and try again<br>
+            • Check that the document is a valid PDF<br><br>
+
+            The system is designed to handle real regulatory documents and will show actual AI analysis results when the backend is available.`);
+    }
+};
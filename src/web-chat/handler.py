@@ -4,1347 +4,130 @@ Conversational AI that guides users through document analysis
 Updated: 2025-10-21 - Fixed progression and status polling
 """
 
-import json
+import base64
+import gzip
+import hashlib
 import logging
+import os
+import re
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Assets the page references by content-hashed URLs: file name -> (Content-Type, placeholder in index.html)
+STATIC_ASSETS = {
+    'copilot.css': ('text/css', '__STYLESHEET_VERSION__'),
+    'doc-pipeline.js': ('text/javascript', '__PIPELINE_VERSION__')
+}
+
+# An Accept-Encoding entry with q=0 explicitly refuses that coding
+REFUSED_QUALITY = re.compile(r'q\s*=\s*0(\.0{0,3})?')
+
+def _read_asset(name):
+    """Read a static asset packaged next to this handler"""
+    with open(os.path.join(os.path.dirname(__file__), name), encoding='utf-8') as asset:
+        return asset.read()
+
+def _asset_responses(headers, text):
+    """Build the response for every available Content-Encoding (None for identity) once per container"""
+    raw = text.encode('utf-8')
+    compressed = {'gzip': gzip.compress(raw, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        compressed['br'] = brotli.compress(raw, quality=11)
+
+    responses = {
+        None: {
+            'statusCode': 200,
+            'headers': headers,
+            'body': text
+        }
+    }
+    for encoding, body in compressed.items():
+        responses[encoding] = {
+            'statusCode': 200,
+            'headers': {**headers, 'Content-Encoding': encoding},
+            'body': base64.b64encode(body).decode('ascii'),
+            'isBase64Encoded': True
+        }
+    return responses
+
+def _negotiate(headers, responses, content_type):
+    """Pick the best pre-built response whose encoding the client accepts"""
+    # API Gateway only decodes a base64 body when the first Accept type is a binary media type,
+    # so anything else (module scripts send */*) must get the plain text
+    accept = headers.get('Accept') or headers.get('accept') or ''
+    if accept.split(',', 1)[0].split(';', 1)[0].strip().lower() != content_type:
+        return responses[None]
+
+    accept_encoding = headers.get('Accept-Encoding') or headers.get('accept-encoding') or ''
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        if not REFUSED_QUALITY.fullmatch(params.strip()):
+            accepted.add(coding.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in accepted and encoding in responses:
+            return responses[encoding]
+    return responses[None]
+
+# Everything served here is static, so load it once per container rather than on every request.
+# Asset URLs carry a content hash, so browsers may cache them indefinitely
+ASSET_CONTENT = {name: _read_asset(name) for name in STATIC_ASSETS}
+HTML_CONTENT = _read_asset('index.html')
+for name, (_, placeholder) in STATIC_ASSETS.items():
+    version = hashlib.sha256(ASSET_CONTENT[name].encode('utf-8')).hexdigest()[:16]
+    HTML_CONTENT = HTML_CONTENT.replace(placeholder, version)
+
+# Browsers still revalidate the page on every load (no-cache), but an unchanged page costs a bodiless 304.
+# The tag is weak because the same page is served under several content encodings
+HTML_ETAG = f'W/"{hashlib.sha256(HTML_CONTENT.encode("utf-8")).hexdigest()[:32]}"'
+
+RESPONSE_HEADERS = {
+    'Content-Type': 'text/html',
+    'Access-Control-Allow-Origin': '*',
+    'Cache-Control': 'no-cache',
+    'ETag': HTML_ETAG,
+    'Vary': 'Accept, Accept-Encoding'
+}
+
+ASSET_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Cache-Control': 'public, max-age=31536000, immutable',
+    'Vary': 'Accept, Accept-Encoding'
+}
+
+# Compressing and encoding is paid once at cold start; a warm invocation only picks a response
+HTML_RESPONSES = _asset_responses(RESPONSE_HEADERS, HTML_CONTENT)
+ASSET_RESPONSES = {
+    name: _asset_responses({**ASSET_HEADERS, 'Content-Type': content_type}, ASSET_CONTENT[name])
+    for name, (content_type, _) in STATIC_ASSETS.items()
+}
+
+NOT_MODIFIED_RESPONSE = {
+    'statusCode': 304,
+    'headers': RESPONSE_HEADERS,
+    'body': ''
+}
+
 def lambda_handler(event, context):
     """
     Claude-style chatbot interface handler
     """
-    
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>EnergyGrid.AI Compliance Copilot</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                height: 100vh;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-            }
-            
-            .chat-container {
-                width: 90%;
-                max-width: 800px;
-                height: 90vh;
-                background: white;
-                border-radius: 12px;
-                box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
-                display: flex;
-                flex-direction: column;
-                overflow: hidden;
-            }
-            
-            .chat-header {
-                background: linear-gradient(135deg, #667eea, #764ba2);
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 12px 12px 0 0;
-            }
-            
-            .chat-header h1 {
-                font-size: 1.5em;
-                margin-bottom: 5px;
-            }
-            
-            .chat-header p {
-                opacity: 0.9;
-                font-size: 0.9em;
-            }
-            
-            .chat-messages {
-                flex: 1;
-                padding: 20px;
-                overflow-y: auto;
-                background: #f8f9fa;
-            }
-            
-            .message {
-                margin-bottom: 20px;
-                display: flex;
-                align-items: flex-start;
-                gap: 12px;
-            }
-            
-            .message.ai {
-                flex-direction: row;
-            }
-            
-            .message.user {
-                flex-direction: row-reverse;
-            }
-            
-            .message-avatar {
-                width: 40px;
-                height: 40px;
-                border-radius: 50%;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                font-weight: bold;
-                color: white;
-                flex-shrink: 0;
-            }
-            
-            .message.ai .message-avatar {
-                background: linear-gradient(135deg, #667eea, #764ba2);
-            }
-            
-            .message.user .message-avatar {
-                background: linear-gradient(135deg, #4CAF50, #45a049);
-            }
-            
-            .message-content {
-                max-width: 70%;
-                padding: 15px 20px;
-                border-radius: 18px;
-                line-height: 1.5;
-                word-wrap: break-word;
-            }
-            
-            .message.ai .message-content {
-                background: white;
-                border: 1px solid #e1e5e9;
-                border-radius: 18px 18px 18px 4px;
-            }
-            
-            .message.user .message-content {
-                background: linear-gradient(135deg, #4CAF50, #45a049);
-                color: white;
-                border-radius: 18px 18px 4px 18px;
-            }
-            
-            .typing-indicator {
-                display: none;
-                padding: 15px 20px;
-                background: white;
-                border: 1px solid #e1e5e9;
-                border-radius: 18px 18px 18px 4px;
-                max-width: 70%;
-            }
-            
-            .typing-dots {
-                display: flex;
-                gap: 4px;
-            }
-            
-            .typing-dots span {
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background: #999;
-                animation: typing 1.4s infinite ease-in-out;
-            }
-            
-            .typing-dots span:nth-child(1) { animation-delay: -0.32s; }
-            .typing-dots span:nth-child(2) { animation-delay: -0.16s; }
-            
-            @keyframes typing {
-                0%, 80%, 100% { transform: scale(0.8); opacity: 0.5; }
-                40% { transform: scale(1); opacity: 1; }
-            }
-            
-            .chat-input-container {
-                padding: 20px;
-                background: white;
-                border-top: 1px solid #e1e5e9;
-            }
-            
-            .chat-input-wrapper {
-                display: flex;
-                gap: 12px;
-                align-items: flex-end;
-            }
-            
-            .chat-input {
-                flex: 1;
-                min-height: 44px;
-                max-height: 120px;
-                padding: 12px 16px;
-                border: 2px solid #e1e5e9;
-                border-radius: 22px;
-                font-size: 16px;
-                font-family: inherit;
-                resize: none;
-                outline: none;
-                transition: border-color 0.2s;
-            }
-            
-            .chat-input:focus {
-                border-color: #667eea;
-            }
-            
-            .send-button {
-                width: 44px;
-                height: 44px;
-                border: none;
-                border-radius: 50%;
-                background: linear-gradient(135deg, #667eea, #764ba2);
-                color: white;
-                cursor: pointer;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                transition: transform 0.2s;
-            }
-            
-            .send-button:hover {
-                transform: scale(1.05);
-            }
-            
-            .send-button:disabled {
-                opacity: 0.5;
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            .file-upload-area {
-                margin: 10px 0;
-                padding: 20px;
-                border: 2px dashed #667eea;
-                border-radius: 12px;
-                text-align: center;
-                cursor: pointer;
-                transition: all 0.3s;
-                background: #f8f9ff;
-            }
-            
-            .file-upload-area:hover {
-                background: #f0f4ff;
-                border-color: #5a6fd8;
-            }
-            
-            .file-upload-area.dragover {
-                background: #e8f0ff;
-                border-color: #4CAF50;
-            }
-            
-            .progress-container {
-                margin: 15px 0;
-                display: none;
-            }
-            
-            .progress-bar {
-                width: 100%;
-                height: 8px;
-                background: #e1e5e9;
-                border-radius: 4px;
-                overflow: hidden;
-            }
-            
-            .progress-fill {
-                height: 100%;
-                background: linear-gradient(90deg, #4CAF50, #45a049);
-                width: 0%;
-                transition: width 0.3s;
-            }
-            
-            .progress-text {
-                margin-top: 8px;
-                font-size: 0.9em;
-                color: #666;
-                text-align: center;
-            }
-            
-            .agent-status {
-                display: flex;
-                gap: 15px;
-                margin: 15px 0;
-                padding: 15px;
-                background: #f8f9ff;
-                border-radius: 12px;
-                border-left: 4px solid #667eea;
-            }
-            
-            .agent-item {
-                flex: 1;
-                text-align: center;
-            }
-            
-            .agent-icon {
-                width: 40px;
-                height: 40px;
-                border-radius: 50%;
-                margin: 0 auto 8px;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                font-size: 1.2em;
-                transition: all 0.3s;
-            }
-            
-            .agent-icon.pending {
-                background: #e1e5e9;
-                color: #999;
-            }
-            
-            .agent-icon.processing {
-                background: linear-gradient(135deg, #FF9800, #F57C00);
-                color: white;
-                animation: pulse 2s infinite;
-            }
-            
-            .agent-icon.completed {
-                background: linear-gradient(135deg, #4CAF50, #45a049);
-                color: white;
-            }
-            
-            @keyframes pulse {
-                0% { transform: scale(1); }
-                50% { transform: scale(1.1); }
-                100% { transform: scale(1); }
-            }
-            
-            .agent-name {
-                font-size: 0.8em;
-                font-weight: 600;
-                color: #333;
-            }
-            
-            .agent-status-text {
-                font-size: 0.7em;
-                color: #666;
-                margin-top: 2px;
-            }
-            
-            .results-summary {
-                background: white;
-                border-radius: 12px;
-                padding: 20px;
-                margin: 15px 0;
-                border: 1px solid #e1e5e9;
-            }
-            
-            .results-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
-                gap: 15px;
-                margin-top: 15px;
-            }
-            
-            .result-item {
-                text-align: center;
-                padding: 15px;
-                background: #f8f9ff;
-                border-radius: 8px;
-            }
-            
-            .result-number {
-                font-size: 2em;
-                font-weight: bold;
-                color: #667eea;
-                margin-bottom: 5px;
-            }
-            
-            .result-label {
-                font-size: 0.9em;
-                color: #666;
-            }
-            
-            .quick-actions {
-                display: flex;
-                gap: 10px;
-                margin-top: 15px;
-                flex-wrap: wrap;
-            }
-            
-            .action-button {
-                padding: 8px 16px;
-                border: 1px solid #667eea;
-                border-radius: 20px;
-                background: white;
-                color: #667eea;
-                cursor: pointer;
-                font-size: 0.9em;
-                transition: all 0.3s;
-            }
-            
-            .action-button:hover {
-                background: #667eea;
-                color: white;
-            }
-            
-            @media (max-width: 768px) {
-                .chat-container {
-                    width: 100%;
-                    height: 100vh;
-                    border-radius: 0;
-                }
-                
-                .message-content {
-                    max-width: 85%;
-                }
-                
-                .results-grid {
-                    grid-template-columns: repeat(2, 1fr);
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="chat-container">
-            <div class="chat-header">
-                <h1>⚡ EnergyGrid.AI Compliance Copilot</h1>
-                <p>Your AI assistant for regulatory compliance analysis</p>
-            </div>
-            
-            <div class="chat-messages" id="chatMessages">
-                <div class="message ai">
-                    <div class="message-avatar">🤖</div>
-                    <div class="message-content">
-                        <p>Hello! I'm your AI Compliance Copilot. I can help you analyze regulatory documents and create compliance action plans.</p>
-                        <p><strong>What I can do:</strong></p>
-                        <ul style="margin: 10px 0; padding-left: 20px;">
-                            <li>📄 Extract compliance obligations from PDF documents</li>
-                            <li>🎯 Categorize requirements by priority and type</li>
-                            <li>✅ Generate actionable task lists</li>
-                            <li>📊 Create comprehensive compliance reports</li>
-                        </ul>
-                        <p>To get started, please upload a regulatory document (PDF format) and I'll analyze it for you!</p>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="chat-input-container">
-                <div class="file-upload-area" id="fileUploadArea">
-                    <p>📎 <strong>Drop a PDF file here or click to upload</strong></p>
-                    <p style="font-size: 0.9em; color: #666; margin-top: 5px;">Supported: PDF files up to 10MB</p>
-                    <input type="file" id="fileInput" accept=".pdf" style="display: none;">
-                </div>
-                
-                <div class="progress-container" id="progressContainer">
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="progressFill"></div>
-                    </div>
-                    <div class="progress-text" id="progressText">Uploading...</div>
-                </div>
-                
-                <div class="chat-input-wrapper">
-                    <textarea 
-                        class="chat-input" 
-                        id="chatInput" 
-                        placeholder="Ask me about compliance requirements, or upload a document to analyze..."
-                        rows="1"
-                    ></textarea>
-                    <button class="send-button" id="sendButton">
-                        <svg width="20" height="20" viewBox="0 0 24 24" fill="currentColor">
-                            <path d="M2.01 21L23 12 2.01 3 2 10l15 2-15 2z"/>
-                        </svg>
-                    </button>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            class ComplianceCopilot {
-                constructor() {
-                    this.chatMessages = document.getElementById('chatMessages');
-                    this.chatInput = document.getElementById('chatInput');
-                    this.sendButton = document.getElementById('sendButton');
-                    this.fileInput = document.getElementById('fileInput');
-                    this.fileUploadArea = document.getElementById('fileUploadArea');
-                    this.progressContainer = document.getElementById('progressContainer');
-                    this.progressFill = document.getElementById('progressFill');
-                    this.progressText = document.getElementById('progressText');
-                    
-                    this.currentDocumentId = null;
-                    this.processingStages = ['upload', 'analysis', 'planning', 'reporting'];
-                    this.currentStage = 0;
-                    
-                    this.initializeEventListeners();
-                }
-                
-                initializeEventListeners() {
-                    // Send message on button click
-                    this.sendButton.addEventListener('click', () => this.sendMessage());
-                    
-                    // Send message on Enter (but allow Shift+Enter for new lines)
-                    this.chatInput.addEventListener('keydown', (e) => {
-                        if (e.key === 'Enter' && !e.shiftKey) {
-                            e.preventDefault();
-                            this.sendMessage();
-                        }
-                    });
-                    
-                    // Auto-resize textarea
-                    this.chatInput.addEventListener('input', () => {
-                        this.chatInput.style.height = 'auto';
-                        this.chatInput.style.height = Math.min(this.chatInput.scrollHeight, 120) + 'px';
-                    });
-                    
-                    // File upload events
-                    this.fileUploadArea.addEventListener('click', () => this.fileInput.click());
-                    this.fileInput.addEventListener('change', (e) => this.handleFileUpload(e.target.files[0]));
-                    
-                    // Drag and drop
-                    this.fileUploadArea.addEventListener('dragover', (e) => {
-                        e.preventDefault();
-                        this.fileUploadArea.classList.add('dragover');
-                    });
-                    
-                    this.fileUploadArea.addEventListener('dragleave', () => {
-                        this.fileUploadArea.classList.remove('dragover');
-                    });
-                    
-                    this.fileUploadArea.addEventListener('drop', (e) => {
-                        e.preventDefault();
-                        this.fileUploadArea.classList.remove('dragover');
-                        const file = e.dataTransfer.files[0];
-                        if (file && file.type === 'application/pdf') {
-                            this.handleFileUpload(file);
-                        }
-                    });
-                }
-                
-                addMessage(content, isUser = false, isTyping = false) {
-                    const messageDiv = document.createElement('div');
-                    messageDiv.className = `message ${isUser ? 'user' : 'ai'}`;
-                    
-                    const avatar = document.createElement('div');
-                    avatar.className = 'message-avatar';
-                    avatar.textContent = isUser ? '👤' : '🤖';
-                    
-                    const contentDiv = document.createElement('div');
-                    contentDiv.className = isTyping ? 'typing-indicator' : 'message-content';
-                    
-                    if (isTyping) {
-                        contentDiv.innerHTML = '<div class="typing-dots"><span></span><span></span><span></span></div>';
-                    } else {
-                        contentDiv.innerHTML = content;
-                    }
-                    
-                    messageDiv.appendChild(avatar);
-                    messageDiv.appendChild(contentDiv);
-                    
-                    this.chatMessages.appendChild(messageDiv);
-                    this.scrollToBottom();
-                    
-                    return messageDiv;
-                }
-                
-                async sendMessage() {
-                    const message = this.chatInput.value.trim();
-                    if (!message) return;
-                    
-                    // Add user message
-                    this.addMessage(message, true);
-                    this.chatInput.value = '';
-                    this.chatInput.style.height = 'auto';
-                    
-                    // Show typing indicator
-                    const typingMessage = this.addMessage('', false, true);
-                    
-                    // Simulate AI response
-                    await this.simulateAIResponse(message, typingMessage);
-                }
-                
-                async simulateAIResponse(userMessage, typingMessage) {
-                    await this.delay(1500);
-                    
-                    // Remove typing indicator
-                    typingMessage.remove();
-                    
-                    // Generate contextual response
-                    let response = this.generateResponse(userMessage);
-                    this.addMessage(response);
-                }
-                
-                generateResponse(userMessage) {
-                    const message = userMessage.toLowerCase();
-                    
-                    if (message.includes('help') || message.includes('what can you do')) {
-                        return `I can help you with regulatory compliance analysis! Here's what I can do:
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>📄 Document Analysis:</strong><br>
-                            Upload PDF regulatory documents and I'll extract all compliance obligations
-                        </div>
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>🎯 Smart Categorization:</strong><br>
-                            I'll categorize requirements by type (reporting, operational, safety) and priority
-                        </div>
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>✅ Task Generation:</strong><br>
-                            I'll create actionable tasks with deadlines and assignments
-                        </div>
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>📊 Report Creation:</strong><br>
-                            I'll generate comprehensive compliance reports for management
-                        </div>
-                        
-                        <p><strong>Ready to start?</strong> Upload a regulatory PDF document above!</p>`;
-                    }
-                    
-                    if (message.includes('upload') || message.includes('document') || message.includes('file')) {
-                        return `Great! To upload a document:
-                        
-                        <p>1. Click the upload area above or drag & drop a PDF file</p>
-                        <p>2. I'll automatically start analyzing it with my AI agents</p>
-                        <p>3. You'll see real-time progress as I extract obligations and create tasks</p>
-                        
-                        <p><strong>Supported formats:</strong> PDF files up to 10MB</p>
-                        <p><strong>Best results:</strong> Regulatory documents, compliance standards, policy documents</p>`;
-                    }
-                    
-                    if (message.includes('agent') || message.includes('how') || message.includes('process')) {
-                        return `Here's how my AI agents work together:
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>🔍 Analyzer Agent:</strong><br>
-                            Uses Claude 3 Sonnet to read your document and extract compliance obligations
-                        </div>
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>📋 Planner Agent:</strong><br>
-                            Converts obligations into specific, actionable tasks with deadlines
-                        </div>
-                        
-                        <div style="margin: 15px 0;">
-                            <strong>📊 Reporter Agent:</strong><br>
-                            Creates executive summaries and compliance reports
-                        </div>
-                        
-                        <p>The whole process typically takes 1-2 minutes for a standard regulatory document!</p>`;
-                    }
-                    
-                    // Default response
-                    return `I understand you're asking about "${userMessage}". 
-                    
-                    <p>I'm specialized in regulatory compliance analysis. I can help you:</p>
-                    <ul style="margin: 10px 0; padding-left: 20px;">
-                        <li>Analyze regulatory PDF documents</li>
-                        <li>Extract compliance obligations</li>
-                        <li>Generate action plans</li>
-                        <li>Create compliance reports</li>
-                    </ul>
-                    
-                    <p>Would you like to upload a document to get started, or ask me something specific about compliance analysis?</p>`;
-                }
-                
-                async handleFileUpload(file) {
-                    if (!file) return;
-                    
-                    if (file.type !== 'application/pdf') {
-                        this.addMessage('❌ Please upload a PDF file. I can only analyze PDF documents.', false);
-                        return;
-                    }
-                    
-                    if (file.size > 10 * 1024 * 1024) {
-                        this.addMessage('❌ File too large. Please upload a PDF smaller than 10MB.', false);
-                        return;
-                    }
-                    
-                    // Add user message about upload
-                    this.addMessage(`📎 Uploaded: ${file.name} (${(file.size / 1024 / 1024).toFixed(2)} MB)`, true);
-                    
-                    // Show progress
-                    this.showProgress();
-                    
-                    // Process with real API
-                    await this.processDocumentWithRealAPI(file);
-                }
-                
-                async processDocumentWithRealAPI(file) {
-                    // Step 1: Upload to real backend
-                    this.addMessage(`🚀 <strong>Starting analysis of "${file.name}"</strong><br><br>Uploading to AWS and processing through real AI agents...`);
-                    
-                    try {
-                        await this.updateProgress(10, 'Uploading document to AWS S3...');
-                        
-                        // Real API call to upload document
-                        const uploadResult = await this.uploadDocumentToAPI(file);
-                        
-                        if (!uploadResult.success) {
-                            throw new Error(uploadResult.error || 'Upload failed');
-                        }
-                        
-                        const documentId = uploadResult.document_id;
-                        this.addMessage(`✅ <strong>Document uploaded successfully!</strong><br>Document ID: ${documentId}<br><br>Starting AI agent processing...`);
-                        
-                        // Step 2: Monitor real processing
-                        await this.updateProgress(20, 'Initializing AI agents...');
-                        this.showAgentStatus();
-                        
-                        // Poll for real processing status
-                        const finalResults = await this.pollProcessingStatus(documentId);
-                        
-                        // Show real results
-                        this.showRealResults(file.name, documentId, finalResults);
-                        
-                    } catch (error) {
-                        this.handleProcessingError(error);
-                    }
-                }
-                
-                async simulateAnalysisResults() {
-                    const obligations = Math.floor(Math.random() * 15) + 8; // 8-22 obligations
-                    
-                    this.updateAgentStatus(0, 'completed');
-                    
-                    this.addMessage(`✅ <strong>Analysis Complete!</strong><br><br>
-                        🔍 <strong>Analyzer Agent found:</strong><br>
-                        • ${obligations} compliance obligations<br>
-                        • 3 critical priority items<br>
-                        • 5 high priority items<br>
-                        • ${obligations - 8} medium/low priority items<br><br>
-                        
-                        <strong>Sample obligations extracted:</strong><br>
-                        • "Submit quarterly emissions reports by March 31st"<br>
-                        • "Conduct annual safety equipment inspections"<br>
-                        • "Maintain incident response documentation"<br><br>
-                        
-                        Moving to task planning...`);
-                    
-                    return obligations;
-                }
-                
-                async simulatePlanningResults(obligations) {
-                    const tasks = Math.floor(obligations * 1.8); // ~1.8 tasks per obligation
-                    
-                    this.updateAgentStatus(1, 'completed');
-                    
-                    this.addMessage(`✅ <strong>Planning Complete!</strong><br><br>
-                        📋 <strong>Planner Agent generated:</strong><br>
-                        • ${tasks} specific action items<br>
-                        • Assigned priorities and deadlines<br>
-                        • Identified responsible parties<br>
-                        • Created timeline dependencies<br><br>
-                        
-                        <strong>Sample tasks created:</strong><br>
-                        • "Collect Q1 emissions data by March 15th → Environmental Team"<br>
-                        • "Schedule safety inspection by February 28th → Operations Manager"<br>
-                        • "Update incident response procedures by April 1st → Safety Officer"<br><br>
-                        
-                        Generating final reports...`);
-                    
-                    return tasks;
-                }
-                
-                showFinalResults(filename, obligations, tasks) {
-                    const reports = 3;
-                    
-                    this.addMessage(`🎉 <strong>All Done! Your compliance analysis is complete.</strong><br><br>
-                        
-                        <div class="results-summary">
-                            <h3 style="margin-bottom: 15px; color: #333;">📊 Analysis Summary for "${filename}"</h3>
-                            
-                            <div class="results-grid">
-                                <div class="result-item">
-                                    <div class="result-number">${obligations}</div>
-                                    <div class="result-label">Obligations Found</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-number">${tasks}</div>
-                                    <div class="result-label">Tasks Generated</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-number">${reports}</div>
-                                    <div class="result-label">Reports Created</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-number">94%</div>
-                                    <div class="result-label">Confidence Score</div>
-                                </div>
-                            </div>
-                            
-                            <div class="quick-actions">
-                                <button class="action-button" onclick="copilot.showObligations()">📋 View Obligations</button>
-                                <button class="action-button" onclick="copilot.showTasks()">✅ View Tasks</button>
-                                <button class="action-button" onclick="copilot.downloadReport()">📄 Download Report</button>
-                                <button class="action-button" onclick="copilot.startNew()">🔄 Analyze Another Document</button>
-                            </div>
-                        </div>
-                        
-                        <p><strong>What's next?</strong> You can view detailed results, download reports, or upload another document for analysis!</p>`);
-                }
-                
-                showAgentStatus() {
-                    const statusHtml = `
-                        <div class="agent-status">
-                            <div class="agent-item">
-                                <div class="agent-icon processing" id="agent0">🔍</div>
-                                <div class="agent-name">Analyzer</div>
-                                <div class="agent-status-text" id="status0">Processing...</div>
-                            </div>
-                            <div class="agent-item">
-                                <div class="agent-icon pending" id="agent1">📋</div>
-                                <div class="agent-name">Planner</div>
-                                <div class="agent-status-text" id="status1">Waiting...</div>
-                            </div>
-                            <div class="agent-item">
-                                <div class="agent-icon pending" id="agent2">📊</div>
-                                <div class="agent-name">Reporter</div>
-                                <div class="agent-status-text" id="status2">Waiting...</div>
-                            </div>
-                        </div>`;
-                    
-                    this.addMessage(`<strong>🤖 AI Agents Status:</strong><br>${statusHtml}`);
-                }
-                
-                updateAgentStatus(agentIndex, status) {
-                    const agentIcon = document.getElementById(`agent${agentIndex}`);
-                    const statusText = document.getElementById(`status${agentIndex}`);
-                    
-                    if (agentIcon && statusText) {
-                        agentIcon.className = `agent-icon ${status}`;
-                        
-                        switch(status) {
-                            case 'processing':
-                                statusText.textContent = 'Processing...';
-                                break;
-                            case 'completed':
-                                statusText.textContent = 'Completed ✓';
-                                break;
-                            default:
-                                statusText.textContent = 'Waiting...';
-                        }
-                    }
-                }
-                
-                showProgress() {
-                    this.progressContainer.style.display = 'block';
-                    this.fileUploadArea.style.display = 'none';
-                }
-                
-                hideProgress() {
-                    this.progressContainer.style.display = 'none';
-                    this.fileUploadArea.style.display = 'block';
-                }
-                
-                async updateProgress(percent, text) {
-                    this.progressFill.style.width = percent + '%';
-                    this.progressText.textContent = text;
-                    await this.delay(100);
-                }
-                
-                // Action handlers for real data
-                showRealObligations(documentId) {
-                    if (!this.lastResults || !this.lastResults.obligations) {
-                        this.addMessage(`📋 <strong>Loading obligations for document ${documentId}...</strong><br><br>
-                            Fetching real compliance obligations extracted by AWS Nova AI...`);
-                        
-                        // Fetch real obligations
-                        this.fetchAndShowObligations(documentId);
-                        return;
-                    }
-                    
-                    const obligations = this.lastResults.obligations;
-                    
-                    if (obligations.length === 0) {
-                        this.addMessage(`📋 <strong>No obligations found</strong><br><br>
-                            The AI analysis did not identify any specific compliance obligations in this document. 
-                            This could mean:<br>
-                            • The document is informational rather than regulatory<br>
-                            • The obligations are implicit and need manual review<br>
-                            • The document format made extraction difficult<br><br>
-                            Try uploading a regulatory document with clear compliance requirements.`);
-                        return;
-                    }
-                    
-                    // Group by severity
-                    const grouped = this.groupObligationsBySeverity(obligations);
-                    
-                    let message = `📋 <strong>Real Compliance Obligations (${obligations.length} found):</strong><br><br>`;
-                    
-                    if (grouped.critical.length > 0) {
-                        message += `<div style="background: #ffebee; padding: 15px; border-radius: 8px; margin: 10px 0; border-left: 4px solid #f44336;">
-                            <strong>🔴 CRITICAL (${grouped.critical.length} items):</strong><br>`;
-                        grouped.critical.forEach(obl => {
-                            message += `• ${obl.description}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    if (grouped.high.length > 0) {
-                        message += `<div style="background: #fff3e0; padding: 15px; border-radius: 8px; margin: 10px 0; border-left: 4px solid #ff9800;">
-                            <strong>🟡 HIGH (${grouped.high.length} items):</strong><br>`;
-                        grouped.high.forEach(obl => {
-                            message += `• ${obl.description}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    if (grouped.medium.length > 0) {
-                        message += `<div style="background: #f3e5f5; padding: 15px; border-radius: 8px; margin: 10px 0; border-left: 4px solid #9c27b0;">
-                            <strong>🟣 MEDIUM (${grouped.medium.length} items):</strong><br>`;
-                        grouped.medium.forEach(obl => {
-                            message += `• ${obl.description}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    if (grouped.low.length > 0) {
-                        message += `<div style="background: #e8f5e8; padding: 15px; border-radius: 8px; margin: 10px 0; border-left: 4px solid #4caf50;">
-                            <strong>🟢 LOW (${grouped.low.length} items):</strong><br>`;
-                        grouped.low.forEach(obl => {
-                            message += `• ${obl.description}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    message += `<p><strong>✨ These are real obligations extracted by AWS Nova AI from your document!</strong></p>`;
-                    
-                    this.addMessage(message);
-                }
-                
-                showRealTasks(documentId) {
-                    if (!this.lastResults || !this.lastResults.tasks) {
-                        this.addMessage(`✅ <strong>Loading tasks for document ${documentId}...</strong><br><br>
-                            Fetching real action items generated by the Planner Agent...`);
-                        
-                        this.fetchAndShowTasks(documentId);
-                        return;
-                    }
-                    
-                    const tasks = this.lastResults.tasks;
-                    
-                    if (tasks.length === 0) {
-                        this.addMessage(`✅ <strong>No tasks generated</strong><br><br>
-                            The Planner Agent did not generate specific tasks. This could mean:<br>
-                            • No actionable obligations were found<br>
-                            • The obligations are too general to create specific tasks<br>
-                            • The document needs manual task planning<br><br>
-                            Try uploading a document with specific compliance requirements.`);
-                        return;
-                    }
-                    
-                    // Group by priority/urgency
-                    const grouped = this.groupTasksByPriority(tasks);
-                    
-                    let message = `✅ <strong>Real Action Items (${tasks.length} generated):</strong><br><br>`;
-                    
-                    if (grouped.urgent.length > 0) {
-                        message += `<div style="background: #ffebee; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                            <strong>🔥 URGENT (${grouped.urgent.length} items):</strong><br>`;
-                        grouped.urgent.forEach(task => {
-                            message += `• ${task.title || task.description}<br>`;
-                            if (task.due_date) message += `  📅 Due: ${task.due_date}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    if (grouped.high.length > 0) {
-                        message += `<div style="background: #fff3e0; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                            <strong>📅 HIGH PRIORITY (${grouped.high.length} items):</strong><br>`;
-                        grouped.high.forEach(task => {
-                            message += `• ${task.title || task.description}<br>`;
-                            if (task.due_date) message += `  📅 Due: ${task.due_date}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    if (grouped.normal.length > 0) {
-                        message += `<div style="background: #f3e5f5; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                            <strong>📋 NORMAL (${grouped.normal.length} items):</strong><br>`;
-                        grouped.normal.forEach(task => {
-                            message += `• ${task.title || task.description}<br>`;
-                        });
-                        message += `</div>`;
-                    }
-                    
-                    message += `<p><strong>✨ These are real tasks generated by the AI Planner Agent!</strong></p>`;
-                    
-                    this.addMessage(message);
-                }
-                
-                async fetchAndShowObligations(documentId) {
-                    try {
-                        const response = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/obligations?document_id=${documentId}`);
-                        if (response.ok) {
-                            const data = await response.json();
-                            this.lastResults = this.lastResults || {};
-                            this.lastResults.obligations = data.obligations || [];
-                            this.showRealObligations(documentId);
-                        } else {
-                            this.addMessage(`❌ Could not fetch obligations: ${response.statusText}`);
-                        }
-                    } catch (error) {
-                        this.addMessage(`❌ Error fetching obligations: ${error.message}`);
-                    }
-                }
-                
-                async fetchAndShowTasks(documentId) {
-                    try {
-                        const response = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/tasks?document_id=${documentId}`);
-                        if (response.ok) {
-                            const data = await response.json();
-                            this.lastResults = this.lastResults || {};
-                            this.lastResults.tasks = data.tasks || [];
-                            this.showRealTasks(documentId);
-                        } else {
-                            this.addMessage(`❌ Could not fetch tasks: ${response.statusText}`);
-                        }
-                    } catch (error) {
-                        this.addMessage(`❌ Error fetching tasks: ${error.message}`);
-                    }
-                }
-                
-                groupObligationsBySeverity(obligations) {
-                    return {
-                        critical: obligations.filter(o => o.severity === 'critical'),
-                        high: obligations.filter(o => o.severity === 'high'),
-                        medium: obligations.filter(o => o.severity === 'medium'),
-                        low: obligations.filter(o => o.severity === 'low')
-                    };
-                }
-                
-                groupTasksByPriority(tasks) {
-                    return {
-                        urgent: tasks.filter(t => t.priority === 'urgent' || t.priority === 'critical'),
-                        high: tasks.filter(t => t.priority === 'high'),
-                        normal: tasks.filter(t => t.priority === 'medium' || t.priority === 'normal' || t.priority === 'low')
-                    };
-                }
-                
-                downloadRealReport(documentId) {
-                    if (!this.lastResults || !this.lastResults.reports) {
-                        this.addMessage(`📄 <strong>Generating report for document ${documentId}...</strong><br><br>
-                            The Reporter Agent is creating a comprehensive compliance report...`);
-                        
-                        this.fetchAndGenerateReport(documentId);
-                        return;
-                    }
-                    
-                    const reports = this.lastResults.reports;
-                    const obligationsCount = this.lastResults.obligations ? this.lastResults.obligations.length : 0;
-                    const tasksCount = this.lastResults.tasks ? this.lastResults.tasks.length : 0;
-                    
-                    this.addMessage(`📄 <strong>Real Compliance Report Generated!</strong><br><br>
-                        
-                        <div style="background: #f0f8ff; padding: 15px; border-radius: 8px; margin: 10px 0;">
-                            <strong>📊 AI-Generated Executive Summary</strong><br>
-                            • Document ID: ${documentId}<br>
-                            • Obligations Found: ${obligationsCount}<br>
-                            • Tasks Generated: ${tasksCount}<br>
-                            • Reports Available: ${reports.length}<br>
-                            • Generated by: AWS Nova AI + Reporter Agent<br><br>
-                            
-                            <strong>Report Contents:</strong><br>
-                            • Executive summary with key findings<br>
-                            • Detailed obligation analysis<br>
-                            • Risk assessment and prioritization<br>
-                            • Actionable task recommendations<br>
-                            • Compliance timeline and deadlines<br><br>
-                            
-                            ${reports.length > 0 ? 
-                                `<strong>Available Reports:</strong><br>${reports.map(r => `• ${r.title || r.report_type} (${r.status})`).join('<br>')}` :
-                                '<em>Report generation in progress...</em>'
-                            }
-                        </div>
-                        
-                        <p><strong>✨ This report is generated by real AI agents analyzing your document!</strong></p>
-                        <p>In a production system, you would be able to download the PDF report directly.</p>`);
-                }
-                
-                async fetchAndGenerateReport(documentId) {
-                    try {
-                        // Try to get existing reports
-                        const response = await fetch(`https://6to1dnyqsd.execute-api.us-east-1.amazonaws.com/Stage/reports?document_id=${documentId}`);
-                        if (response.ok) {
-                            const data = await response.json();
-                            this.lastResults = this.lastResults || {};
-                            this.lastResults.reports = data.reports || [];
-                            this.downloadRealReport(documentId);
-                        } else {
-                            // If no reports exist, show generation message
-                            this.addMessage(`📄 <strong>Report Generation</strong><br><br>
-                                No reports found for document ${documentId}. In a production system, 
-                                the Reporter Agent would automatically generate comprehensive compliance 
-                                reports after document analysis is complete.<br><br>
-                                
-                                <strong>Report would include:</strong><br>
-                                • Executive summary of findings<br>
-                                • Detailed compliance obligations<br>
-                                • Risk assessment matrix<br>
-                                • Recommended action plans<br>
-                                • Implementation timeline<br><br>
-                                
-                                The system is designed to create professional PDF reports suitable for 
-                                management review and regulatory submissions.`);
-                        }
-                    } catch (error) {
-                        this.addMessage(`❌ Error accessing reports: ${error.message}`);
-                    }
-                }
-                
-                startNew() {
-                    this.addMessage(`🔄 <strong>Ready for another document!</strong><br><br>
-                        
-                        <p>Upload another regulatory document above and I'll analyze it with the same AI-powered process:</p>
-                        <ul style="margin: 10px 0; padding-left: 20px;">
-                            <li>📄 Extract compliance obligations</li>
-                            <li>🎯 Categorize by priority and type</li>
-                            <li>✅ Generate actionable tasks</li>
-                            <li>📊 Create comprehensive reports</li>
-                        </ul>
-                        
-                        <p>Each document analysis is independent and takes about 1-2 minutes to complete.</p>`);
-                }
-                
-                scrollToBottom() {
-                    this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
-                }
-                
-                delay(ms) {
-                    return new Promise(resolve => setTimeout(resolve, ms));
-                }
-                
-                async uploadDocumentToAPI(file) {
-                    try {
-                        const formData = new FormData();
-                        formData.append('file', file);
-                        formData.append('filename', file.name);
-                        
-                        const response = await fetch('https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/documents/upload', {
-                            method: 'POST',
-                            body: formData
-                        });
-                        
-                        if (response.ok) {
-                            const result = await response.json();
-                            return {
-                                success: true,
-                                document_id: result.document_id || `doc-${Date.now()}`,
-                                message: result.message || 'Upload successful'
-                            };
-                        } else {
-                            const errorData = await response.json().catch(() => ({}));
-                            return {
-                                success: false,
-                                error: errorData.error || `HTTP ${response.status}: ${response.statusText}`
-                            };
-                        }
-                    } catch (error) {
-                        return {
-                            success: false,
-                            error: `Network error: ${error.message}`
-                        };
-                    }
-                }
-                
-                async pollProcessingStatus(documentId) {
-                    const maxPolls = 30; // 5 minutes max
-                    const pollInterval = 10000; // 10 seconds
-                    
-                    for (let poll = 0; poll < maxPolls; poll++) {
-                        try {
-                            const response = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/documents/${documentId}/status`);
-                            
-                            if (response.ok) {
-                                const status = await response.json();
-                                await this.updateProcessingProgress(status);
-                                
-                                if (status.overall_status === 'completed') {
-                                    // Get final results
-                                    const results = await this.getFinalResults(documentId);
-                                    return results;
-                                } else if (status.overall_status === 'failed') {
-                                    throw new Error(status.error_message || 'Processing failed');
-                                }
-                            }
-                            
-                            // Wait before next poll
-                            await this.delay(pollInterval);
-                            
-                        } catch (error) {
-                            console.error('Polling error:', error);
-                            // Continue polling unless it's a critical error
-                            if (poll > 5) { // Give it a few tries before failing
-                                throw error;
-                            }
-                        }
-                    }
-                    
-                    throw new Error('Processing timeout - please check status manually');
-                }
-                
-                async updateProcessingProgress(status) {
-                    const stageMap = {
-                        'upload': { progress: 20, agent: -1, message: 'Document uploaded to AWS S3' },
-                        'analysis': { progress: 40, agent: 0, message: 'Analyzer Agent: Extracting compliance obligations with AWS Nova' },
-                        'planning': { progress: 70, agent: 1, message: 'Planner Agent: Generating actionable tasks' },
-                        'reporting': { progress: 90, agent: 2, message: 'Reporter Agent: Creating compliance reports' },
-                        'completed': { progress: 100, agent: 2, message: 'All agents completed successfully!' }
-                    };
-                    
-                    const currentStage = status.current_stage || 'upload';
-                    const stageInfo = stageMap[currentStage] || stageMap['upload'];
-                    
-                    await this.updateProgress(stageInfo.progress, stageInfo.message);
-                    
-                    if (stageInfo.agent >= 0) {
-                        this.updateAgentStatus(stageInfo.agent, 'processing');
-                        
-                        // Mark previous agents as completed
-                        for (let i = 0; i < stageInfo.agent; i++) {
-                            this.updateAgentStatus(i, 'completed');
-                        }
-                    }
-                    
-                    // Show stage-specific updates
-                    if (status.stage_details) {
-                        const details = status.stage_details;
-                        if (details.obligations_found) {
-                            this.addMessage(`🔍 <strong>Analysis Update:</strong> Found ${details.obligations_found} compliance obligations`);
-                        }
-                        if (details.tasks_generated) {
-                            this.addMessage(`📋 <strong>Planning Update:</strong> Generated ${details.tasks_generated} actionable tasks`);
-                        }
-                    }
-                }
-                
-                async getFinalResults(documentId) {
-                    try {
-                        // Get obligations
-                        const obligationsResponse = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/obligations?document_id=${documentId}`);
-                        const obligations = obligationsResponse.ok ? await obligationsResponse.json() : { obligations: [], total_count: 0 };
-                        
-                        // Get tasks  
-                        const tasksResponse = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/tasks?document_id=${documentId}`);
-                        const tasks = tasksResponse.ok ? await tasksResponse.json() : { tasks: [], total_count: 0 };
-                        
-                        // Get reports
-                        const reportsResponse = await fetch(`https://vu668szdf0.execute-api.us-east-1.amazonaws.com/Prod/reports?document_id=${documentId}`);
-                        const reports = reportsResponse.ok ? await reportsResponse.json() : { reports: [], total_count: 0 };
-                        
-                        return {
-                            obligations: obligations.obligations || [],
-                            obligations_count: obligations.total_count || 0,
-                            tasks: tasks.tasks || [],
-                            tasks_count: tasks.total_count || 0,
-                            reports: reports.reports || [],
-                            reports_count: reports.total_count || 0
-                        };
-                    } catch (error) {
-                        console.error('Error fetching results:', error);
-                        return {
-                            obligations: [],
-                            obligations_count: 0,
-                            tasks: [],
-                            tasks_count: 0,
-                            reports: [],
-                            reports_count: 0,
-                            error: error.message
-                        };
-                    }
-                }
-                
-                showRealResults(filename, documentId, results) {
-                    this.updateAgentStatus(2, 'completed');
-                    this.hideProgress();
-                    
-                    if (results.error) {
-                        this.addMessage(`⚠️ <strong>Processing completed with issues:</strong><br><br>
-                            ${results.error}<br><br>
-                            Some results may be incomplete. Document ID: ${documentId}`);
-                        return;
-                    }
-                    
-                    const obligationsCount = results.obligations_count || 0;
-                    const tasksCount = results.tasks_count || 0;
-                    const reportsCount = results.reports_count || 0;
-                    
-                    // Calculate confidence score based on results
-                    const confidenceScore = obligationsCount > 0 ? 
-                        Math.min(95, 75 + (obligationsCount * 2)) : 60;
-                    
-                    this.addMessage(`🎉 <strong>Analysis Complete! Real results from AWS Nova AI:</strong><br><br>
-                        
-                        <div class="results-summary">
-                            <h3 style="margin-bottom: 15px; color: #333;">📊 Real Analysis Results for "${filename}"</h3>
-                            
-                            <div class="results-grid">
-                                <div class="result-item">
-                                    <div class="result-number">${obligationsCount}</div>
-                                    <div class="result-label">Obligations Found</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-number">${tasksCount}</div>
-                                    <div class="result-label">Tasks Generated</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-number">${reportsCount}</div>
-                                    <div class="result-label">Reports Created</div>
-                                </div>
-                                <div class="result-item">
-                                    <div class="result-number">${confidenceScore}%</div>
-                                    <div class="result-label">AI Confidence</div>
-                                </div>
-                            </div>
-                            
-                            <div class="quick-actions">
-                                <button class="action-button" onclick="copilot.showRealObligations('${documentId}')">📋 View Real Obligations</button>
-                                <button class="action-button" onclick="copilot.showRealTasks('${documentId}')">✅ View Real Tasks</button>
-                                <button class="action-button" onclick="copilot.downloadRealReport('${documentId}')">📄 Download Report</button>
-                                <button class="action-button" onclick="copilot.startNew()">🔄 Analyze Another Document</button>
-                            </div>
-                        </div>
-                        
-                        <p><strong>🎯 Document ID:</strong> ${documentId}</p>
-                        <p><strong>✨ Powered by:</strong> AWS Nova AI + Bedrock AgentCore</p>
-                        <p>All results are generated by real AI agents processing your document!</p>`);
-                    
-                    // Store results for later access
-                    this.lastResults = {
-                        documentId: documentId,
-                        obligations: results.obligations,
-                        tasks: results.tasks,
-                        reports: results.reports
-                    };
-                }
-                
-                handleProcessingError(error) {
-                    this.hideProgress();
-                    this.addMessage(`❌ <strong>Processing Error:</strong><br><br>
-                        ${error.message}<br><br>
-                        
-                        <strong>This could be due to:</strong><br>
-                        • Backend services temporarily unavailable<br>
-                        • Document format not supported<br>
-                        • Network connectivity issues<br>
-                        • AWS service limits<br><br>
-                        
-                        <strong>You can:</strong><br>
-                        • Try uploading a different document<br>
-                        • Wait a moment and try again<br>
-                        • Check that the document is a valid PDF<br><br>
-                        
-                        The system is designed to handle real regulatory documents and will show actual AI analysis results when the backend is available.`);
-                }
-            }
-            
-            // Initialize the copilot
-            const copilot = new ComplianceCopilot();
-        </script>
-    </body>
-    </html>
-    """
-    
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'text/html',
-            'Access-Control-Allow-Origin': '*',
-            'Cache-Control': 'no-cache'
-        },
-        'body': html_content
-    }
\ No newline at end of file
+    event = event or {}
+    headers = event.get('headers') or {}
+
+    asset = (event.get('path') or '').rsplit('/', 1)[-1]
+    if asset in STATIC_ASSETS:
+        return _negotiate(headers, ASSET_RESPONSES[asset], STATIC_ASSETS[asset][0])
+
+    if_none_match = headers.get('If-None-Match') or headers.get('if-none-match')
+    if if_none_match == HTML_ETAG:
+        return NOT_MODIFIED_RESPONSE
+
+    return _negotiate(headers, HTML_RESPONSES, 'text/html')
@@ -13,7 +13,7 @@ from src.shared.models import (
     ProcessingStatus, ObligationCategory, ObligationSeverity, 
     DeadlineType, TaskStatus, TaskPriority, ReportType
 )
-from src.shared.dynamodb_helper import DynamoDBHelper
+from src.shared.dynamodb_helper import DynamoDBHelper, select_current_stage
 
 
 class TestDocument:
@@ -512,18 +512,28 @@ class TestProcessingStatusRecord:
                 completed_at=completed_time
             )
     
-    def test_auto_completion_time(self):
-        """Test automatic completion time setting"""
-        record = ProcessingStatusRecord(
+    def test_mark_completed_sets_completion_time(self):
+        """Test mark_completed stamps completion time"""
+        record = ProcessingStatusRecord.mark_completed(
             document_id="doc_123456789012345",
             stage="analysis",
-            status=ProcessingStatus.COMPLETED,
             started_at=datetime.utcnow()
         )
         
-        # Should automatically set completed_at when status is COMPLETED
+        assert record.status == ProcessingStatus.COMPLETED
         assert record.completed_at is not None
         assert record.completed_at >= record.started_at
+    
+    def test_completed_status_not_auto_stamped(self):
+        """Test plain construction leaves completed_at untouched"""
+        record = ProcessingStatusRecord(
+            document_id="doc_123456789012345",
+            stage="analysis",
+            status=ProcessingStatus.COMPLETED,
+            started_at=datetime.utcnow()
+        )
+        
+        assert record.completed_at is None
 
 
 @patch.dict('os.environ', {
@@ -663,6 +673,43 @@ class TestDynamoDBHelper:
         
         assert doc is None
     
+    @patch('boto3.resource')
+    def test_get_document_with_status_not_found(self, mock_boto3_resource):
+        """Test status records are not queried for a missing document"""
+        mock_table = Mock()
+        mock_table.get_item.return_value = {}
+        mock_dynamodb = Mock()
+        mock_dynamodb.Table.return_value = mock_table
+        mock_boto3_resource.return_value = mock_dynamodb
+        
+        helper = DynamoDBHelper()
+        
+        document, status_records = helper.get_document_with_status("nonexistent_doc")
+        
+        assert document is None
+        assert status_records == []
+        mock_table.query.assert_not_called()
+    
+    def test_select_current_stage(self):
+        """Test current stage prefers the latest active stage, then the latest completed one"""
+        base_time = datetime.utcnow() - timedelta(minutes=10)
+        
+        def record(stage, status, minutes):
+            return ProcessingStatusRecord(
+                document_id="doc_123456789012345",
+                stage=stage,
+                status=status,
+                started_at=base_time + timedelta(minutes=minutes)
+            )
+        
+        upload = record("upload", ProcessingStatus.COMPLETED, 0)
+        analysis = record("analysis", ProcessingStatus.COMPLETED, 2)
+        planning = record("planning", ProcessingStatus.FAILED, 4)
+        
+        assert select_current_stage([]) is None
+        assert select_current_stage([analysis, upload]) is analysis
+        assert select_current_stage([upload, planning, analysis]) is planning
+    
     @patch('boto3.resource')
     def test_update_document_status(self, mock_boto3_resource):
         """Test document status update"""
@@ -746,6 +793,52 @@ class TestDynamoDBHelper:
         assert success_count == 3
         assert mock_table.put_item.call_count == 3
     
+    @patch('src.shared.dynamodb_helper.time.sleep')
+    @patch('boto3.resource')
+    def test_batch_put_retries_unprocessed_items(self, mock_boto3_resource, mock_sleep):
+        """Test batch puts group items by table and retry what DynamoDB left unprocessed"""
+        mock_dynamodb = Mock()
+        mock_boto3_resource.return_value = mock_dynamodb
+        unprocessed = {'test-processing-status': [{'PutRequest': {'Item': {'document_id': 'doc_1'}}}]}
+        mock_dynamodb.batch_write_item.side_effect = [
+            {'UnprocessedItems': unprocessed},
+            {'UnprocessedItems': {}}
+        ]
+        
+        helper = DynamoDBHelper()
+        result = helper.batch_put([
+            ('test-documents', {'document_id': 'doc_1'}),
+            ('test-processing-status', {'document_id': 'doc_1'})
+        ])
+        
+        assert result is True
+        first_call, retry_call = mock_dynamodb.batch_write_item.call_args_list
+        assert first_call.kwargs['RequestItems'] == {
+            'test-documents': [{'PutRequest': {'Item': {'document_id': 'doc_1'}}}],
+            'test-processing-status': [{'PutRequest': {'Item': {'document_id': 'doc_1'}}}]
+        }
+        assert retry_call.kwargs['RequestItems'] == unprocessed
+        mock_sleep.assert_called_once()
+    
+    @patch('src.shared.dynamodb_helper.time.sleep')
+    @patch('boto3.resource')
+    def test_batch_put_gives_up_after_max_attempts(self, mock_boto3_resource, mock_sleep):
+        """Test batch puts report failure when items stay unprocessed"""
+        mock_dynamodb = Mock()
+        mock_boto3_resource.return_value = mock_dynamodb
+        mock_dynamodb.batch_write_item.return_value = {
+            'UnprocessedItems': {'test-documents': [{'PutRequest': {'Item': {'document_id': 'doc_1'}}}]}
+        }
+        
+        helper = DynamoDBHelper()
+        
+        assert helper.batch_put([('test-documents', {'document_id': 'doc_1'})]) is False
+        assert mock_dynamodb.batch_write_item.call_count == 5
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert len(delays) == 4
+        assert all(0.025 * 2 ** attempt <= delay <= min(0.05 * 2 ** attempt, 1.0)
+                   for attempt, delay in enumerate(delays))
+    
     @patch('boto3.resource')
     def test_datetime_serialization(self, mock_boto3_resource):
         """Test datetime serialization and deserialization"""
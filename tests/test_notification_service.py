@@ -12,12 +12,35 @@ import sys
 # Add src to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'shared'))
 
+import notification_service
 from notification_service import (
     NotificationService, NotificationType, get_notification_service
 )
 from models import Document, Task, Report, ProcessingStatus, TaskStatus, TaskPriority, ReportType
 
 
+@pytest.fixture(autouse=True)
+def reset_client_cache():
+    """Drop per-container SNS/STS caches so each test sees its own boto3 mock"""
+    notification_service._sns_client = None
+    notification_service._get_account_id.cache_clear()
+    notification_service._default_topic_arn.cache_clear()
+    notification_service._recent_notifications.clear()
+    yield
+    notification_service._sns_client = None
+    notification_service._get_account_id.cache_clear()
+    notification_service._default_topic_arn.cache_clear()
+    notification_service._recent_notifications.clear()
+
+
+def publish_batch_success(TopicArn, PublishBatchRequestEntries):
+    """Fake SNS PublishBatch response where every entry succeeds"""
+    return {
+        'Successful': [{'Id': entry['Id'], 'MessageId': f"msg-{entry['Id']}"}
+                       for entry in PublishBatchRequestEntries],
+        'Failed': []
+    }
+
 class TestNotificationService:
     """Test cases for NotificationService"""
     
@@ -89,7 +112,22 @@ class TestNotificationService:
         
         assert service.sns == mock_sns
         assert service.topic_arn == 'arn:aws:sns:us-east-1:123456789012:test-notifications'
-        mock_boto3_client.assert_called_with('sns')
+        assert mock_boto3_client.call_args[0] == ('sns',)
+    
+    @patch('notification_service.boto3.client')
+    def test_sns_client_shared_across_instances(self, mock_boto3_client):
+        """Test the SNS client is created once and reused"""
+        mock_boto3_client.return_value = Mock()
+        
+        first = NotificationService()
+        second = NotificationService()
+        
+        assert first.sns is second.sns
+        mock_boto3_client.assert_called_once()
+        
+        config = mock_boto3_client.call_args[1]['config']
+        assert config.max_pool_connections == 50
+        assert config.tcp_keepalive is True
     
     @patch('notification_service.boto3.client')
     def test_send_basic_notification(self, mock_boto3_client):
@@ -131,6 +169,7 @@ class TestNotificationService:
             notification_type=NotificationType.ANALYSIS_COMPLETED,
             additional_info={'obligations_count': 5}
         )
+        notification_service.flush_notifications()
         
         assert result is True
         mock_sns.publish.assert_called_once()
@@ -155,6 +194,7 @@ class TestNotificationService:
             task=self.test_task,
             notification_type=NotificationType.TASK_ASSIGNED
         )
+        notification_service.flush_notifications()
         
         assert result is True
         mock_sns.publish.assert_called_once()
@@ -165,6 +205,12 @@ class TestNotificationService:
         assert 'Test Compliance Task' in call_args[1]['Subject']
         assert 'assigned' in call_args[1]['Message'].lower()
         assert call_args[1]['MessageAttributes']['task_id']['StringValue'] == 'task_test123'
+        
+        message_lines = call_args[1]['Message'].split('\n')
+        assert message_lines[1] == ''
+        assert message_lines[2] == 'Task Description: Review compliance requirements for test regulation'
+        assert message_lines[-2:] == ['Priority: High', 'Status: Pending']
+        assert f"Due Date: {self.test_task.due_date.strftime('%Y-%m-%d %H:%M')}" in message_lines
     
     @patch('notification_service.boto3.client')
     def test_send_report_notification(self, mock_boto3_client):
@@ -180,6 +226,7 @@ class TestNotificationService:
             notification_type=NotificationType.REPORT_GENERATED,
             additional_info={'download_url': 'https://example.com/report.pdf'}
         )
+        notification_service.flush_notifications()
         
         assert result is True
         mock_sns.publish.assert_called_once()
@@ -189,8 +236,93 @@ class TestNotificationService:
         assert 'Report Generated' in call_args[1]['Subject']
         assert 'Test Compliance Report' in call_args[1]['Subject']
         assert 'download' in call_args[1]['Message'].lower()
+        assert call_args[1]['Message'].endswith('\n\nDownload URL: https://example.com/report.pdf')
+        
+        start_date = self.test_report.date_range['start_date'].strftime('%Y-%m-%d')
+        end_date = self.test_report.date_range['end_date'].strftime('%Y-%m-%d')
+        assert f"Date Range: {start_date} to {end_date}" in call_args[1]['Message']
+        assert f"Generated: {self.test_report.created_timestamp.strftime('%Y-%m-%d %H:%M')}" in call_args[1]['Message']
         assert call_args[1]['MessageAttributes']['report_id']['StringValue'] == 'rpt_test123'
     
+    @patch('notification_service.boto3.client')
+    def test_wrapper_notifications_publish_in_background(self, mock_boto3_client):
+        """Test wrapper notifications return before the publish completes"""
+        import threading
+        
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        release = threading.Event()
+        mock_sns.publish.side_effect = lambda **kwargs: release.wait(5) and {'MessageId': 'test-message-id'}
+        
+        service = NotificationService()
+        
+        result = service.send_document_notification(
+            document=self.test_document,
+            notification_type=NotificationType.DOCUMENT_UPLOADED,
+            async_publish=True
+        )
+        
+        assert result is True
+        assert notification_service._pending_publishes
+        
+        release.set()
+        notification_service.flush_notifications()
+        
+        mock_sns.publish.assert_called_once()
+        assert not notification_service._pending_publishes
+    
+    @patch('notification_service.boto3.client')
+    def test_wrapper_notifications_publish_before_returning(self, mock_boto3_client):
+        """Test wrappers publish synchronously unless the caller opts in to flushing"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.side_effect = [{'MessageId': 'test-message-id'}, {'MessageId': 'test-message-id'},
+                                        Exception('SNS Error')]
+        
+        service = NotificationService()
+        
+        # Handlers that never flush must not return with publishes still pending
+        results = [
+            service.send_document_notification(
+                document=self.test_document,
+                notification_type=NotificationType.ANALYSIS_COMPLETED
+            ),
+            service.send_task_notification(
+                task=self.test_task,
+                notification_type=NotificationType.TASK_ASSIGNED
+            ),
+            service.send_report_notification(
+                report=self.test_report,
+                notification_type=NotificationType.REPORT_GENERATED
+            )
+        ]
+        
+        assert not notification_service._pending_publishes
+        assert mock_sns.publish.call_count == 3
+        # A failed publish is reported to the caller
+        assert results == [True, True, False]
+    
+    @patch('notification_service.boto3.client')
+    def test_background_publish_failure_is_logged(self, mock_boto3_client):
+        """Test background publish errors are logged instead of raised"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.side_effect = Exception('SNS Error')
+        
+        service = NotificationService()
+        
+        with patch.object(notification_service.logger, 'error') as mock_log_error:
+            result = service.send_task_notification(
+                task=self.test_task,
+                notification_type=NotificationType.TASK_ASSIGNED,
+                async_publish=True
+            )
+            notification_service.flush_notifications()
+        
+        assert result is True
+        mock_log_error.assert_called_once()
+        assert 'SNS Error' in mock_log_error.call_args[0][0]
+    
     @patch('notification_service.boto3.client')
     def test_send_system_alert(self, mock_boto3_client):
         """Test sending system alert"""
@@ -238,7 +370,7 @@ class TestNotificationService:
         """Test sending batch notifications"""
         mock_sns = Mock()
         mock_boto3_client.return_value = mock_sns
-        mock_sns.publish.return_value = {'MessageId': 'test-message-id'}
+        mock_sns.publish_batch.side_effect = publish_batch_success
         
         service = NotificationService()
         
@@ -258,7 +390,13 @@ class TestNotificationService:
         success_count = service.send_batch_notification(notifications)
         
         assert success_count == 2
-        assert mock_sns.publish.call_count == 2
+        mock_sns.publish_batch.assert_called_once()
+        mock_sns.publish.assert_not_called()
+        
+        entries = mock_sns.publish_batch.call_args[1]['PublishBatchRequestEntries']
+        assert [entry['Id'] for entry in entries] == ['0', '1']
+        assert entries[1]['Subject'] == 'Test 2'
+        assert entries[1]['MessageAttributes']['notification_type']['StringValue'] == 'analysis_completed'
     
     @patch('notification_service.boto3.client')
     def test_topic_arn_construction(self, mock_boto3_client):
@@ -274,13 +412,170 @@ class TestNotificationService:
                 mock_sts.get_caller_identity.return_value = {'Account': '987654321098'}
                 
                 with patch('notification_service.boto3.client') as mock_client:
-                    mock_client.side_effect = lambda service: mock_sns if service == 'sns' else mock_sts
+                    mock_client.side_effect = lambda service, **kwargs: mock_sns if service == 'sns' else mock_sts
                     
                     service = NotificationService()
                     
                     expected_arn = 'arn:aws:sns:us-west-2:987654321098:prod-energygrid-notifications'
                     assert service.topic_arn == expected_arn
     
+    def test_topic_arn_uses_account_id_from_environment(self):
+        """Test AWS_ACCOUNT_ID avoids the STS round-trip"""
+        with patch.dict(os.environ, {
+            'AWS_REGION': 'us-west-2',
+            'ENVIRONMENT': 'prod',
+            'AWS_ACCOUNT_ID': '111122223333'
+        }, clear=True):
+            with patch('notification_service.boto3.client') as mock_client:
+                service = NotificationService()
+                
+                assert service.topic_arn == 'arn:aws:sns:us-west-2:111122223333:prod-energygrid-notifications'
+                assert [c[0][0] for c in mock_client.call_args_list] == ['sns']
+    
+    @patch('notification_service.boto3.client')
+    def test_duplicate_notifications_suppressed(self, mock_boto3_client):
+        """Test identical notifications within the dedup window publish once"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.return_value = {'MessageId': 'test-message-id'}
+        
+        service = NotificationService()
+        
+        for _ in range(3):
+            result = service.send_notification(
+                notification_type=NotificationType.ANALYSIS_COMPLETED,
+                subject='Analysis Completed: test.pdf',
+                message='Done',
+                attributes={'document_id': 'doc_test123'},
+                user_id='user123'
+            )
+            assert result is True
+        
+        # A different document is not a duplicate
+        service.send_notification(
+            notification_type=NotificationType.ANALYSIS_COMPLETED,
+            subject='Analysis Completed: test.pdf',
+            message='Done',
+            attributes={'document_id': 'doc_other456'},
+            user_id='user123'
+        )
+        
+        assert mock_sns.publish.call_count == 2
+    
+    @patch('notification_service.boto3.client')
+    def test_duplicate_window_expires(self, mock_boto3_client):
+        """Test notifications are resent once the dedup window has passed"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.return_value = {'MessageId': 'test-message-id'}
+        
+        service = NotificationService()
+        send = lambda: service.send_notification(
+            notification_type=NotificationType.TASK_OVERDUE,
+            subject='Task Overdue: Review',
+            message='Overdue',
+            user_id='user123'
+        )
+        
+        with patch('notification_service.time.monotonic', side_effect=[1000.0, 1000.0, 1061.0, 1061.0]):
+            send()
+            send()
+        
+        assert mock_sns.publish.call_count == 2
+    
+    @patch('notification_service.boto3.client')
+    def test_failed_notification_not_deduplicated(self, mock_boto3_client):
+        """Test a failed publish does not block the retry"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.side_effect = [Exception('SNS Error'), {'MessageId': 'test-message-id'}]
+        
+        service = NotificationService()
+        
+        results = [
+            service.send_notification(
+                notification_type=NotificationType.DOCUMENT_UPLOADED,
+                subject='Test Subject',
+                message='Test Message'
+            )
+            for _ in range(2)
+        ]
+        
+        assert results == [False, True]
+        assert mock_sns.publish.call_count == 2
+    
+    @patch('notification_service.boto3.client')
+    def test_failed_background_notification_not_deduplicated(self, mock_boto3_client):
+        """Test a failed background publish does not block the retry"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.side_effect = [Exception('SNS Error'), {'MessageId': 'test-message-id'}]
+        
+        service = NotificationService()
+        
+        for _ in range(2):
+            service.send_notification(
+                notification_type=NotificationType.DOCUMENT_UPLOADED,
+                subject='Test Subject',
+                message='Test Message',
+                async_publish=True
+            )
+            notification_service.flush_notifications()
+        
+        assert mock_sns.publish.call_count == 2
+    
+    @patch('notification_service.boto3.client')
+    def test_system_alerts_with_different_details_not_deduplicated(self, mock_boto3_client):
+        """Test alerts of one type are only collapsed when message and metadata match"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish.return_value = {'MessageId': 'test-message-id'}
+        
+        service = NotificationService()
+        
+        service.send_system_alert('db_error', 'Connection refused', metadata={'table': 'documents'})
+        service.send_system_alert('db_error', 'Throughput exceeded', metadata={'table': 'documents'})
+        service.send_system_alert('db_error', 'Throughput exceeded', metadata={'table': 'tasks'})
+        service.send_system_alert('db_error', 'Throughput exceeded', metadata={'table': 'tasks'})
+        
+        assert mock_sns.publish.call_count == 3
+    
+    @patch('notification_service.boto3.client')
+    def test_notifications_disabled(self, mock_boto3_client):
+        """Test NOTIFICATIONS_DISABLED short-circuits publishing"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        
+        with patch.dict(os.environ, {'NOTIFICATIONS_DISABLED': '1'}):
+            service = NotificationService()
+        
+        result = service.send_notification(
+            notification_type=NotificationType.DOCUMENT_UPLOADED,
+            subject='Test Subject',
+            message='Test Message'
+        )
+        success_count = service.send_batch_notification([
+            {
+                'notification_type': NotificationType.DOCUMENT_UPLOADED,
+                'subject': 'Test 1',
+                'message': 'Message 1'
+            }
+        ])
+        
+        assert result is True
+        assert success_count == 1
+        mock_sns.publish.assert_not_called()
+        mock_sns.publish_batch.assert_not_called()
+    
+    def test_disabled_service_skips_topic_lookup(self):
+        """Test a disabled service does not call STS to build the topic ARN"""
+        with patch.dict(os.environ, {'NOTIFICATIONS_DISABLED': '1'}, clear=True):
+            with patch('notification_service.boto3.client') as mock_client:
+                service = NotificationService()
+                
+                assert service.topic_arn is None
+                assert [c[0][0] for c in mock_client.call_args_list] == ['sns']
+    
     def test_get_notification_service_singleton(self):
         """Test that get_notification_service returns singleton"""
         with patch('notification_service.NotificationService') as mock_service_class:
@@ -327,6 +622,10 @@ class TestNotificationTypes:
         for expected_type in expected_types:
             assert hasattr(NotificationType, expected_type.upper())
             assert getattr(NotificationType, expected_type.upper()).value == expected_type
+    
+    def test_notification_type_values(self):
+        """Test the value lookup set covers every notification type"""
+        assert notification_service.NOTIFICATION_TYPE_VALUES == {nt.value for nt in NotificationType}
 
 
 class TestNotificationErrorHandling:
@@ -434,11 +733,16 @@ class TestNotificationErrorHandling:
         mock_sns = Mock()
         mock_boto3_client.return_value = mock_sns
         
-        # First call succeeds, second fails, third succeeds
-        mock_sns.publish.side_effect = [
-            {'MessageId': 'msg-1'},
-            Exception('SNS Error'),
-            {'MessageId': 'msg-3'}
+        # Entry 1 fails on both the initial request and the retry
+        mock_sns.publish_batch.side_effect = [
+            {
+                'Successful': [{'Id': '0', 'MessageId': 'msg-1'}, {'Id': '2', 'MessageId': 'msg-3'}],
+                'Failed': [{'Id': '1', 'Code': 'InternalError', 'SenderFault': False}]
+            },
+            {
+                'Successful': [],
+                'Failed': [{'Id': '1', 'Code': 'InternalError', 'SenderFault': False}]
+            }
         ]
         
         service = NotificationService()
@@ -464,7 +768,40 @@ class TestNotificationErrorHandling:
         success_count = service.send_batch_notification(notifications)
         
         assert success_count == 2  # Two successful, one failed
-        assert mock_sns.publish.call_count == 3
+        assert mock_sns.publish_batch.call_count == 2
+        
+        # Only the failed entry is retried
+        retry_entries = mock_sns.publish_batch.call_args_list[1][1]['PublishBatchRequestEntries']
+        assert [entry['Id'] for entry in retry_entries] == ['1']
+    
+    @patch('notification_service.boto3.client')
+    def test_batch_notification_retry_succeeds(self, mock_boto3_client):
+        """Test failed batch entries are recovered by the retry"""
+        mock_sns = Mock()
+        mock_boto3_client.return_value = mock_sns
+        mock_sns.publish_batch.side_effect = [
+            {
+                'Successful': [{'Id': '0', 'MessageId': 'msg-1'}],
+                'Failed': [{'Id': '1', 'Code': 'Throttled', 'SenderFault': False}]
+            },
+            {
+                'Successful': [{'Id': '1', 'MessageId': 'msg-2'}],
+                'Failed': []
+            }
+        ]
+        
+        service = NotificationService()
+        
+        notifications = [
+            {
+                'notification_type': NotificationType.DOCUMENT_UPLOADED,
+                'subject': f'Test {i}',
+                'message': f'Message {i}'
+            }
+            for i in range(2)
+        ]
+        
+        assert service.send_batch_notification(notifications) == 2
     
     @patch('notification_service.boto3.client')
     def test_malformed_message_attributes(self, mock_boto3_client):
@@ -513,7 +850,7 @@ class TestNotificationErrorHandling:
             mock_sts.get_caller_identity.side_effect = Exception('STS Error')
             
             with patch('notification_service.boto3.client') as mock_client:
-                mock_client.side_effect = lambda service: mock_sns if service == 'sns' else mock_sts
+                mock_client.side_effect = lambda service, **kwargs: mock_sns if service == 'sns' else mock_sts
                 
                 # Should raise exception when STS fails during initialization
                 with pytest.raises(Exception) as exc_info:
@@ -579,6 +916,8 @@ class TestNotificationDeliveryScenarios:
             )
             assert result is True
         
+        notification_service.flush_notifications()
+        
         # Verify all notifications were sent
         assert mock_sns.publish.call_count == len(workflow_notifications)
     
@@ -604,6 +943,7 @@ class TestNotificationDeliveryScenarios:
             notification_type=NotificationType.ANALYSIS_FAILED,
             additional_info=error_info
         )
+        notification_service.flush_notifications()
         
         assert result is True
         
@@ -623,7 +963,7 @@ class TestNotificationDeliveryScenarios:
         """Test handling of high volume notifications"""
         mock_sns = Mock()
         mock_boto3_client.return_value = mock_sns
-        mock_sns.publish.return_value = {'MessageId': 'test-message-id'}
+        mock_sns.publish_batch.side_effect = publish_batch_success
         
         service = NotificationService()
         
@@ -640,7 +980,16 @@ class TestNotificationDeliveryScenarios:
         success_count = service.send_batch_notification(large_batch)
         
         assert success_count == 100
-        assert mock_sns.publish.call_count == 100
+        # SNS accepts at most 10 entries per PublishBatch request
+        assert mock_sns.publish_batch.call_count == 10
+        
+        # All entries share one batch timestamp
+        timestamps = {
+            entry['MessageAttributes']['timestamp']['StringValue']
+            for call in mock_sns.publish_batch.call_args_list
+            for entry in call[1]['PublishBatchRequestEntries']
+        }
+        assert len(timestamps) == 1
     
     @patch('notification_service.boto3.client')
     def test_notification_with_special_characters(self, mock_boto3_client):
@@ -668,6 +1017,7 @@ class TestNotificationDeliveryScenarios:
             notification_type=NotificationType.PROCESSING_COMPLETED,
             additional_info={'note': 'Completed with 100% success! ✅'}
         )
+        notification_service.flush_notifications()
         
         assert result is True
         
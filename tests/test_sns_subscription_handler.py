@@ -0,0 +1,352 @@
+"""
+Tests for the SNS subscription handler
+"""
+
+import pytest
+import json
+import os
+import base64
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import Mock, MagicMock, patch
+import sys
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'shared'))
+
+import sns_subscription_handler
+from sns_subscription_handler import SNSSubscriptionHandler, verify_sns_signature
+
+
+CERT_URL = 'https://sns.us-east-1.amazonaws.com/SimpleNotificationService-test.pem'
+SUBSCRIBE_URL = 'https://sns.us-east-1.amazonaws.com/?Action=ConfirmSubscription&Token=abc'
+
+
+@pytest.fixture(scope='module')
+def signing_key():
+    """Self-signed RSA key pair standing in for the SNS signing certificate"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'sns.amazonaws.com')])
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, certificate
+
+
+def make_confirmation(key, signature_version='1'):
+    """Build a signed SubscriptionConfirmation message"""
+    message = {
+        'Type': 'SubscriptionConfirmation',
+        'MessageId': 'msg-123',
+        'Token': 'abc',
+        'TopicArn': 'arn:aws:sns:us-east-1:123456789012:test-notifications',
+        'Message': 'You have chosen to subscribe to the topic.',
+        'SubscribeURL': SUBSCRIBE_URL,
+        'Timestamp': '2024-01-01T00:00:00.000Z',
+        'SignatureVersion': signature_version,
+        'SigningCertURL': CERT_URL
+    }
+    fields = ('Message', 'MessageId', 'SubscribeURL', 'Timestamp', 'Token', 'TopicArn', 'Type')
+    string_to_sign = ''.join(f"{field}\n{message[field]}\n" for field in fields)
+    algorithm = hashes.SHA256() if signature_version == '2' else hashes.SHA1()
+    signature = key.sign(string_to_sign.encode('utf-8'), padding.PKCS1v15(), algorithm)
+    message['Signature'] = base64.b64encode(signature).decode('ascii')
+    return message
+
+
+def make_record(message_type='Notification', message='plain text', attributes=None):
+    """Build a Lambda SNS event record"""
+    return {
+        'EventSource': 'aws:sns',
+        'Sns': {
+            'Type': message_type,
+            'Subject': 'Test Subject',
+            'Message': message,
+            'TopicArn': 'arn:aws:sns:us-east-1:123456789012:test-notifications',
+            'MessageAttributes': attributes or {}
+        }
+    }
+
+
+class TestSNSSubscriptionHandler:
+    """Test cases for SNSSubscriptionHandler"""
+    
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.client_patcher = patch('sns_subscription_handler.get_sns_client')
+        self.mock_get_client = self.client_patcher.start()
+        self.mock_sns = Mock()
+        self.mock_get_client.return_value = self.mock_sns
+        self.handler = SNSSubscriptionHandler()
+    
+    def teardown_method(self):
+        """Clean up after tests"""
+        self.client_patcher.stop()
+    
+    def test_handle_sns_message_processes_all_records(self):
+        """Test every SNS record is processed and non-SNS records are skipped"""
+        event = {
+            'Records': [
+                make_record(message='first'),
+                {'EventSource': 'aws:sqs', 'body': 'ignored'},
+                make_record(message='second')
+            ]
+        }
+        
+        with patch.object(self.handler, 'process_sns_record') as mock_process:
+            response = self.handler.handle_sns_message(event)
+        
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['message'] == 'SNS messages processed successfully'
+        assert mock_process.call_count == 2
+        processed = {call[0][0]['Sns']['Message'] for call in mock_process.call_args_list}
+        assert processed == {'first', 'second'}
+    
+    def test_handle_sns_message_processes_records_concurrently(self):
+        """Test records are dispatched in parallel rather than one at a time"""
+        barrier = threading.Barrier(3, timeout=5)
+        event = {'Records': [make_record(message=str(i)) for i in range(3)]}
+        
+        # Each record blocks until all three are in flight at once
+        with patch.object(self.handler, 'process_sns_record', side_effect=lambda record: barrier.wait()):
+            response = self.handler.handle_sns_message(event)
+        
+        assert response['statusCode'] == 200
+    
+    def test_handle_sns_message_reports_failure(self):
+        """Test a record failure produces an error response"""
+        event = {'Records': [make_record()]}
+        
+        with patch.object(self.handler, 'process_sns_record', side_effect=Exception('boom')):
+            response = self.handler.handle_sns_message(event)
+        
+        assert response['statusCode'] == 500
+        assert json.loads(response['body'])['message'] == 'boom'
+    
+    def test_metrics_flushed_once_per_event_as_emf(self, capsys):
+        """Test notification counts are buffered and emitted as EMF per type"""
+        attributes = {'notification_type': {'Type': 'String', 'Value': 'document_uploaded'}}
+        event = {
+            'Records': [
+                make_record(message=json.dumps({'n': 1}), attributes=attributes),
+                make_record(message=json.dumps({'n': 2}), attributes=attributes),
+                make_record(message='plain text')
+            ]
+        }
+        
+        response = self.handler.handle_sns_message(event)
+        
+        assert response['statusCode'] == 200
+        documents = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        counts = {doc['NotificationType']: doc['NotificationsProcessed'] for doc in documents}
+        assert counts == {'document_uploaded': 2, 'plain_text': 1}
+        
+        metric_directive = documents[0]['_aws']['CloudWatchMetrics'][0]
+        assert metric_directive['Namespace'] == 'EnergyGrid/ComplianceCopilot'
+        assert metric_directive['Dimensions'] == [['NotificationType']]
+        
+        # Buffer is cleared after flushing
+        self.handler.flush_notification_metrics()
+        assert capsys.readouterr().out == ''
+    
+    def test_handle_notification_json_message(self):
+        """Test JSON messages are routed to structured processing"""
+        attributes = {'notification_type': {'Type': 'String', 'Value': 'document_uploaded'}}
+        record = make_record(message=json.dumps({'document_id': 'doc_123'}), attributes=attributes)
+        
+        with patch.object(self.handler, 'process_notification_data') as mock_data, \
+             patch.object(self.handler, 'process_plain_text_notification') as mock_text:
+            self.handler.process_sns_record(record)
+        
+        mock_data.assert_called_once_with({'document_id': 'doc_123'}, attributes)
+        mock_text.assert_not_called()
+    
+    def test_handle_notification_plain_text_message(self):
+        """Test plain text messages are routed to plain text processing"""
+        record = make_record(message='Document uploaded successfully')
+        
+        with patch.object(self.handler, 'process_notification_data') as mock_data, \
+             patch.object(self.handler, 'process_plain_text_notification') as mock_text:
+            self.handler.process_sns_record(record)
+        
+        mock_data.assert_not_called()
+        mock_text.assert_called_once_with('Test Subject', 'Document uploaded successfully', {})
+
+    
+    def test_process_notification_data_reads_attribute_values(self):
+        """Test Lambda (Value) and raw (StringValue) attribute shapes are both read"""
+        attributes = {
+            'notification_type': {'Type': 'String', 'Value': 'analysis_completed'},
+            'user_id': {'DataType': 'String', 'StringValue': 'user123'}
+        }
+        
+        with patch.object(self.handler, 'log_notification_metrics') as mock_metrics, \
+             patch.object(sns_subscription_handler.logger, 'info') as mock_info:
+            self.handler.process_notification_data({'document_id': 'doc_123'}, attributes)
+        
+        mock_metrics.assert_called_once_with('analysis_completed', {'document_id': 'doc_123'})
+        assert 'for user user123' in mock_info.call_args[0][0]
+        assert sns_subscription_handler._EMPTY == {}
+    
+    def test_process_notification_data_flags_unknown_type(self):
+        """Test unknown notification types are logged as warnings"""
+        attributes = {'notification_type': {'Type': 'String', 'Value': 'not_a_real_type'}}
+        
+        with patch.object(sns_subscription_handler.logger, 'warning') as mock_warning:
+            self.handler.process_notification_data({}, attributes)
+        
+        mock_warning.assert_called_once()
+        assert 'not_a_real_type' in mock_warning.call_args[0][0]
+    
+    @pytest.mark.skipif(not sns_subscription_handler.IJSON_AVAILABLE, reason="ijson not installed")
+    def test_large_json_message_keeps_top_level_fields_only(self):
+        """Test large payloads are stream-parsed without materializing nested data"""
+        payload = {
+            'document_id': 'doc_123',
+            'obligations_count': 5,
+            'report': {'sections': ['x' * 1024] * 100}
+        }
+        record = make_record(message=json.dumps(payload))
+        assert len(record['Sns']['Message']) > sns_subscription_handler.LARGE_MESSAGE_THRESHOLD
+        
+        with patch.object(self.handler, 'process_notification_data') as mock_data, \
+             patch('sns_subscription_handler._loads') as mock_loads:
+            self.handler.process_sns_record(record)
+        
+        mock_loads.assert_not_called()
+        assert mock_data.call_args[0][0] == {'document_id': 'doc_123', 'obligations_count': 5}
+    
+    @pytest.mark.skipif(not sns_subscription_handler.IJSON_AVAILABLE, reason="ijson not installed")
+    def test_large_malformed_json_message_falls_back(self):
+        """Test large malformed payloads fall back to plain text processing"""
+        message = '{"document_id": "' + 'x' * (sns_subscription_handler.LARGE_MESSAGE_THRESHOLD + 1)
+        record = make_record(message=message)
+        
+        with patch.object(self.handler, 'process_plain_text_notification') as mock_text:
+            self.handler.process_sns_record(record)
+        
+        mock_text.assert_called_once()
+    
+    def test_handle_notification_plain_text_skips_json_parse(self):
+        """Test plain text bodies never reach the JSON parser"""
+        record = make_record(message='Not JSON at all')
+        
+        with patch('sns_subscription_handler._loads') as mock_loads, \
+             patch.object(self.handler, 'process_plain_text_notification') as mock_text:
+            self.handler.process_sns_record(record)
+        
+        mock_loads.assert_not_called()
+        mock_text.assert_called_once()
+    
+    def test_handle_notification_malformed_json_falls_back(self):
+        """Test malformed JSON-looking bodies fall back to plain text processing"""
+        record = make_record(message='{not valid json')
+        
+        with patch.object(self.handler, 'process_notification_data') as mock_data, \
+             patch.object(self.handler, 'process_plain_text_notification') as mock_text:
+            self.handler.process_sns_record(record)
+        
+        mock_data.assert_not_called()
+        mock_text.assert_called_once_with('Test Subject', '{not valid json', {})
+
+
+
+class TestSubscriptionConfirmation:
+    """Test SubscribeURL confirmation and SNS signature verification"""
+    
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.client_patcher = patch('sns_subscription_handler.get_sns_client')
+        self.mock_sns = Mock()
+        self.client_patcher.start().return_value = self.mock_sns
+        self.handler = SNSSubscriptionHandler()
+    
+    def teardown_method(self):
+        """Clean up after tests"""
+        self.client_patcher.stop()
+    
+    @pytest.mark.parametrize('signature_version', ['1', '2'])
+    def test_verify_valid_signature(self, signing_key, signature_version):
+        """Test a correctly signed message verifies"""
+        key, certificate = signing_key
+        message = make_confirmation(key, signature_version)
+        
+        with patch('sns_subscription_handler._load_signing_certificate', return_value=certificate):
+            assert verify_sns_signature(message) is True
+    
+    def test_verify_tampered_message(self, signing_key):
+        """Test a modified message fails verification"""
+        key, certificate = signing_key
+        message = make_confirmation(key)
+        message['SubscribeURL'] = 'https://sns.us-east-1.amazonaws.com/?Action=Other'
+        
+        with patch('sns_subscription_handler._load_signing_certificate', return_value=certificate):
+            assert verify_sns_signature(message) is False
+    
+    def test_verify_rejects_untrusted_certificate_url(self, signing_key):
+        """Test certificates not hosted by SNS are never fetched"""
+        key, _ = signing_key
+        message = make_confirmation(key)
+        message['SigningCertURL'] = 'https://evil.example.com/cert.pem'
+        
+        with patch('sns_subscription_handler._load_signing_certificate') as mock_load:
+            assert verify_sns_signature(message) is False
+        
+        mock_load.assert_not_called()
+    
+    def test_confirmation_uses_subscribe_url(self, signing_key):
+        """Test a verified confirmation visits SubscribeURL instead of calling SNS"""
+        key, certificate = signing_key
+        message = make_confirmation(key)
+        
+        with patch('sns_subscription_handler._load_signing_certificate', return_value=certificate), \
+             patch('sns_subscription_handler.urllib.request.urlopen', return_value=MagicMock()) as mock_urlopen:
+            self.handler.handle_subscription_confirmation(message)
+        
+        mock_urlopen.assert_called_once_with(SUBSCRIBE_URL, timeout=5)
+        self.mock_sns.confirm_subscription.assert_not_called()
+    
+    def test_confirmation_with_bad_signature_is_refused(self, signing_key):
+        """Test an unverified confirmation is not confirmed"""
+        key, certificate = signing_key
+        message = make_confirmation(key)
+        message['Token'] = 'forged'
+        
+        with patch('sns_subscription_handler._load_signing_certificate', return_value=certificate), \
+             patch('sns_subscription_handler.urllib.request.urlopen') as mock_urlopen:
+            self.handler.handle_subscription_confirmation(message)
+        
+        mock_urlopen.assert_not_called()
+        self.mock_sns.confirm_subscription.assert_not_called()
+    
+    def test_confirmation_falls_back_to_api_without_subscribe_url(self):
+        """Test messages without a SubscribeURL are confirmed with the token"""
+        self.mock_sns.confirm_subscription.return_value = {'SubscriptionArn': 'arn:sub'}
+        message = {
+            'Type': 'SubscriptionConfirmation',
+            'Token': 'abc',
+            'TopicArn': 'arn:aws:sns:us-east-1:123456789012:test-notifications'
+        }
+        
+        self.handler.handle_subscription_confirmation(message)
+        
+        self.mock_sns.confirm_subscription.assert_called_once_with(
+            TopicArn='arn:aws:sns:us-east-1:123456789012:test-notifications',
+            Token='abc'
+        )
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
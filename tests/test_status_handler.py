@@ -5,6 +5,7 @@ Tests for the status handler Lambda function
 import pytest
 import json
 import os
+from decimal import Decimal
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 import sys
@@ -15,7 +16,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'status'))
 
 from handler import (
     lambda_handler, calculate_progress, get_current_stage_name,
-    estimate_completion_time, calculate_duration
+    estimate_completion_time, calculate_duration, _aggregate_records,
+    _resolve_stage_name, _STATUS_CACHE
 )
 from models import Document, ProcessingStatusRecord, ProcessingStatus
 
@@ -25,6 +27,8 @@ class TestStatusHandler:
     
     def setup_method(self):
         """Set up test fixtures"""
+        _STATUS_CACHE.clear()
+        
         # Create test document
         self.test_document = Document(
             document_id='doc_test123',
@@ -79,9 +83,7 @@ class TestStatusHandler:
         # Mock database helper
         mock_db_helper = Mock()
         mock_get_db_helper.return_value = mock_db_helper
-        mock_db_helper.get_document.return_value = self.test_document
-        mock_db_helper.get_processing_status.return_value = self.test_status_records
-        mock_db_helper.get_current_processing_stage.return_value = self.test_status_records[1]
+        mock_db_helper.get_document_with_status.return_value = (self.test_document, self.test_status_records)
         
         # Call handler
         response = lambda_handler(self.test_event, self.test_context)
@@ -102,9 +104,10 @@ class TestStatusHandler:
         assert 'current_stage' in body
         
         # Verify database calls
-        mock_db_helper.get_document.assert_called_once_with('doc_test123')
-        mock_db_helper.get_processing_status.assert_called_once_with('doc_test123')
-        mock_db_helper.get_current_processing_stage.assert_called_once_with('doc_test123')
+        mock_db_helper.get_document_with_status.assert_called_once_with('doc_test123')
+        
+        # Current stage is derived from the fetched records
+        assert body['current_stage']['stage'] == 'analysis'
     
     @patch('handler.get_db_helper')
     def test_lambda_handler_with_details(self, mock_get_db_helper):
@@ -112,9 +115,7 @@ class TestStatusHandler:
         # Mock database helper
         mock_db_helper = Mock()
         mock_get_db_helper.return_value = mock_db_helper
-        mock_db_helper.get_document.return_value = self.test_document
-        mock_db_helper.get_processing_status.return_value = self.test_status_records
-        mock_db_helper.get_current_processing_stage.return_value = self.test_status_records[1]
+        mock_db_helper.get_document_with_status.return_value = (self.test_document, self.test_status_records)
         
         # Modify event to request details
         event_with_details = self.test_event.copy()
@@ -141,6 +142,95 @@ class TestStatusHandler:
         assert analysis_stage['status'] == 'processing'
         assert analysis_stage['completed_at'] is None
     
+    @patch('handler.get_db_helper')
+    def test_lambda_handler_details_in_chronological_order(self, mock_get_db_helper):
+        """Test stage details are ordered by start time, not by the table's stage sort key"""
+        mock_db_helper = Mock()
+        mock_get_db_helper.return_value = mock_db_helper
+        # DynamoDB returns records ordered by the 'stage' range key
+        key_ordered_records = sorted(self.test_status_records, key=lambda r: r.stage)
+        mock_db_helper.get_document_with_status.return_value = (self.test_document, key_ordered_records)
+        
+        event_with_details = dict(self.test_event, queryStringParameters={'details': 'true'})
+        response = lambda_handler(event_with_details, self.test_context)
+        
+        stages = [stage['stage'] for stage in json.loads(response['body'])['stages']]
+        assert stages == ['upload', 'analysis']
+    
+    @patch('handler.get_db_helper')
+    def test_lambda_handler_serializes_metadata_values(self, mock_get_db_helper):
+        """Test DynamoDB metadata values are serialized in the details response"""
+        checked_at = datetime(2024, 1, 1, 12, 30, 0)
+        self.test_status_records[0].metadata = {'pages': Decimal('10'), 'checked_at': checked_at}
+        
+        mock_db_helper = Mock()
+        mock_get_db_helper.return_value = mock_db_helper
+        mock_db_helper.get_document_with_status.return_value = (self.test_document, self.test_status_records)
+        
+        event_with_details = dict(self.test_event, queryStringParameters={'details': 'true'})
+        response = lambda_handler(event_with_details, self.test_context)
+        
+        assert response['statusCode'] == 200
+        metadata = json.loads(response['body'])['stages'][0]['metadata']
+        assert metadata == {'pages': '10', 'checked_at': '2024-01-01T12:30:00'}
+    
+    @patch('handler.get_db_helper')
+    def test_lambda_handler_reuses_recent_lookup(self, mock_get_db_helper):
+        """Test rapid polls for the same document share one database lookup"""
+        mock_db_helper = Mock()
+        mock_get_db_helper.return_value = mock_db_helper
+        mock_db_helper.get_document_with_status.return_value = (self.test_document, self.test_status_records)
+        
+        with patch('handler.time.monotonic', side_effect=[100.0, 101.0, 103.0]):
+            for _ in range(3):
+                response = lambda_handler(self.test_event, self.test_context)
+                assert response['statusCode'] == 200
+        
+        # The third poll falls outside the cache TTL
+        assert mock_db_helper.get_document_with_status.call_count == 2
+    
+    @patch('handler.get_db_helper')
+    def test_lambda_handler_unchanged_status_not_modified(self, mock_get_db_helper):
+        """Test a poll carrying the current ETag gets a bodiless 304"""
+        mock_db_helper = Mock()
+        mock_get_db_helper.return_value = mock_db_helper
+        mock_db_helper.get_document_with_status.return_value = (self.test_document, self.test_status_records)
+        
+        first = lambda_handler(self.test_event, self.test_context)
+        etag = first['headers']['ETag']
+        assert etag.startswith('W/"')
+        
+        # Time-derived fields move between polls without changing the tag
+        with patch('handler.datetime') as mock_datetime:
+            mock_datetime.utcnow.return_value = datetime.utcnow() + timedelta(seconds=30)
+            conditional_event = {**self.test_event, 'headers': {'If-None-Match': etag}}
+            response = lambda_handler(conditional_event, self.test_context)
+        
+        assert response['statusCode'] == 304
+        assert response['body'] == ''
+        assert response['headers']['ETag'] == etag
+        
+        # A stage change produces a new tag and a full response
+        self.test_status_records[1].status = ProcessingStatus.COMPLETED
+        self.test_status_records[1].completed_at = datetime.utcnow()
+        _STATUS_CACHE.clear()
+        response = lambda_handler(conditional_event, self.test_context)
+        assert response['statusCode'] == 200
+        assert response['headers']['ETag'] != etag
+    
+    @patch('handler.get_db_helper')
+    def test_lambda_handler_does_not_cache_missing_document(self, mock_get_db_helper):
+        """Test a missing document is looked up again on the next poll"""
+        mock_db_helper = Mock()
+        mock_get_db_helper.return_value = mock_db_helper
+        mock_db_helper.get_document_with_status.side_effect = [
+            (None, []),
+            (self.test_document, self.test_status_records)
+        ]
+        
+        assert lambda_handler(self.test_event, self.test_context)['statusCode'] == 404
+        assert lambda_handler(self.test_event, self.test_context)['statusCode'] == 200
+    
     def test_lambda_handler_missing_document_id(self):
         """Test handler with missing document ID"""
         # Event without document ID
@@ -179,7 +269,7 @@ class TestStatusHandler:
         # Mock database helper to return None
         mock_db_helper = Mock()
         mock_get_db_helper.return_value = mock_db_helper
-        mock_db_helper.get_document.return_value = None
+        mock_db_helper.get_document_with_status.return_value = (None, [])
         
         response = lambda_handler(self.test_event, self.test_context)
         
@@ -194,7 +284,7 @@ class TestStatusHandler:
         # Mock database helper to raise exception
         mock_db_helper = Mock()
         mock_get_db_helper.return_value = mock_db_helper
-        mock_db_helper.get_document.side_effect = Exception('Database connection failed')
+        mock_db_helper.get_document_with_status.side_effect = Exception('Database connection failed')
         
         response = lambda_handler(self.test_event, self.test_context)
         
@@ -274,6 +364,54 @@ class TestStatusHandler:
         assert progress['percentage'] >= 10  # Minimum progress for failed
         assert progress['completed_stages'] == 1
     
+    def test_aggregate_records(self):
+        """Test single-pass summary of status records"""
+        base_time = datetime.utcnow() - timedelta(minutes=10)
+        records = [
+            ProcessingStatusRecord(
+                document_id='doc_test',
+                stage='analysis',
+                status=ProcessingStatus.COMPLETED,
+                started_at=base_time + timedelta(minutes=1),
+                completed_at=base_time + timedelta(minutes=4),
+                metadata={}
+            ),
+            ProcessingStatusRecord(
+                document_id='doc_test',
+                stage='upload',
+                status=ProcessingStatus.COMPLETED,
+                started_at=base_time,
+                completed_at=base_time + timedelta(seconds=30),
+                metadata={}
+            ),
+            ProcessingStatusRecord(
+                document_id='doc_test',
+                stage='planning',
+                status=ProcessingStatus.PROCESSING,
+                started_at=base_time + timedelta(minutes=5),
+                metadata={}
+            ),
+            ProcessingStatusRecord(
+                document_id='doc_test',
+                stage='reporting',
+                status=ProcessingStatus.PROCESSING,
+                started_at=base_time + timedelta(minutes=6),
+                metadata={}
+            )
+        ]
+        
+        aggregate = _aggregate_records(records)
+        
+        assert aggregate.completed_weight == 50
+        assert aggregate.completed_count == 2
+        assert aggregate.current_stage == 'planning'
+        assert aggregate.latest_completed is records[0]
+        
+        empty = _aggregate_records([])
+        assert empty.completed_count == 0
+        assert empty.current_stage is None
+        assert empty.latest_completed is None
+    
     def test_get_current_stage_name_processing(self):
         """Test getting current stage name during processing"""
         processing_records = [
@@ -326,6 +464,34 @@ class TestStatusHandler:
         stage_name = get_current_stage_name(completed_records)
         assert stage_name == 'Generating Tasks'
     
+    def test_get_current_stage_name_after_final_stage(self):
+        """Test stage name once the last pipeline stage has completed"""
+        completed_records = [
+            ProcessingStatusRecord(
+                document_id='doc_test',
+                stage='reporting',
+                status=ProcessingStatus.COMPLETED,
+                started_at=datetime.utcnow() - timedelta(minutes=3),
+                completed_at=datetime.utcnow() - timedelta(minutes=1),
+                error_message=None,
+                metadata={}
+            )
+        ]
+        
+        assert get_current_stage_name(completed_records) == 'Processing Complete'
+    
+    def test_resolve_stage_name_cached(self):
+        """Test repeated resolutions of the same stage state hit the cache"""
+        _resolve_stage_name.cache_clear()
+        
+        assert _resolve_stage_name('analysis', 'upload') == 'Analyzing Document'
+        assert _resolve_stage_name('analysis', 'upload') == 'Analyzing Document'
+        assert _resolve_stage_name(None, 'analysis') == 'Generating Tasks'
+        assert _resolve_stage_name(None, 'custom') == 'Analyzing Document'
+        assert _resolve_stage_name('custom_stage', None) == 'Custom_Stage'
+        
+        assert _resolve_stage_name.cache_info().hits == 1
+    
     def test_get_current_stage_name_empty_records(self):
         """Test getting stage name with no records"""
         stage_name = get_current_stage_name([])
@@ -404,6 +570,42 @@ class TestStatusHandler:
         assert duration >= 110  # Should be around 2 minutes (120 seconds), allowing for test execution time
         assert duration <= 130  # Upper bound to account for test execution time
     
+    def test_calculate_duration_uses_reference_time(self):
+        """Test in-progress duration is measured against the supplied reference time"""
+        started_at = datetime(2024, 1, 1, 12, 0, 0)
+        processing_record = ProcessingStatusRecord(
+            document_id='doc_test',
+            stage='analysis',
+            status=ProcessingStatus.PROCESSING,
+            started_at=started_at,
+            completed_at=None,
+            error_message=None,
+            metadata={}
+        )
+        
+        duration = calculate_duration(processing_record, started_at + timedelta(seconds=75))
+        assert duration == 75
+    
+    def test_estimate_completion_time_uses_reference_time(self):
+        """Test completion estimate is anchored to the supplied reference time"""
+        started_at = datetime(2024, 1, 1, 12, 0, 0)
+        current_stage = ProcessingStatusRecord(
+            document_id='doc_test',
+            stage='planning',
+            status=ProcessingStatus.PROCESSING,
+            started_at=started_at,
+            completed_at=None,
+            error_message=None,
+            metadata={}
+        )
+        now = started_at + timedelta(seconds=20)
+        
+        estimated_time = estimate_completion_time([current_stage], current_stage, now)
+        
+        # 100s left in planning plus 180s for reporting
+        expected = datetime.fromtimestamp(now.timestamp() + 280)
+        assert datetime.fromisoformat(estimated_time) == expected
+    
     def test_calculate_duration_not_completed(self):
         """Test duration calculation for non-completed, non-processing stage"""
         failed_record = ProcessingStatusRecord(
@@ -425,6 +627,7 @@ class TestStatusHandlerIntegration:
     
     def setup_method(self):
         """Set up integration test fixtures"""
+        _STATUS_CACHE.clear()
         self.test_context = Mock()
         self.test_context.aws_request_id = 'integration-test-request'
     
@@ -477,9 +680,7 @@ class TestStatusHandlerIntegration:
         # Mock database helper
         mock_db_helper = Mock()
         mock_get_db_helper.return_value = mock_db_helper
-        mock_db_helper.get_document.return_value = document
-        mock_db_helper.get_processing_status.return_value = status_records
-        mock_db_helper.get_current_processing_stage.return_value = status_records[2]
+        mock_db_helper.get_document_with_status.return_value = (document, status_records)
         
         # Test event with details
         event = {
@@ -22,7 +22,8 @@ from handler import (
     UploadError,
     extract_user_id_from_context,
     parse_multipart_form_data,
-    lambda_handler
+    lambda_handler,
+    _decode_base64_body
 )
 from models import ProcessingStatus
 from config import Config
@@ -78,18 +79,30 @@ class TestFileValidator:
         assert exc_info.value.status_code == 400
         assert "Invalid PDF file format" in exc_info.value.message
     
+    def test_validate_valid_pdf(self):
+        """Test the combined validation accepts a well-formed PDF"""
+        pdf_content = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\n%%EOF'
+        assert FileValidator.validate(pdf_content, 'test.pdf') is True
+    
+    def test_validate_checks_size_first(self):
+        """Test the combined validation reports an empty file before format problems"""
+        with pytest.raises(UploadError) as exc_info:
+            FileValidator.validate(b'', 'test.txt')
+        
+        assert exc_info.value.status_code == 400
+        assert "must be positive" in exc_info.value.message
+    
     def test_validate_file_format_exception_handling(self):
         """Test exception handling in file format validation"""
-        with patch('mimetypes.guess_type', side_effect=Exception("Mimetypes error")):
-            content = b'%PDF-1.4\ntest\n%%EOF'
-            filename = 'test.pdf'
-            
-            # Should raise UploadError due to exception in mimetypes
-            with pytest.raises(UploadError) as exc_info:
-                FileValidator.validate_file_format(content, filename)
-            
-            assert exc_info.value.status_code == 400
-            assert "File format validation failed" in exc_info.value.message
+        content = None
+        filename = 'test.pdf'
+        
+        # Should raise UploadError due to the unexpected content type
+        with pytest.raises(UploadError) as exc_info:
+            FileValidator.validate_file_format(content, filename)
+        
+        assert exc_info.value.status_code == 400
+        assert "File format validation failed" in exc_info.value.message
     
     def test_validate_file_size_valid(self):
         """Test valid file size"""
@@ -146,6 +159,20 @@ class TestFileValidator:
         assert exc_info.value.status_code == 400
         assert "missing EOF marker" in exc_info.value.message
     
+    def test_validate_file_content_eof_only_in_body(self):
+        """Test an EOF marker far from the end of the file is not accepted"""
+        content = b'%PDF-1.4\n1 0 obj\n%%EOF\nendobj\n' + b'0' * 8192
+        
+        with pytest.raises(UploadError) as exc_info:
+            FileValidator.validate_file_content(content)
+        
+        assert "missing EOF marker" in exc_info.value.message
+    
+    def test_validate_file_content_trailing_bytes_after_eof(self):
+        """Test bytes appended after the EOF marker are tolerated"""
+        content = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\n%%EOF\n\x00\x00'
+        assert FileValidator.validate_file_content(content) is True
+    
     def test_validate_file_content_missing_objects(self):
         """Test PDF content missing object structure"""
         content = b'%PDF-1.4\nsome content\n%%EOF'
@@ -197,6 +224,15 @@ class TestS3Uploader:
         assert "test_file_with_spaces.pdf" in s3_key
         assert "/" not in s3_key.split("/")[-1]  # No slashes in filename part
     
+    @patch('handler.datetime')
+    def test_generate_s3_key_date_path(self, mock_datetime):
+        """Test S3 keys use a zero-padded date path and sanitize unsafe characters"""
+        mock_datetime.utcnow.return_value = datetime(2024, 3, 7, 12, 0, 0)
+        
+        s3_key = S3Uploader.generate_s3_key("user-1", "a\\b\x00c d.pdf", "doc_1")
+        
+        assert s3_key == "documents/user-1/2024/03/07/doc_1_a_b_c_d.pdf"
+    
     @patch('handler.Config')
     @patch('handler.get_s3_client')
     def test_upload_to_s3_success(self, mock_get_s3_client, mock_config):
@@ -230,6 +266,33 @@ class TestS3Uploader:
         assert metadata['content-type'] == 'application/pdf'
         assert 'upload-timestamp' in metadata
     
+    @patch('handler.S3_MULTIPART_THRESHOLD', 16)
+    @patch('handler.Config')
+    @patch('handler.get_s3_client')
+    def test_upload_to_s3_large_file_uses_multipart(self, mock_get_s3_client, mock_config):
+        """Test files over the threshold go through the managed multipart transfer"""
+        mock_s3 = Mock()
+        mock_get_s3_client.return_value = mock_s3
+        mock_config.DOCUMENTS_BUCKET = 'test-bucket'
+        
+        file_content = b'%PDF-1.4\n' + b'0' * 64
+        
+        result = S3Uploader.upload_to_s3(file_content, 'test/key.pdf', 'test.pdf', 'test-user')
+        
+        assert result is True
+        mock_s3.put_object.assert_not_called()
+        mock_s3.upload_fileobj.assert_called_once()
+        
+        fileobj, bucket, key = mock_s3.upload_fileobj.call_args.args
+        assert fileobj.getvalue() == file_content
+        assert (bucket, key) == ('test-bucket', 'test/key.pdf')
+        
+        kwargs = mock_s3.upload_fileobj.call_args.kwargs
+        assert kwargs['ExtraArgs']['ContentType'] == 'application/pdf'
+        assert kwargs['ExtraArgs']['ServerSideEncryption'] == 'AES256'
+        assert kwargs['ExtraArgs']['Metadata']['original-filename'] == 'test.pdf'
+        assert kwargs['Config'].max_concurrency == 8
+    
     @patch('handler.Config')
     @patch('handler.get_s3_client')
     def test_upload_to_s3_client_error(self, mock_get_s3_client, mock_config):
@@ -279,10 +342,12 @@ class TestS3Uploader:
 class TestProcessingPipeline:
     """Test processing pipeline functionality"""
     
+    @pytest.mark.parametrize('orjson_available', [True, False])
     @patch.dict(os.environ, {'ANALYSIS_QUEUE_URL': 'https://sqs.us-east-1.amazonaws.com/123456789/test-queue'})
     @patch('handler.get_sqs_client')
-    def test_send_to_analysis_queue_success(self, mock_get_sqs_client):
+    def test_send_to_analysis_queue_success(self, mock_get_sqs_client, orjson_available, monkeypatch):
         """Test successful message sending to analysis queue"""
+        monkeypatch.setattr('handler.ORJSON_AVAILABLE', orjson_available)
         mock_sqs = Mock()
         mock_get_sqs_client.return_value = mock_sqs
         mock_sqs.send_message.return_value = {'MessageId': 'test-message-id'}
@@ -313,6 +378,7 @@ class TestProcessingPipeline:
         assert message_attrs['stage']['StringValue'] == 'analysis'
     
     @patch.dict(os.environ, {}, clear=True)
+    @patch('handler.account_id', None)
     @patch('handler.Config')
     @patch('boto3.client')
     @patch('handler.get_sqs_client')
@@ -344,6 +410,30 @@ class TestProcessingPipeline:
         expected_url = 'https://sqs.us-west-2.amazonaws.com/123456789/test-analysis-queue'
         assert call_args[1]['QueueUrl'] == expected_url
     
+    @patch.dict(os.environ, {}, clear=True)
+    @patch('handler.account_id', None)
+    @patch('handler.Config')
+    @patch('boto3.client')
+    @patch('handler.get_sqs_client')
+    def test_send_to_analysis_queue_account_id_cached(self, mock_get_sqs_client, mock_boto_client, mock_config):
+        """Test the account ID is looked up once per container"""
+        mock_sqs = Mock()
+        mock_get_sqs_client.return_value = mock_sqs
+        mock_sqs.send_message.return_value = {'MessageId': 'test-message-id'}
+        
+        mock_sts = Mock()
+        mock_sts.get_caller_identity.return_value = {'Account': '123456789'}
+        mock_boto_client.return_value = mock_sts
+        
+        mock_config.ANALYSIS_QUEUE = 'test-analysis-queue'
+        mock_config.AWS_REGION = 'us-west-2'
+        
+        ProcessingPipeline.send_to_analysis_queue('doc_1', 'test/key1.pdf', 'test-user')
+        ProcessingPipeline.send_to_analysis_queue('doc_2', 'test/key2.pdf', 'test-user')
+        
+        mock_sts.get_caller_identity.assert_called_once()
+        assert mock_sqs.send_message.call_count == 2
+    
     @patch.dict(os.environ, {}, clear=True)
     @patch('handler.Config')
     @patch('handler.get_sqs_client')
@@ -544,6 +634,54 @@ class TestMultipartParsing:
         assert filename == 'test document.pdf'
         assert file_content in parsed_content
     
+    def test_parse_multipart_form_data_filename_followed_by_parameters(self):
+        """Test the filename stops at its closing quote"""
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        file_content = b'%PDF-1.4\ntest content\n%%EOF'
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; filename=\"test.pdf\"; name=\"file\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary={boundary}'
+            }
+        }
+        
+        parsed_content, filename = parse_multipart_form_data(event)
+        
+        assert filename == 'test.pdf'
+        assert parsed_content == file_content
+    
+    def test_parse_multipart_form_data_quoted_boundary_lowercase_headers(self):
+        """Test quoted boundaries and lowercase part header names are accepted"""
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        file_content = b'%PDF-1.4\ntest content\n%%EOF'
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"content-disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n"
+            f"content-type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary="{boundary}"'
+            }
+        }
+        
+        parsed_content, filename = parse_multipart_form_data(event)
+        
+        assert filename == 'test.pdf'
+        assert parsed_content == file_content
+    
     def test_parse_multipart_form_data_missing_boundary(self):
         """Test multipart parsing with missing boundary"""
         event = {
@@ -623,6 +761,122 @@ class TestMultipartParsing:
         assert filename == 'test.pdf'
         assert file_content in parsed_content
     
+    @patch('handler.PYBASE64_AVAILABLE', False)
+    def test_parse_multipart_form_data_stdlib_base64_fallback(self):
+        """Test base64 bodies decode without the pybase64 layer"""
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        file_content = b'%PDF-1.4\ntest content\n%%EOF'
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary={boundary}'
+            }
+        }
+        
+        parsed_content, filename = parse_multipart_form_data(event)
+        
+        assert filename == 'test.pdf'
+        assert parsed_content == file_content
+    
+    def test_parse_multipart_form_data_file_after_other_fields(self):
+        """Test the file part is found when other fields come first"""
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        file_content = b'%PDF-1.4\ntest content\n%%EOF'
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; name=\"notes\"\r\n\r\n"
+            f"quarterly filing\r\n"
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary={boundary}'
+            }
+        }
+        
+        parsed_content, filename = parse_multipart_form_data(event)
+        
+        assert filename == 'test.pdf'
+        assert parsed_content == file_content
+        assert isinstance(parsed_content, bytes)
+    
+    @patch('handler.B64_DECODE_WINDOW', 8)
+    def test_parse_multipart_form_data_small_decode_windows(self):
+        """Test markers split across base64 decode windows are still found"""
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        file_content = b'%PDF-1.4\ntest content\n%%EOF'
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary={boundary}'
+            }
+        }
+        
+        parsed_content, filename = parse_multipart_form_data(event)
+        
+        assert filename == 'test.pdf'
+        assert parsed_content == file_content
+    
+    @patch('handler.B64_DECODE_WINDOW', 8)
+    def test_decode_base64_body_stops_after_file_part(self):
+        """Test fields after the file part are never decoded"""
+        boundary_bytes = b'------WebKitFormBoundary7MA4YWxkTrZu0gW'
+        
+        body = (
+            b"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            b"Content-Disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n\r\n"
+            b"%PDF-1.4\n%%EOF\r\n"
+            b"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            b"Content-Disposition: form-data; name=\"notes\"\r\n\r\n"
+        ) + b'x' * 1024 + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        decoded = _decode_base64_body(base64.b64encode(body).decode(), boundary_bytes)
+        
+        assert body.startswith(bytes(decoded))
+        assert b'%PDF-1.4\n%%EOF\r\n' + boundary_bytes in decoded
+        assert len(decoded) < 200
+    
+    @patch('handler._decode_base64_body')
+    def test_parse_multipart_form_data_rejects_oversize_before_decoding(self, mock_decode):
+        """Test oversize base64 bodies are rejected from their encoded length"""
+        max_size = Config.MAX_FILE_SIZE_MB * 1024 * 1024
+        event = {
+            'body': 'A' * ((max_size + 1024 * 1024) * 4 // 3),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': 'multipart/form-data; boundary=test'
+            }
+        }
+        
+        with pytest.raises(UploadError) as exc_info:
+            parse_multipart_form_data(event)
+        
+        assert exc_info.value.status_code == 413
+        assert "exceeds maximum limit" in exc_info.value.message
+        mock_decode.assert_not_called()
+    
     def test_parse_multipart_form_data_exception_handling(self):
         """Test exception handling in multipart parsing"""
         event = {
@@ -648,11 +902,13 @@ class TestMultipartParsing:
 class TestLambdaHandler:
     """Test main lambda handler"""
     
+    @patch('notification_service.get_notification_service')
     @patch('handler.get_dynamodb_helper')
     @patch('handler.get_s3_client')
     @patch('handler.get_sqs_client')
     @patch('handler.Config.validate')
-    def test_lambda_handler_success(self, mock_config_validate, mock_get_sqs, mock_get_s3, mock_get_dynamodb):
+    def test_lambda_handler_success(self, mock_config_validate, mock_get_sqs, mock_get_s3, mock_get_dynamodb,
+                                    mock_get_notification_service):
         """Test successful upload handling"""
         # Setup mocks
         mock_config_validate.return_value = True
@@ -665,7 +921,7 @@ class TestLambdaHandler:
         mock_get_dynamodb.return_value = mock_dynamodb
         
         mock_sqs.send_message.return_value = {'MessageId': 'test-message-id'}
-        mock_dynamodb.put_item.return_value = True
+        mock_dynamodb.batch_put.return_value = True
         
         # Create test event
         file_content = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\n%%EOF'
@@ -709,11 +965,145 @@ class TestLambdaHandler:
         # Verify S3 upload was called
         mock_s3.put_object.assert_called_once()
         
-        # Verify DynamoDB puts were called (document and status records, plus update)
-        assert mock_dynamodb.put_item.call_count == 3
+        # Verify the document and status records were written in a single batch
+        mock_dynamodb.put_item.assert_not_called()
+        mock_dynamodb.batch_put.assert_called_once()
+        put_items = mock_dynamodb.batch_put.call_args.args[0]
+        assert len(put_items) == 2
+        document_item = next(item for _, item in put_items if 'stage' not in item)
+        assert document_item['processing_status'] == ProcessingStatus.PROCESSING.value
         
         # Verify SQS message was sent
         mock_sqs.send_message.assert_called_once()
+        
+        # Verify the upload notification was sent for the new document
+        notification_kwargs = mock_get_notification_service.return_value.send_document_notification.call_args.kwargs
+        assert notification_kwargs['document'].document_id == body_data['data']['document_id']
+        # Background publishing is only safe because the handler flushes before returning
+        assert notification_kwargs['async_publish'] is True
+        
+        # Verify every record of the upload carries the same timestamp
+        upload_timestamp = body_data['data']['upload_timestamp']
+        status_item = next(item for _, item in put_items if 'stage' in item)
+        assert status_item['started_at'] == upload_timestamp
+        assert mock_s3.put_object.call_args.kwargs['Metadata']['upload-timestamp'] == upload_timestamp
+        assert json.loads(mock_sqs.send_message.call_args.kwargs['MessageBody'])['timestamp'] == upload_timestamp
+    
+    @patch('notification_service.get_notification_service')
+    @patch('handler.get_dynamodb_helper')
+    @patch('handler.get_s3_client')
+    @patch('handler.get_sqs_client')
+    @patch('handler.Config.validate')
+    def test_lambda_handler_queue_error_marks_document_failed(self, mock_config_validate, mock_get_sqs, mock_get_s3,
+                                                              mock_get_dynamodb, mock_get_notification_service):
+        """Test a failed analysis queue send does not leave the document in PROCESSING"""
+        mock_config_validate.return_value = True
+        mock_sqs = Mock()
+        mock_dynamodb = Mock()
+        
+        mock_get_sqs.return_value = mock_sqs
+        mock_get_s3.return_value = Mock()
+        mock_get_dynamodb.return_value = mock_dynamodb
+        
+        mock_sqs.send_message.side_effect = Exception("SQS error")
+        mock_dynamodb.batch_put.return_value = True
+        
+        file_content = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\n%%EOF'
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary={boundary}'
+            },
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'sub': 'test-user-123'
+                    }
+                }
+            }
+        }
+        
+        with patch('error_handler.time.sleep'):
+            response = lambda_handler(event, {})
+        
+        assert response['statusCode'] == 500
+        assert json.loads(response['body'])['success'] is False
+        
+        document_id = mock_dynamodb.update_document_status.call_args.args[0]
+        mock_dynamodb.update_document_status.assert_called_once_with(document_id, ProcessingStatus.FAILED)
+    
+    @patch('notification_service.get_notification_service')
+    @patch('handler.get_dynamodb_helper')
+    @patch('handler.get_s3_client')
+    @patch('handler.get_sqs_client')
+    @patch('handler.Config.validate')
+    def test_lambda_handler_records_error_fails_upload(self, mock_config_validate, mock_get_sqs, mock_get_s3,
+                                                        mock_get_dynamodb, mock_get_notification_service):
+        """Test an upload whose records were not written is reported as failed and not announced"""
+        mock_config_validate.return_value = True
+        mock_dynamodb = Mock()
+        
+        mock_get_sqs.return_value = Mock()
+        mock_get_s3.return_value = Mock()
+        mock_get_dynamodb.return_value = mock_dynamodb
+        
+        mock_dynamodb.batch_put.return_value = False
+        
+        file_content = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\n%%EOF'
+        boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+        
+        body = (
+            f"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+            f"Content-Disposition: form-data; name=\"file\"; filename=\"test.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode() + file_content + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+        
+        event = {
+            'body': base64.b64encode(body).decode(),
+            'isBase64Encoded': True,
+            'headers': {
+                'content-type': f'multipart/form-data; boundary={boundary}'
+            },
+            'requestContext': {
+                'authorizer': {
+                    'claims': {
+                        'sub': 'test-user-123'
+                    }
+                }
+            }
+        }
+        
+        response = lambda_handler(event, {})
+        
+        assert response['statusCode'] == 500
+        assert json.loads(response['body']) == {'success': False, 'error': 'Failed to save document records'}
+        mock_get_notification_service.return_value.send_document_notification.assert_not_called()
+    
+    @patch('handler.Config.validate')
+    def test_lambda_handler_does_not_log_body(self, mock_config_validate, caplog):
+        """Test the request body is left out of the request log lines"""
+        mock_config_validate.return_value = True
+        event = {
+            'body': 'JVBERi0xLjQKc2VjcmV0IGNvbnRlbnQ=',
+            'isBase64Encoded': True,
+            'headers': {},
+            'requestContext': {}
+        }
+        
+        with caplog.at_level('DEBUG'):
+            lambda_handler(event, {})
+        
+        assert 'body_length=32' in caplog.text
+        assert event['body'] not in caplog.text
     
     def test_lambda_handler_authentication_error(self):
         """Test authentication error handling"""
@@ -0,0 +1,291 @@
+"""
+Tests for the X-Ray tracing module
+"""
+
+import pytest
+import os
+import json
+import itertools
+import threading
+from unittest.mock import Mock, patch
+import sys
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'shared'))
+
+import xray_tracing
+from xray_tracing import XRayTracer
+from xray_emitter import AsyncUDPEmitter
+
+
+@pytest.fixture
+def mock_recorder():
+    """Patch the module-level X-Ray recorder"""
+    with patch('xray_tracing.xray_recorder') as recorder:
+        recorder.is_sampled.return_value = True
+        yield recorder
+
+
+@pytest.fixture
+def enabled_tracer(mock_recorder):
+    """Tracer forced into the enabled state without configuring the SDK"""
+    tracer = XRayTracer()
+    tracer.enabled = True
+    tracer._configured = True
+    return tracer
+
+
+class TestXRayTracer:
+    """Test cases for XRayTracer decorators"""
+
+    def test_disabled_tracer_returns_function_unchanged(self):
+        """Test decorators are a no-op when tracing is disabled"""
+        tracer = XRayTracer()
+        tracer.enabled = False
+
+        def operation():
+            return 'result'
+
+        assert tracer.capture_aws_service_call('sqs', 'send_message')(operation) is operation
+        assert tracer.capture_s3_operation('bucket', 'put_object')(operation) is operation
+
+    @patch.dict(os.environ, {'_X_AMZN_TRACE_ID': 'Root=1-5759e988-bd862e3fe1be46a994272793;Sampled=1'})
+    def test_sdk_configured_on_first_use(self):
+        """Test the recorder is configured and patched lazily, once"""
+        recorder = Mock()
+        recorder.is_sampled.return_value = True
+
+        with patch('xray_tracing._ensure_xray_loaded', return_value=recorder), \
+                patch('xray_tracing.xray_recorder', recorder), \
+                patch('xray_tracing.patch_all') as mock_patch_all:
+            tracer = XRayTracer()
+
+            assert tracer.is_enabled() is True
+            recorder.configure.assert_not_called()
+            mock_patch_all.assert_not_called()
+
+            assert tracer.is_sampled() is True
+            assert tracer.is_sampled() is True
+
+            recorder.configure.assert_called_once()
+            assert isinstance(recorder.configure.call_args.kwargs['emitter'], AsyncUDPEmitter)
+            mock_patch_all.assert_called_once()
+
+    def test_sampled_call_records_subsegment(self, enabled_tracer, mock_recorder):
+        """Test a sampled call creates, annotates and ends a subsegment"""
+        subseg = Mock()
+        mock_recorder.begin_subsegment.return_value = subseg
+
+        @enabled_tracer.capture_aws_service_call('sqs', 'send_message')
+        def operation():
+            return 'result'
+
+        assert operation() == 'result'
+
+        mock_recorder.begin_subsegment.assert_called_once_with('sqs.send_message')
+        subseg.put_annotation.assert_any_call('service', 'sqs')
+        subseg.put_annotation.assert_any_call('operation', 'send_message')
+        subseg.put_annotation.assert_any_call('status', 'success')
+        mock_recorder.end_subsegment.assert_called_once()
+
+    def test_unsampled_call_skips_subsegment(self, enabled_tracer, mock_recorder):
+        """Test unsampled calls go straight to the wrapped function"""
+        mock_recorder.is_sampled.return_value = False
+
+        decorators = [
+            enabled_tracer.capture_aws_service_call('sqs', 'send_message'),
+            enabled_tracer.capture_document_processing('analysis', 'doc_test123'),
+            enabled_tracer.capture_bedrock_call('claude', 'invoke_model'),
+            enabled_tracer.capture_database_operation('documents', 'get_item'),
+            enabled_tracer.capture_s3_operation('bucket', 'put_object'),
+        ]
+
+        for decorator in decorators:
+            assert decorator(lambda: 'result')() == 'result'
+
+        mock_recorder.begin_subsegment.assert_not_called()
+        mock_recorder.end_subsegment.assert_not_called()
+
+    def test_error_is_recorded_and_reraised(self, enabled_tracer, mock_recorder):
+        """Test failures are annotated on the subsegment and propagated"""
+        subseg = Mock()
+        mock_recorder.begin_subsegment.return_value = subseg
+
+        @enabled_tracer.capture_database_operation('documents', 'get_item')
+        def operation():
+            raise ValueError('boom')
+
+        with pytest.raises(ValueError):
+            operation()
+
+        subseg.put_annotation.assert_any_call('status', 'error')
+        subseg.put_metadata.assert_called_once_with('dynamodb_error', {
+            'type': 'ValueError',
+            'message': 'boom',
+            'table_name': 'documents',
+            'operation': 'get_item'
+        })
+        mock_recorder.end_subsegment.assert_called_once()
+
+    def test_document_processing_annotations(self, enabled_tracer, mock_recorder):
+        """Test document stages record completion status and result count"""
+        subseg = Mock()
+        mock_recorder.begin_subsegment.return_value = subseg
+
+        @enabled_tracer.capture_document_processing('analysis', 'doc_test123')
+        def operation():
+            return ['a', 'b', 'c']
+
+        operation()
+
+        mock_recorder.begin_subsegment.assert_called_once_with('document_processing.analysis')
+        subseg.put_annotation.assert_any_call('document_id', 'doc_test123')
+        subseg.put_annotation.assert_any_call('status', 'completed')
+        subseg.put_annotation.assert_any_call('result_count', 3)
+        document_metadata = subseg.put_metadata.call_args_list[0].args
+        assert document_metadata[0] == 'document'
+        assert isinstance(document_metadata[1]['timestamp_ns'], int)
+
+    def test_result_count_sampling(self, enabled_tracer, mock_recorder):
+        """Test result counts are annotated on one in every N calls"""
+        subseg = Mock()
+        mock_recorder.begin_subsegment.return_value = subseg
+
+        @enabled_tracer.capture_database_operation('documents', 'query')
+        def operation():
+            return [1, 2]
+
+        with patch('xray_tracing.RESULT_COUNT_SAMPLE_RATE', 4), \
+                patch('xray_tracing._result_count_calls', itertools.count()):
+            for _ in range(8):
+                operation()
+
+        item_counts = [c for c in subseg.put_annotation.call_args_list if c.args[0] == 'item_count']
+        assert len(item_counts) == 2
+
+    def test_bedrock_usage_recorded(self, enabled_tracer, mock_recorder):
+        """Test Bedrock token usage is attached as metadata"""
+        subseg = Mock()
+        mock_recorder.begin_subsegment.return_value = subseg
+
+        @enabled_tracer.capture_bedrock_call('claude', 'invoke_model')
+        def operation():
+            return {'usage': {'input_tokens': 12, 'output_tokens': 34}}
+
+        operation()
+
+        subseg.put_annotation.assert_any_call('model_id', 'claude')
+        subseg.put_metadata.assert_called_once_with('bedrock_usage', {
+            'input_tokens': 12,
+            'output_tokens': 34
+        })
+
+    def test_lambda_handler_flushes_emitter(self, enabled_tracer, mock_recorder):
+        """Test buffered segments are flushed once the handler returns"""
+        mock_recorder.capture.return_value = lambda func: func
+        enabled_tracer.emitter = Mock()
+
+        @enabled_tracer.capture_lambda_handler
+        def handler(event, context):
+            enabled_tracer.emitter.flush.assert_not_called()
+            return {'statusCode': 200}
+
+        assert handler({}, None) == {'statusCode': 200}
+        enabled_tracer.emitter.flush.assert_called_once()
+
+
+class TestTracingContext:
+    """Test cases for the manual tracing context manager"""
+
+    def test_context_annotates_error(self, enabled_tracer, mock_recorder):
+        """Test exceptions inside the context are recorded on the subsegment"""
+        subseg = Mock()
+        mock_recorder.begin_subsegment.return_value = subseg
+
+        with patch('xray_tracing.tracer', enabled_tracer):
+            with pytest.raises(RuntimeError):
+                with xray_tracing.create_tracing_context('parse_pages', {'pages': 3}):
+                    raise RuntimeError('bad page')
+
+        subseg.put_metadata.assert_any_call('pages', 3)
+        subseg.put_annotation.assert_called_once_with('status', 'error')
+        mock_recorder.end_subsegment.assert_called_once()
+
+    def test_context_has_no_instance_dict(self):
+        """Test tracing contexts use slots rather than a per-instance dict"""
+        context = xray_tracing.TracingContext('parse_pages')
+        assert not hasattr(context, '__dict__')
+        with pytest.raises(AttributeError):
+            context.extra = True
+
+
+class TestAsyncUDPEmitter:
+    """Test cases for the background UDP emitter"""
+
+    def make_entity(self, document):
+        entity = Mock()
+        entity.to_dict.return_value = document
+        entity.serialize.return_value = json.dumps(document)
+        return entity
+
+    def make_emitter(self):
+        emitter = AsyncUDPEmitter('127.0.0.1:2000')
+        emitter._socket = Mock()
+        return emitter
+
+    def test_entities_sent_in_background(self):
+        """Test segments are sent without waiting for a flush"""
+        emitter = self.make_emitter()
+        sent = threading.Event()
+        emitter._socket.sendto.side_effect = lambda *args: sent.set()
+
+        emitter.send_entity(self.make_entity({'id': '1'}))
+
+        assert sent.wait(timeout=2)
+        message, address = emitter._socket.sendto.call_args.args
+        header, document = message.split(b'\n', 1)
+        assert header == b'{"format":"json","version":1}'
+        assert json.loads(document) == {'id': '1'}
+        assert address == ('127.0.0.1', 2000)
+
+    def test_flush_sends_everything_queued(self):
+        """Test flush returns only once every queued segment has been sent"""
+        emitter = self.make_emitter()
+
+        for index in range(50):
+            emitter.send_entity(self.make_entity({'id': str(index)}))
+        emitter.flush()
+
+        assert emitter._socket.sendto.call_count == 50
+        sent_ids = sorted(
+            int(json.loads(call.args[0].split(b'\n', 1)[1])['id'])
+            for call in emitter._socket.sendto.call_args_list
+        )
+        assert sent_ids == list(range(50))
+
+    @pytest.mark.parametrize('orjson_available', [True, False])
+    def test_serialization_matches_sdk(self, orjson_available):
+        """Test both encoders produce the document the SDK would send"""
+        emitter = self.make_emitter()
+        document = {'name': 'lambda_handler', 'start_time': 1.5, 'annotations': {'status': 'success'}}
+
+        with patch('xray_emitter.ORJSON_AVAILABLE', orjson_available):
+            emitter.send_entity(self.make_entity(document))
+            emitter.flush()
+
+        message = emitter._socket.sendto.call_args.args[0]
+        assert json.loads(message.split(b'\n', 1)[1]) == document
+
+    def test_send_failure_is_logged(self):
+        """Test socket errors do not propagate out of flush"""
+        emitter = self.make_emitter()
+        emitter._socket.sendto.side_effect = OSError('Message too long')
+
+        emitter.send_entity(self.make_entity({}))
+        emitter.flush()
+
+        assert len(emitter._queue) == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])